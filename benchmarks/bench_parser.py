@@ -0,0 +1,121 @@
+# bench_parser.py
+"""Micro-benchmark of the NEC output parser.
+
+Compares parse_nec_output against the original line-by-line regex parser on
+a synthetic output with a 19x73 radiation pattern per frequency (the pattern
+requested by convert_nec_to_inp).
+
+    python -m benchmarks.bench_parser
+"""
+import argparse
+import math
+import os
+import re
+import tempfile
+import timeit
+
+from optimizer.NEC_tools import parse_nec_output, read_nec_output
+
+
+def legacy_read_nec_output(output_file):
+    """The original read_nec_output, kept as the benchmark baseline."""
+    with open(output_file, "r") as file:
+        lines = file.readlines()
+
+    real_impedance = None
+    imag_impedance = None
+    max_gain_db = -999.99
+
+    inside_impedance_section = False
+    inside_radiation_section = False
+
+    for line in lines:
+        if "IMPEDANCE (OHMS)" in line:
+            inside_impedance_section = True
+            continue
+
+        if "- - - RADIATION PATTERNS - - -" in line:
+            inside_radiation_section = True
+            continue
+
+        if inside_impedance_section:
+            if re.match(r'^\s*\d+\s+\d+', line):
+                separated_values = re.findall(r'[-+]?\d*\.\d+E[-+]?\d+|[-+]?\d+\.\d+|[-+]?\d+', line)
+                if len(separated_values) >= 8:
+                    real_impedance = float(separated_values[6])
+                    imag_impedance = float(separated_values[7])
+                inside_impedance_section = False
+
+        if inside_radiation_section:
+            match = re.search(r"\s+[-+]?\d+\.\d+\s+[-+]?\d+\.\d+\s+[-+]?\d+\.\d+\s+([-+]?\d+\.\d+)\s+[-+]?\d+\.\d+", line)
+            if match:
+                total_gain = float(match.group(1))
+                if total_gain > max_gain_db:
+                    max_gain_db = total_gain
+
+    return real_impedance, imag_impedance, max_gain_db
+
+
+def write_sample_output(path, frequencies=(144.0,), n_theta=19, n_phi=73, segments=9, elements=3):
+    """Write a NEC-2 style output with currents and a full radiation pattern per frequency."""
+    with open(path, "w") as out:
+        out.write("                              NUMERICAL ELECTROMAGNETICS CODE (NEC-2D)\n\n")
+        for f_index, freq in enumerate(frequencies):
+            out.write("\n                               --------- FREQUENCY --------\n")
+            out.write(f"                                FREQUENCY= {freq:.4E} MHZ\n")
+            out.write(f"                                WAVELENGTH= {299.792458 / freq:.4E} METERS\n\n")
+            out.write("                       - - - ANTENNA INPUT PARAMETERS - - -\n")
+            out.write("  TAG   SEG.    VOLTAGE (VOLTS)         CURRENT (AMPS)         IMPEDANCE (OHMS)        ADMITTANCE (MHOS)     POWER\n")
+            out.write("  NO.   NO.     REAL      IMAGINARY     REAL      IMAGINARY     REAL      IMAGINARY    REAL       IMAGINARY   (WATTS)\n")
+            real, imag = 28.0 + 3.0 * f_index, -12.0 + 4.0 * f_index
+            out.write(f"    2     5 1.0000E+00  0.0000E+00  2.8000E-02  1.2000E-02  {real:.4E} {imag: .4E}  2.8000E-02  1.2000E-02  1.4000E-02\n\n")
+            out.write("                           - - - CURRENTS AND LOCATION - - -\n")
+            for seg in range(1, segments * elements + 1):
+                out.write(f" {seg:4d} {1 + (seg - 1) // segments:4d}   0.0000  -0.1500   0.0000   0.03333  1.2345E-03 -2.3456E-04  1.2566E-03   -10.76\n")
+            out.write("\n                             - - - RADIATION PATTERNS - - -\n\n")
+            out.write(" - - ANGLES - -           - POWER GAINS -       - - - POLARIZATION - - -    - - - E(THETA) - - -    - - - E(PHI) - - -\n")
+            out.write("  THETA    PHI       VERT    HOR    TOTAL      AXIAL      TILT  SENSE   MAGNITUDE    PHASE    MAGNITUDE    PHASE\n")
+            out.write(" DEGREES  DEGREES     DB       DB       DB       RATIO      DEG.            VOLTS/M   DEGREES    VOLTS/M   DEGREES\n")
+            for i in range(n_theta):
+                theta = -90.0 + i * 5.0
+                for j in range(n_phi):
+                    phi = j * 5.0
+                    gain = 7.5 + f_index * 0.1 - 12.0 * (1 - math.cos(math.radians(theta - 90))) * (1 + math.sin(math.radians(phi)) ** 2) / 2
+                    out.write(f" {theta:7.2f} {phi:8.2f}  -999.99 {gain:8.2f} {gain:8.2f}   0.00000    0.00  LINEAR  0.00000E+00    0.00  1.23456E+00   12.34\n")
+            out.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frequencies", type=int, default=3, help="frequencies in the sample output")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    frequencies = [143.0 + i for i in range(args.frequencies)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sample.out")
+        write_sample_output(path, frequencies)
+
+        # the new parser must agree with the original on single-frequency summaries
+        single = os.path.join(tmp, "single.out")
+        write_sample_output(single, frequencies[:1])
+        assert legacy_read_nec_output(single) == read_nec_output(single)
+
+        cases = [
+            ("legacy read_nec_output", lambda: legacy_read_nec_output(path)),
+            ("read_nec_output", lambda: read_nec_output(path, per_frequency=True)),
+            ("parse_nec_output (full gain columns)", lambda: parse_nec_output(path)),
+            ("parse_nec_output (mmap)", lambda: parse_nec_output(path, use_mmap=True)),
+            ("parse_nec_output (impedance only, early exit)",
+             lambda: parse_nec_output(path, summary_only=True, num_frequencies=len(frequencies), need_pattern=False)),
+        ]
+        print(f"{os.path.getsize(path) / 1024:.0f} kB output, {len(frequencies)} frequencies x 19x73 pattern")
+        baseline = None
+        for name, func in cases:
+            best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+            baseline = baseline or best
+            print(f"  {name:48s} {best * 1000:8.2f} ms  ({baseline / best:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# bench_suite.py
+"""Throughput benchmarks of the optimizer, run against the fake NEC solver.
+
+Measures evaluations/sec of evaluate_single and evaluate_sweep, parser
+throughput of read_nec_output, deck generation with create_nec_input and
+convert_nec_to_inp, and end-to-end run_optimization at several population
+sizes and worker counts. benchmarks/fake_nec.py stands in for the NEC
+executable, so no Windows exe is needed.
+
+    python -m benchmarks.bench_suite --output bench.json
+    python -m benchmarks.bench_suite --baseline bench.json     (compare against an earlier run)
+"""
+import argparse
+import configparser
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shlex
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.fake_nec import run as run_fake_nec
+from optimizer.NEC_tools import convert_nec_to_inp, create_nec_input, read_nec_output
+from optimizer.evaluation import evaluate_single, evaluate_sweep
+from optimizer.genetic_optimizer import run_optimization
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_NEC = os.path.join(BASE_DIR, "benchmarks", "fake_nec.py")
+
+FREQUENCY = 144.0
+SWEEP = [143.0, 144.0, 145.0]
+
+
+def solver_command(delay):
+    return f"{shlex.quote(sys.executable)} {shlex.quote(FAKE_NEC)} --delay {delay} -i {{input}} -o {{output}}"
+
+
+def make_settings(work_dir, delay, num_elements=3):
+    """Evaluation settings as built by run_optimization, driving the fake solver."""
+    return {
+        'num_elements': num_elements,
+        'frequency': FREQUENCY,
+        'frequencies': SWEEP,
+        'target_real_impedance': 50.0,
+        'segments': 9,
+        'radius': 0.006,
+        'backend': 'nec',
+        'launcher': 'direct',
+        'solver_command': solver_command(delay),
+        'solver_timeout': 60,
+        'paths': {
+            'work_dir': work_dir,
+            'input': os.path.join(work_dir, "input.nec"),
+            'output': os.path.join(work_dir, "output.out"),
+            'tmp': os.path.join(work_dir, "nec2dSopt.tmp"),
+        },
+    }
+
+
+def random_designs(count, num_elements=3, seed=1):
+    rng = random.Random(seed)
+    return [[rng.uniform(0.25, 0.5) for _ in range(num_elements)] + [rng.uniform(0.1, 1.0 / num_elements) for _ in range(num_elements - 1)]
+            for _ in range(count)]
+
+
+def time_case(func, count, repeat):
+    """Best of repeat runs of func, which handles count items per run."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return {'seconds': best, 'count': count, 'per_sec': count / best}
+
+
+def write_config(work_dir, population, workers, generations, delay):
+    """Copy of the project config.ini pointing every path into work_dir and the solver at fake_nec."""
+    config = configparser.ConfigParser()
+    config.read(os.path.join(BASE_DIR, "config.ini"))
+    overrides = {
+        'Paths': {'input_dir': work_dir, 'output_dir': work_dir, 'exe_file': os.path.join(work_dir, "nec2dxs1K5.exe"),
+                  'tmp_file': "nec2dSopt.tmp"},
+        'Solver': {'backend': 'nec', 'launcher': 'direct', 'command': solver_command(delay), 'timeout': '60'},
+        'GeneticAlgorithm': {'population_size': str(population), 'num_generations': str(generations), 'vectorized': 'False'},
+        'Parallel': {'num_workers': str(workers), 'batch_size': '1', 'scratch_dir': os.path.join(work_dir, "scratch")},
+        'Cache': {'enabled': 'False', 'db_file': ''},
+        'Surrogate': {'enabled': 'False'},
+        'Profiling': {'report_json': '', 'report_csv': '', 'cprofile_file': ''},
+        'Output': {'csv_output_file': os.path.join(work_dir, "optimized_individuals.csv")},
+    }
+    for section, values in overrides.items():
+        if not config.has_section(section):
+            config.add_section(section)
+        for key, value in values.items():
+            config.set(section, key, value)
+    path = os.path.join(work_dir, "config.ini")
+    with open(path, "w") as file:
+        config.write(file)
+    return path
+
+
+def write_k_template(path, num_elements=5):
+    """A dual-band style deck whose wire ends are written as length+k / length-k."""
+    with open(path, "w") as file:
+        file.write("CM\nCE\nSY k=0.05\n")
+        for i in range(num_elements):
+            half_length = 0.5 - 0.02 * i
+            file.write(f"GW {i + 1} 9 {0.2 * i:.2f} -{half_length:.2f}-k 0 {0.2 * i:.2f} {half_length:.2f}+k 0 0.006\n")
+        file.write("GE 0\nGN -1\nEK\nEX 0 2 5 0 1 0\nFR 0 0 0 0 144.0 0\nEN\n")
+
+
+def run_benchmarks(args):
+    results = {}
+
+    def report(name, result):
+        results[name] = result
+        print(f"  {name:52s} {result['per_sec']:10.1f} /s  ({result['seconds']:.3f} s for {result['count']})")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        settings = make_settings(work_dir, args.delay)
+        designs = random_designs(args.evaluations)
+
+        print("Evaluation")
+        report("evaluate_single", time_case(lambda: [evaluate_single(d, settings) for d in designs], len(designs), args.repeat))
+        report("evaluate_sweep", time_case(lambda: [evaluate_sweep(d, settings) for d in designs], len(designs), args.repeat))
+
+        print("Parsing")
+        deck = os.path.join(work_dir, "parse.nec")
+        output = os.path.join(work_dir, "parse.out")
+        create_nec_input(designs[0][:3], designs[0][3:], deck, SWEEP)
+        run_fake_nec(deck, output)
+        report("read_nec_output (sweep deck)", time_case(lambda: [read_nec_output(output, per_frequency=True) for _ in range(args.parses)],
+                                                          args.parses, args.repeat))
+        template = os.path.join(work_dir, "template.nec")
+        inp = os.path.join(work_dir, "template.inp")
+        write_k_template(template)
+        convert_nec_to_inp(template, inp, 0.05)
+        run_fake_nec(inp, output)
+        report("read_nec_output (19x73 plot pattern)", time_case(lambda: [read_nec_output(output) for _ in range(args.parses)],
+                                                                 args.parses, args.repeat))
+
+        print("Deck generation")
+        report("create_nec_input", time_case(lambda: [create_nec_input(d[:3], d[3:], deck, SWEEP) for d in designs * 10],
+                                             len(designs) * 10, args.repeat))
+        report("convert_nec_to_inp", time_case(lambda: [convert_nec_to_inp(template, inp, 0.01 * i) for i in range(args.parses)],
+                                               args.parses, args.repeat))
+
+        print("End-to-end run_optimization (sweep)")
+        for population in args.populations:
+            for workers in args.workers:
+                config_path = write_config(work_dir, population, workers, args.generations, args.delay)
+
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    _, logbook, _ = run_optimization(mode='sweep', config_path=config_path)
+                seconds = time.perf_counter() - start
+                # the initial population plus every offspring that reached the solver
+                count = population + sum(logbook.select('solver_calls'))
+                report(f"run_optimization pop={population} workers={workers}",
+                       {'seconds': seconds, 'count': count, 'per_sec': count / seconds})
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print the speed ratio of every case against the baseline; return the regressed case names."""
+    regressions = []
+    print(f"\nAgainst baseline (regression if slower by more than {tolerance:.0%})")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"  {name:52s}        new")
+            continue
+        ratio = result['per_sec'] / baseline[name]['per_sec']
+        flag = ""
+        if ratio < 1.0 - tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"  {name:52s} {ratio:8.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    parser.add_argument("--evaluations", type=int, default=20, help="designs per evaluation benchmark")
+    parser.add_argument("--parses", type=int, default=50, help="files per parser/deck benchmark")
+    parser.add_argument("--populations", type=int, nargs="+", default=[10, 30])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--generations", type=int, default=3)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds the fake solver sleeps per frequency")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'options': vars(args),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# fake_nec.py
+"""Deterministic stand-in for the NEC-2 executable, used by the benchmarks.
+
+Reads a deck written by create_nec_input / create_nec_batch_input (GW, GX,
+EX, FR, RP and NX cards) and writes a NEC-2 style output: feed impedance,
+segment currents and the requested radiation pattern for every frequency of
+every structure. Impedance and gain come from a smooth analytic Yagi model,
+so the optimizer sees a realistic landscape, but they are not a simulation.
+
+    python benchmarks/fake_nec.py -i deck.nec -o deck.out
+    python benchmarks/fake_nec.py < tmp_file     (input and output path on stdin, like nec2dxs)
+
+--delay adds a fixed sleep per structure and frequency, to mimic the cost
+of a real solver run. Like NEC-2, a structure with a zero-length wire ends
+the run with a geometry error on stderr: the output keeps the structures
+before it and the rest of the deck is not solved.
+"""
+import argparse
+import math
+import sys
+import time
+
+SPEED_OF_LIGHT = 299.792458  # m * MHz
+
+
+def parse_deck(lines):
+    """Split a deck at its NX cards into structures.
+
+    Each structure is a dict with its comments, wires (tag, segments, x, length),
+    feed (tag, segment), frequencies and pattern (n_theta, n_phi, theta0, phi0,
+    d_theta, d_phi). A GX reflection in y = 0 joins every half element to its
+    image (mirrored is then True); the feed is the first EX card.
+    """
+    structures = []
+    current = None
+    for line in lines:
+        cards = line.split()
+        if not cards:
+            continue
+        if current is None:
+            current = {'comments': [], 'wires': [], 'feed': None, 'frequencies': [],
+                       'pattern': (1, 1, 90.0, 0.0, 0.0, 0.0), 'mirrored': False}
+            structures.append(current)
+        card = cards[0].upper()
+        if card == "CM":
+            current['comments'].append(line.strip()[2:].strip())
+        elif card == "GW":
+            tag, segments = int(cards[1]), int(cards[2])
+            x1, y1, z1, x2, y2, z2 = (float(v) for v in cards[3:9])
+            length = math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2 + (z2 - z1) ** 2)
+            current['wires'].append((tag, segments, (x1 + x2) / 2, length))
+        elif card == "GX":
+            if len(cards) > 2 and cards[2].zfill(3)[1] == "1":
+                current['wires'] = [(tag, 2 * segments, x, 2 * length) for tag, segments, x, length in current['wires']]
+                current['mirrored'] = True
+        elif card == "EX":
+            if current['feed'] is None:
+                current['feed'] = (int(cards[2]), int(cards[3]))
+        elif card == "FR":
+            count = max(1, int(cards[2]))
+            start = float(cards[5])
+            step = float(cards[6]) if len(cards) > 6 else 0.0
+            current['frequencies'] = [start + i * step for i in range(count)]
+        elif card == "RP":
+            current['pattern'] = (int(cards[2]), int(cards[3]), float(cards[5]), float(cards[6]),
+                                  float(cards[7]), float(cards[8]) if len(cards) > 8 else 0.0)
+        elif card in ("NX", "EN"):
+            current = None
+    for structure in structures:
+        structure['feed'] = structure['feed'] or (1, 1)
+    return [structure for structure in structures if structure['wires']]
+
+
+def yagi_model(wires, feed_tag, frequency):
+    """Feed impedance (ohms) and forward gain (dBi) of a Yagi, with its front/back factor.
+
+    The driven element behaves like a dipole whose resistance and reactance
+    follow its electrical length. Every parasitic element lowers the feed
+    resistance with proximity and adds gain when its length and spacing are
+    close to those of a good reflector (behind the feed) or director (ahead).
+    """
+    wavelength = SPEED_OF_LIGHT / frequency
+    driven = next((wire for wire in wires if wire[0] == feed_tag), wires[0])
+    ratio = driven[3] / (wavelength / 2)
+    resistance = 73.1 * ratio ** 2
+    reactance = 430.0 * (ratio - 0.95)
+
+    gain = 2.15
+    front_back = 0.0
+    for tag, _, x, length in wires:
+        if tag == driven[0]:
+            continue
+        spacing = abs(x - driven[2]) / wavelength
+        coupling = math.exp(-spacing / 0.25)
+        ideal = 1.05 if x < driven[2] else 0.9
+        match = math.exp(-((length / (wavelength / 2) - ideal) / 0.08) ** 2)
+        spacing_match = math.exp(-((spacing - 0.2) / 0.15) ** 2)
+        resistance *= 1.0 - 0.45 * coupling
+        reactance += 40.0 * coupling * (length / (wavelength / 2) - ideal) / 0.1
+        gain += 2.2 * match * spacing_match
+        front_back += match * spacing_match
+    return complex(resistance, reactance), gain, front_back / (1.0 + front_back)
+
+
+def pattern_gain(gain, front_back, theta, phi):
+    """Gain (dBi) towards theta/phi: a y-oriented dipole times a cardioid along +x."""
+    t, p = math.radians(theta), math.radians(phi)
+    along_x = math.sin(t) * math.cos(p)
+    along_y = math.sin(t) * math.sin(p)
+    dipole = max(1e-6, 1.0 - along_y ** 2)
+    cardioid = max(1e-3, (1.0 + front_back * along_x) / (1.0 + front_back)) ** 2
+    return gain + 10.0 * math.log10(dipole * cardioid)
+
+
+def write_structure(out, structure, delay=0.0):
+    """Write the output sections of one structure."""
+    for comment in structure['comments']:
+        out.write(f"                               {comment}\n")
+    feed_tag, feed_segment = structure['feed']
+    n_theta, n_phi, theta0, phi0, d_theta, d_phi = structure['pattern']
+
+    for freq in structure['frequencies']:
+        if delay:
+            time.sleep(delay)
+        impedance, gain, front_back = yagi_model(structure['wires'], feed_tag, freq)
+        if structure['mirrored']:
+            # each of the two sources of a mirrored feed sees half the impedance
+            impedance /= 2
+        current = 1.0 / impedance
+        out.write("\n                               --------- FREQUENCY --------\n")
+        out.write(f"                                FREQUENCY= {freq:.4E} MHZ\n")
+        out.write(f"                                WAVELENGTH= {SPEED_OF_LIGHT / freq:.4E} METERS\n\n")
+        out.write("                       - - - ANTENNA INPUT PARAMETERS - - -\n")
+        out.write("  TAG   SEG.    VOLTAGE (VOLTS)         CURRENT (AMPS)         IMPEDANCE (OHMS)        ADMITTANCE (MHOS)     POWER\n")
+        out.write("  NO.   NO.     REAL      IMAGINARY     REAL      IMAGINARY     REAL      IMAGINARY    REAL       IMAGINARY   (WATTS)\n")
+        out.write(f" {feed_tag:4d} {feed_segment:5d} 1.0000E+00  0.0000E+00 {current.real: .4E} {current.imag: .4E} "
+                  f"{impedance.real: .4E} {impedance.imag: .4E} {current.real: .4E} {current.imag: .4E} {current.real / 2: .4E}\n\n")
+
+        out.write("                           - - - CURRENTS AND LOCATION - - -\n")
+        segment = 0
+        for tag, segments, x, length in structure['wires']:
+            for i in range(segments):
+                segment += 1
+                y = -length / 2 + (i + 0.5) * length / segments
+                magnitude = abs(current) * math.cos(math.pi * y / max(length, 1e-9))
+                out.write(f" {segment:4d} {tag:4d} {x:8.4f} {y:8.4f}   0.0000 {length / segments:8.5f}"
+                          f" {magnitude: .4E}  0.0000E+00 {abs(magnitude): .4E}     0.00\n")
+
+        out.write("\n                             - - - RADIATION PATTERNS - - -\n\n")
+        out.write(" - - ANGLES - -           - POWER GAINS -       - - - POLARIZATION - - -    - - - E(THETA) - - -    - - - E(PHI) - - -\n")
+        out.write("  THETA    PHI       VERT    HOR    TOTAL      AXIAL      TILT  SENSE   MAGNITUDE    PHASE    MAGNITUDE    PHASE\n")
+        out.write(" DEGREES  DEGREES     DB       DB       DB       RATIO      DEG.            VOLTS/M   DEGREES    VOLTS/M   DEGREES\n")
+        for i in range(n_theta):
+            theta = theta0 + i * d_theta
+            for j in range(n_phi):
+                phi = phi0 + j * d_phi
+                value = pattern_gain(gain, front_back, theta, phi)
+                out.write(f" {theta:7.2f} {phi:8.2f}  -999.99 {value:8.2f} {value:8.2f}   0.00000    0.00  LINEAR"
+                          f"  0.00000E+00    0.00  {10 ** (value / 20):.5E}    0.00\n")
+        out.write("\n")
+
+
+def run(input_path, output_path, delay=0.0):
+    """Solve every structure of a deck; returns the exit status (1 after a geometry error)."""
+    with open(input_path) as deck:
+        structures = parse_deck(deck)
+    with open(output_path, "w") as out:
+        out.write("                              NUMERICAL ELECTROMAGNETICS CODE (NEC-2D)\n\n")
+        for structure in structures:
+            bad = [tag for tag, _, _, length in structure['wires'] if length <= 0]
+            if bad:
+                sys.stderr.write(f"GEOMETRY DATA ERROR -- WIRE {bad[0]} HAS ZERO LENGTH\n")
+                return 1
+            write_structure(out, structure, delay)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-i", "--input", help="NEC deck (read from stdin if omitted)")
+    parser.add_argument("-o", "--output", help="output file (read from stdin if omitted)")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds slept per structure and frequency")
+    args = parser.parse_args()
+
+    input_path, output_path = args.input, args.output
+    if input_path is None or output_path is None:
+        names = [line.strip() for line in sys.stdin if line.strip()]
+        input_path, output_path = names[0], names[1]
+    sys.exit(run(input_path, output_path, args.delay))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import threading
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import time
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QLabel, QVBoxLayout, QHBoxLayout,
@@ -11,6 +12,8 @@ from PySide6.QtWidgets import (
 )
 
 from optimizer import genetic_optimizer
+from optimizer.archive import query_archive
+from optimizer.rescore import OBJECTIVES, rescore_archive, write_rescored_csv
 from config_writer import update_config
 
 
@@ -50,11 +53,15 @@ class OptimizerGUI(QWidget):
         self.start_button = QPushButton("Start Optimization")
         self.start_button.clicked.connect(self.start_optimization_thread)
 
+        self.resume_button = QPushButton("Resume Optimization")
+        self.resume_button.clicked.connect(self.resume_optimization_thread)
+
         self.plot_button = QPushButton("Show Plot")
         self.plot_button.clicked.connect(self.show_plot)
 
         layout.addWidget(self.progress_bar)
         layout.addWidget(self.start_button)
+        layout.addWidget(self.resume_button)
         layout.addWidget(self.plot_button)
 
         self.setLayout(layout)
@@ -161,8 +168,24 @@ class OptimizerGUI(QWidget):
         self.enable_plots_entry = QCheckBox("Enable Plots")
         self.enable_plots_entry.setChecked(True)
 
+        # archive of every evaluation; Show Plot reads from it when set
+        self.archive_entry = self.create_browse_entry("Evaluation Archive (SQLite)", "", directory=False)
+        self.plot_generation_entry = self.create_entry("Plot Generation (e.g. 5 or 3-8, empty = all)", "")
+        self.plot_min_gain_entry = self.create_entry("Plot Min Gain (dB)", "")
+
+        # recompute objectives over the archive from its stored raw results, without the solver
+        self.rescore_objectives_entry = self.create_entry(
+            f"Re-score Objectives ({', '.join(OBJECTIVES)})", "gain,real_penalty,imag_penalty")
+        self.rescore_button = QPushButton("Re-score Archive")
+        self.rescore_button.clicked.connect(self.rescore_archive)
+
         layout.addLayout(self.csv_output_entry["layout"])
         layout.addWidget(self.enable_plots_entry)
+        layout.addLayout(self.archive_entry["layout"])
+        layout.addLayout(self.plot_generation_entry["layout"])
+        layout.addLayout(self.plot_min_gain_entry["layout"])
+        layout.addLayout(self.rescore_objectives_entry["layout"])
+        layout.addWidget(self.rescore_button)
 
         self.output_tab.setLayout(layout)
 
@@ -211,6 +234,10 @@ class OptimizerGUI(QWidget):
         thread = threading.Thread(target=self.start_optimization)
         thread.start()
 
+    def resume_optimization_thread(self):
+        thread = threading.Thread(target=self.start_optimization, kwargs={'resume': True})
+        thread.start()
+
     def save_all_to_config(self, mode):
         # --- Simulation ---
         update_config('Simulation', 'frequency', self.freq_entry["entry"].text())
@@ -245,11 +272,13 @@ class OptimizerGUI(QWidget):
         # --- Output ---
         update_config('Output', 'csv_output_file', self.csv_output_entry["entry"].text())
         update_config('Output', 'enable_plots', str(self.enable_plots_entry.isChecked()))
+        update_config('Archive', 'db_file', self.archive_entry["entry"].text())
 
 
-    def start_optimization(self):
+    def start_optimization(self, resume=False):
         try:
             self.start_button.setEnabled(False)
+            self.resume_button.setEnabled(False)
             self.progress_bar.setValue(0)
 
             mode = "single" if self.mode_single.isChecked() else "sweep"
@@ -258,9 +287,9 @@ class OptimizerGUI(QWidget):
             # Run optimizer inside try/except
             try:
                 if mode == 'single':
-                    genetic_optimizer.run_optimization(mode='single', progress_callback=self.update_progress)
+                    genetic_optimizer.run_optimization(mode='single', progress_callback=self.update_progress, resume=resume)
                 else:
-                    genetic_optimizer.run_optimization(mode='sweep', progress_callback=self.update_progress)
+                    genetic_optimizer.run_optimization(mode='sweep', progress_callback=self.update_progress, resume=resume)
             except Exception as e:
                 print("❌ Error in optimizer:", e)
                 raise  # Reraise to outer catch
@@ -274,20 +303,85 @@ class OptimizerGUI(QWidget):
             sys.exit(1)
         finally:
             self.start_button.setEnabled(True)
+            self.resume_button.setEnabled(True)
             self.progress_bar.setValue(100)
 
 
     def update_progress(self, progress):
         self.progress_bar.setValue(int(progress * 100))
 
+    def read_plot_data(self):
+        """Final population from the CSV, or the selected rows of the evaluation archive."""
+        archive_file = self.archive_entry["entry"].text()
+        if not archive_file or not os.path.exists(archive_file):
+            return pd.read_csv(self.csv_output_entry["entry"].text())
+
+        generation = None
+        generation_text = self.plot_generation_entry["entry"].text().strip()
+        if generation_text:
+            first, _, last = generation_text.partition("-")
+            generation = (int(first), int(last or first))
+        min_gain_text = self.plot_min_gain_entry["entry"].text().strip()
+        gain_range = (float(min_gain_text), None) if min_gain_text else None
+
+        rows = query_archive(archive_file, generation=generation, gain_range=gain_range,
+                             columns=['gain', 'real_penalty', 'imag_penalty', 'front_to_back'])
+        data = {
+            'Max Gain (dB)': [row['gain'] for row in rows],
+            'Real Impedance Penalty': [row['real_penalty'] for row in rows],
+            'Imaginary Impedance Penalty': [row['imag_penalty'] for row in rows],
+        }
+        if any(row['front_to_back'] is not None for row in rows):
+            data['Front-to-Back (dB)'] = [row['front_to_back'] for row in rows]
+        return pd.DataFrame(data)
+
+    def rescore_archive(self):
+        """Re-score the archive with the current target impedance and write its new Pareto front to CSV."""
+        try:
+            archive_file = self.archive_entry["entry"].text()
+            if not archive_file or not os.path.exists(archive_file):
+                raise ValueError("Select an existing evaluation archive first")
+            objectives = [name.strip() for name in self.rescore_objectives_entry["entry"].text().split(",") if name.strip()]
+            target = float(self.target_imp_entry["entry"].text())
+
+            start = time.perf_counter()
+            # VSWR is taken relative to the target impedance
+            designs = rescore_archive(archive_file, objectives, target_real_impedance=target, z0=target)
+            csv_file = os.path.splitext(archive_file)[0] + "_rescored.csv"
+            count = write_rescored_csv(csv_file, designs, objectives)
+            elapsed = time.perf_counter() - start
+
+            QMessageBox.information(self, "Re-score Archive",
+                                    f"{len(designs)} designs re-scored in {elapsed:.1f} s, "
+                                    f"{count} on the Pareto front.\nWritten to {csv_file}")
+
+            if self.enable_plots_entry.isChecked() and len(objectives) >= 2:
+                front = [design for design in designs if design['front']]
+                plt.figure(figsize=(8, 5))
+                plt.scatter([d[objectives[1]] for d in designs], [d[objectives[0]] for d in designs],
+                            s=8, color='lightgray', label='Archive')
+                plt.scatter([d[objectives[1]] for d in front], [d[objectives[0]] for d in front],
+                            s=16, color='red', label='Pareto front')
+                plt.xlabel(objectives[1])
+                plt.ylabel(objectives[0])
+                plt.title('Re-scored Archive')
+                plt.legend()
+                plt.grid()
+                plt.show()
+
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error while re-scoring the archive:\n{e}")
+
     def show_plot(self):
         try:
-            df = pd.read_csv(self.csv_output_entry["entry"].text())
+            df = self.read_plot_data()
 
             plt.figure(figsize=(8, 5))
             plt.plot(df['Max Gain (dB)'], label='Gain (dB)')
             plt.plot(df['Real Impedance Penalty'], label='Real Impedance Penalty')
             plt.plot(df['Imaginary Impedance Penalty'], label='Imaginary Impedance Penalty')
+            if 'Front-to-Back (dB)' in df:
+                plt.plot(df['Front-to-Back (dB)'], label='Front-to-Back (dB)')
             plt.xlabel('Individual')
             plt.ylabel('Value')
             plt.title('Optimization Results')
@@ -1,8 +1,14 @@
+import asyncio
 import subprocess
 import re
 import os
+import signal
+import mmap
+import shlex
 import configparser
 
+import numpy as np
+
 # === CONFIG ===
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONFIG_PATH = os.path.join(BASE_DIR, 'config.ini')
@@ -18,59 +24,549 @@ EXE_FILE = config['Paths']['exe_file']
 TMP_FILE = config['Paths']['tmp_file']
 frequency = float(config['Simulation']['frequency'])
 
+# comment written at the top of every structure of a batch deck, echoed by the solver
+BATCH_MARKER = "BATCH STRUCTURE"
 
 
-def run_nec2dxs1k5():
-    tmp_path = os.path.abspath(os.path.join(BASE_DIR, TMP_FILE))
-    command = f"Set-Location '{EXE_DIR}'; Get-Content '{tmp_path}' | & .\\{EXE_FILE}"
-    process = subprocess.run(
-        ["powershell", "-Command", command],
-        capture_output=True,
-        text=True
-    )
 
-    return process.stdout, process.stderr
+def powershell_args(tmp_path=None, work_dir=None):
+    """PowerShell command line that pipes the tmp file into the NEC exe."""
+    tmp_path = os.path.abspath(tmp_path or os.path.join(BASE_DIR, TMP_FILE))
+    if work_dir is None:
+        command = f"Set-Location '{EXE_DIR}'; Get-Content '{tmp_path}' | & .\\{EXE_FILE}"
+    else:
+        exe_path = os.path.join(EXE_DIR, EXE_FILE)
+        command = f"Set-Location '{work_dir}'; Get-Content '{tmp_path}' | & '{exe_path}'"
+    return ["powershell", "-Command", command]
 
 
-def read_nec_output(output_file):
-    with open(output_file, "r") as file:
-        lines = file.readlines()
+def run_nec2dxs1k5(tmp_path=None, work_dir=None, timeout=None):
+    """Run the NEC solver on the deck named in tmp_path.
+
+    With work_dir the solver runs from that directory, so parallel workers
+    never share the solver's scratch files. A run exceeding timeout seconds
+    is killed, together with the exe PowerShell started, and reported as an
+    error.
+    """
+    launch = run_process(powershell_args(tmp_path, work_dir), timeout=timeout)
+    if launch.timed_out:
+        return "", f"NEC solver timed out after {timeout} s"
+    return launch.stdout, launch.stderr
+
+
+def kill_process_tree(process):
+    """Kill a launched solver and every process it started.
+
+    PowerShell runs the NEC exe as a child, which would otherwise keep
+    writing to the scratch output that the next evaluation reads. Solvers
+    are started in their own session (process group) on POSIX for this.
+    """
+    if os.name == 'nt':
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(process.pid)], capture_output=True)
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+    try:
+        process.kill()
+    except OSError:
+        pass
+
+
+class LaunchResult:
+    """Outcome of one solver launch."""
+
+    def __init__(self, stdout, stderr, returncode, timed_out=False):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = returncode
+        self.timed_out = timed_out
+
+    @property
+    def failed(self):
+        return self.timed_out or self.returncode != 0
+
+
+def run_process(args, input_text=None, cwd=None, timeout=None):
+    """Run a solver command and return a LaunchResult.
+
+    A process exceeding timeout seconds (or interrupted) is killed with its
+    whole process tree (see kill_process_tree).
+    """
+    try:
+        process = subprocess.Popen(args, stdin=subprocess.PIPE if input_text is not None else None,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=cwd,
+                                   start_new_session=True)
+    except OSError as exc:
+        return LaunchResult("", str(exc), None)
+    try:
+        stdout, stderr = process.communicate(input_text, timeout)
+    except subprocess.TimeoutExpired:
+        kill_process_tree(process)
+        stdout, stderr = process.communicate()
+        return LaunchResult(stdout or "", stderr or "", None, timed_out=True)
+    except BaseException:
+        kill_process_tree(process)
+        process.wait()
+        raise
+    return LaunchResult(stdout, stderr, process.returncode)
+
+
+async def run_process_async(args, input_text=None, cwd=None, timeout=None):
+    """asyncio counterpart of run_process: returns a LaunchResult.
+
+    The process tree is killed when it exceeds timeout seconds or the
+    awaiting task is cancelled (e.g. by the scheduler's own per-call timeout).
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *args, stdin=asyncio.subprocess.PIPE if input_text is not None else None,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, cwd=cwd, start_new_session=True)
+    except OSError as exc:
+        return LaunchResult("", str(exc), None)
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(input_text.encode() if input_text is not None else None), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+        kill_process_tree(process)
+        await process.wait()
+        if isinstance(exc, asyncio.CancelledError):
+            raise
+        return LaunchResult("", "", None, timed_out=True)
+    return LaunchResult(stdout.decode(errors="replace"), stderr.decode(errors="replace"), process.returncode)
+
+
+class PowerShellLauncher:
+    """The original Windows launcher: PowerShell pipes the tmp file into the exe."""
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+    def run(self, paths):
+        launch = run_process(powershell_args(paths['tmp'], paths['work_dir']), timeout=self.timeout)
+        if not launch.timed_out:
+            launch.returncode = 1 if launch.stderr else 0
+        return launch
+
+    async def run_async(self, paths):
+        launch = await run_process_async(powershell_args(paths['tmp'], paths['work_dir']), timeout=self.timeout)
+        if not launch.timed_out:
+            launch.returncode = 1 if launch.stderr else 0
+        return launch
+
+
+class DirectLauncher:
+    """Start a NEC binary directly, without a shell or tmp file.
+
+    command is split like a shell command line. If it contains {input} and
+    {output} placeholders the file names go on argv (nec2c -i {input} -o {output}),
+    otherwise they are written to the solver's stdin, one per line, as
+    nec2dxs expects.
+    """
+
+    def __init__(self, command, timeout=None):
+        self.command = command
+        self.timeout = timeout
+
+    def prepare(self, paths):
+        """(argv, stdin text or None, working directory) of one launch."""
+        input_path = os.path.abspath(paths['input'])
+        output_path = os.path.abspath(paths['output'])
+        if "{input}" in self.command:
+            args = [arg.format(input=input_path, output=output_path) for arg in shlex.split(self.command)]
+            stdin_text = None
+        else:
+            args = shlex.split(self.command)
+            stdin_text = f"{input_path}\n{output_path}\n"
+
+        # relative solver paths are taken from the project folder
+        if os.sep in args[0] or "/" in args[0]:
+            args[0] = args[0] if os.path.isabs(args[0]) else os.path.join(BASE_DIR, args[0])
+        return args, stdin_text, paths['work_dir'] or os.path.dirname(output_path)
+
+    def run(self, paths):
+        args, stdin_text, cwd = self.prepare(paths)
+        return run_process(args, stdin_text, cwd, self.timeout)
+
+    async def run_async(self, paths):
+        """Same as run, without blocking the event loop while the solver runs."""
+        args, stdin_text, cwd = self.prepare(paths)
+        return await run_process_async(args, stdin_text, cwd, self.timeout)
+
+
+def make_launcher(kind='powershell', command=None, timeout=None):
+    """Build the solver launcher selected in the [Solver] section of config.ini."""
+    if kind == 'direct':
+        return DirectLauncher(command, timeout)
+    if kind == 'powershell':
+        return PowerShellLauncher(timeout)
+    raise ValueError(f"Unknown solver launcher '{kind}', expected 'powershell' or 'direct'")
+
+# --- precompiled patterns of the output parser ---
+FREQUENCY_PATTERN = re.compile(r'FREQUENCY\s*[=:]\s*([-+]?\d*\.?\d+(?:E[-+]?\d+)?)')
+FEED_ROW_PATTERN = re.compile(r'^\s*\d+\s+\d+')
+NUMBER_PATTERN = re.compile(r'[-+]?\d*\.\d+E[-+]?\d+|[-+]?\d+\.\d+|[-+]?\d+')
+PATTERN_ROW_PATTERN = re.compile(r"\s+[-+]?\d+\.\d+\s+[-+]?\d+\.\d+\s+[-+]?\d+\.\d+\s+([-+]?\d+\.\d+)\s+[-+]?\d+\.\d+")
+BATCH_PATTERN = re.compile(BATCH_MARKER + r'\s+(\d+)')
+
+# index of the pattern column read as gain (the fourth, as the original parser did)
+GAIN_COLUMN = 3
+
+# --- far-field sampling: the theta cut at phi = 0 requested by the RP card ---
+FAR_FIELD_MODES = ('full', 'forward', 'forward_back', 'adaptive')
+# forward (reflector -> directors, +x) and back directions, as in the deck comment
+FORWARD_THETA = 90
+BACK_THETA = -90
+# theta step of the coarse cut of the adaptive mode
+ADAPTIVE_STEP = 30
+
+
+def pattern_cut(mode='full', pattern_step=5):
+    """(first theta, number of points, theta step) of the cut sampled in far-field mode.
+
+    full: the whole cut every pattern_step degrees; forward: the forward
+    direction only; forward_back: back and forward; adaptive: a coarse cut
+    every ADAPTIVE_STEP degrees. The MoM backend resamples every pattern_step
+    degrees around its peak (see solve_yagis); a NEC deck fixes its RP cards
+    before the solve, so there the peak is interpolated by refine_peak.
+    """
+    if mode == 'full':
+        return -180, int(round(360 / pattern_step)) + 1, pattern_step
+    if mode == 'forward':
+        return FORWARD_THETA, 1, 0
+    if mode == 'forward_back':
+        return BACK_THETA, 2, FORWARD_THETA - BACK_THETA
+    if mode == 'adaptive':
+        step = max(pattern_step, ADAPTIVE_STEP)
+        return -180, int(round(360 / step)) + 1, step
+    raise ValueError(f"Unknown far-field mode '{mode}', expected one of {FAR_FIELD_MODES}")
+
+
+def pattern_thetas(mode='full', pattern_step=5):
+    """Theta angles of the cut, in the order the solver prints them."""
+    first, count, step = pattern_cut(mode, pattern_step)
+    return first + step * np.arange(count, dtype=float)
+
+
+def pattern_summary(gains, thetas, mode='full'):
+    """Peak gain and front-to-back ratio (dB) of cut gains, one cut per row of the last axis.
+
+    The front-to-back ratio is NaN when the cut does not hold both the
+    forward and the back direction.
+    """
+    gains = np.asarray(gains, dtype=float)
+    thetas = np.asarray(thetas, dtype=float)
+    forward = np.flatnonzero(np.isclose(thetas, FORWARD_THETA))
+    back = np.flatnonzero(np.isclose(thetas, BACK_THETA))
+
+    if mode in ('forward', 'forward_back'):
+        peak = gains[..., forward[0]]
+    elif mode == 'adaptive':
+        peak = refine_peak(gains, thetas)
+    else:
+        peak = gains.max(axis=-1)
+
+    if len(forward) and len(back):
+        front_to_back = gains[..., forward[0]] - gains[..., back[0]]
+    else:
+        front_to_back = np.full(gains.shape[:-1], np.nan)
+    return peak, front_to_back
+
 
-    real_impedance = None
-    imag_impedance = None
-    max_gain_db = -999.99
+def refine_peak(gains, thetas):
+    """Peak of an evenly sampled cut: a parabola through the best sample and its two neighbours."""
+    if len(thetas) > 1 and np.isclose(thetas[-1] - thetas[0], 360):
+        # -180 and 180 are the same direction: the cut wraps around
+        gains = gains[..., :-1]
+    count = gains.shape[-1]
+    best = np.argmax(gains, axis=-1)[..., None]
+    centre = np.take_along_axis(gains, best, axis=-1)[..., 0]
+    if count < 3:
+        return centre
+    left = np.take_along_axis(gains, (best - 1) % count, axis=-1)[..., 0]
+    right = np.take_along_axis(gains, (best + 1) % count, axis=-1)[..., 0]
+    curvature = left - 2 * centre + right
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset = np.where(curvature < 0, 0.5 * (left - right) / curvature, 0.0)
+    offset = np.clip(offset, -0.5, 0.5)
+    return centre - 0.25 * (left - right) * offset
 
+
+class NecResult:
+    """Structured contents of one NEC output, one entry per simulated frequency.
+
+    gains holds the full gain column of each frequency's radiation pattern,
+    or None when the output was parsed with summary_only. front_to_back is
+    set by far_field.
+    """
+
+    def __init__(self, frequencies, impedance, max_gain, gains=None, front_to_back=None):
+        self.frequencies = np.asarray(frequencies, dtype=float)
+        self.impedance = np.asarray(impedance, dtype=complex)
+        self.max_gain = np.asarray(max_gain, dtype=float)
+        self.gains = gains
+        self.front_to_back = None if front_to_back is None else np.asarray(front_to_back, dtype=float)
+
+    def far_field(self, mode='full', pattern_step=5):
+        """Copy whose max_gain and front_to_back come from the cut sampled in far-field mode (see pattern_cut)."""
+        if self.gains is None:
+            return self
+        thetas = pattern_thetas(mode, pattern_step)
+        peaks, ratios = [], []
+        for gains, max_gain in zip(self.gains, self.max_gain):
+            if len(gains) == len(thetas):
+                peak, ratio = pattern_summary(gains, thetas, mode)
+            else:
+                peak, ratio = max_gain, np.nan
+            peaks.append(float(peak))
+            ratios.append(float(ratio))
+        return NecResult(self.frequencies, self.impedance, peaks, self.gains, ratios)
+
+    def vswr(self, z0=50.0):
+        """VSWR of the feed impedance at each frequency, relative to z0 ohms."""
+        reflection = np.abs((self.impedance - z0) / (self.impedance + z0))
+        with np.errstate(divide='ignore'):
+            return (1 + reflection) / (1 - reflection)
+
+    def __len__(self):
+        return len(self.frequencies)
+
+
+def parse_nec_output(output_file, summary_only=False, num_frequencies=None, need_pattern=True, use_mmap=False):
+    """Stream a NEC output file once and return a NecResult.
+
+    summary_only keeps only the max gain per frequency. With num_frequencies
+    the parser stops as soon as that many frequencies are complete: after
+    their impedances if need_pattern is False, otherwise after the last
+    radiation pattern. use_mmap reads the file through a memory map.
+    """
+    if use_mmap and os.path.getsize(output_file) > 0:
+        with open(output_file, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            lines = (raw.decode("latin-1") for raw in iter(mapped.readline, b""))
+            return parse_nec_stream(lines, summary_only, num_frequencies, need_pattern)
+
+    with open(output_file, "r") as file:
+        return parse_nec_stream(file, summary_only, num_frequencies, need_pattern)
+
+def parse_nec_stream(lines, summary_only=False, num_frequencies=None, need_pattern=True):
+    """Single-pass parser behind parse_nec_output, for any iterable of lines."""
     inside_impedance_section = False
     inside_radiation_section = False
+    pattern_rows = 0
 
+    # per-frequency records [frequency, impedance, max gain, gain column], in the order the solver
+    # reports them: an FR card with step 0 repeats a frequency, so records are not keyed on its value
+    records = []
+
+    def new_record(frequency=None):
+        records.append([frequency, None, -999.99, []])
+        return records[-1]
+
+    record = None
     for line in lines:
+        # pattern rows are the bulk of the output: try them before any marker search
+        if inside_radiation_section:
+            values = line.split()
+            gain = None
+            if len(values) > 4:
+                try:
+                    float(values[0])
+                    gain = float(values[GAIN_COLUMN])
+                    float(values[4])
+                except ValueError:
+                    gain = None
+            if gain is None and values:
+                match = PATTERN_ROW_PATTERN.search(line)
+                gain = float(match.group(1)) if match else None
+
+            if gain is not None:
+                pattern_rows += 1
+                if gain > record[2]:
+                    record[2] = gain
+                if not summary_only:
+                    record[3].append(gain)
+                continue
+            if pattern_rows and num_frequencies is not None and len(records) >= num_frequencies:
+                # first line after the last frequency's pattern
+                if all(rec[1] is not None for rec in records):
+                    break
+
+        if "FREQUENCY" in line:
+            match = FREQUENCY_PATTERN.search(line)
+            if match:
+                record = new_record(float(match.group(1)))
+                inside_radiation_section = False
+                continue
+
         if "IMPEDANCE (OHMS)" in line:
             inside_impedance_section = True
             continue
 
         if "- - - RADIATION PATTERNS - - -" in line:
-            inside_radiation_section = True
+            inside_radiation_section = need_pattern
+            pattern_rows = 0
+            record = record or new_record()
             continue
 
         if inside_impedance_section:
-            if re.match(r'^\s*\d+\s+\d+', line):
-                separated_values = re.findall(r'[-+]?\d*\.\d+E[-+]?\d+|[-+]?\d+\.\d+|[-+]?\d+', line)
-                if len(separated_values) >= 8:
-                    try:
-                        real_impedance = float(separated_values[6])
-                        imag_impedance = float(separated_values[7])
-                    except ValueError:
-                        print("Errore nel parsing dei valori di impedenza.")
+            if FEED_ROW_PATTERN.match(line):
+                values = line.split()
+                try:
+                    impedance = complex(float(values[6]), float(values[7]))
+                except (IndexError, ValueError):
+                    # numbers printed without separating blanks
+                    values = NUMBER_PATTERN.findall(line)
+                    impedance = complex(float(values[6]), float(values[7])) if len(values) >= 8 else None
+                if impedance is not None:
+                    record = record or new_record()
+                    record[1] = impedance
                 inside_impedance_section = False
 
-        if inside_radiation_section:
-            match = re.search(r"\s+[-+]?\d+\.\d+\s+[-+]?\d+\.\d+\s+[-+]?\d+\.\d+\s+([-+]?\d+\.\d+)\s+[-+]?\d+\.\d+", line)
-            if match:
-                total_gain = float(match.group(1))
-                if total_gain > max_gain_db:
-                    max_gain_db = total_gain
+                if not need_pattern and num_frequencies is not None:
+                    if sum(1 for rec in records if rec[1] is not None) >= num_frequencies:
+                        break
 
-    return real_impedance, imag_impedance, max_gain_db
+    records = [rec for rec in records if rec[0] is not None] or records
+    frequencies = [rec[0] for rec in records]
+    impedance = [rec[1] if rec[1] is not None else complex("nan") for rec in records]
+    max_gain = [rec[2] for rec in records]
+    gains = None if summary_only else [np.asarray(rec[3], dtype=float) for rec in records]
+    return NecResult(frequencies, impedance, max_gain, gains)
+
+def read_nec_output(output_file, per_frequency=False, far_field='full', pattern_step=5):
+    """Parse feed impedance and max gain from a NEC output file.
+
+    By default returns (real_impedance, imag_impedance, max_gain_db). With
+    per_frequency=True, returns (frequencies, real, imag, gain) lists with one
+    entry per frequency of a stepped FR sweep. far_field and pattern_step
+    name the RP cut of the deck (see pattern_cut); the gain is its peak.
+    """
+    if far_field == 'full':
+        return result_as_lists(parse_nec_output(output_file, summary_only=True), per_frequency)
+    return result_as_lists(parse_nec_output(output_file).far_field(far_field, pattern_step), per_frequency)
+
+def result_as_lists(result, per_frequency=True):
+    """The read_nec_output tuples of a NecResult."""
+    complete = ~np.isnan(result.impedance.real)
+    if per_frequency:
+        return (result.frequencies[complete].tolist(),
+                result.impedance.real[complete].tolist(),
+                result.impedance.imag[complete].tolist(),
+                result.max_gain[complete].tolist())
+
+    max_gain_db = float(np.max(result.max_gain)) if len(result) else -999.99
+    if not complete.any():
+        return None, None, max_gain_db
+    last = np.flatnonzero(complete)[-1]
+    return float(result.impedance[last].real), float(result.impedance[last].imag), max_gain_db
+
+def read_nec_batch_output(output_file, count):
+    """Split the output of an NX-chained batch deck back into its structures.
+
+    Returns a list of count (frequencies, real, imag, gain) tuples; structures
+    missing from the output are None.
+    """
+    return [result_as_lists(result) if result is not None else None
+            for result in read_nec_batch_results(output_file, count)]
+
+def read_nec_batch_results(output_file, count, summary_only=True, num_frequencies=None):
+    """NecResult of every structure of an NX-chained batch deck (None if missing from the output).
+
+    num_frequencies lets each structure's parse stop after its last pattern.
+    """
+    chunks = {}
+    index = None
+    with open(output_file, "r") as file:
+        for line in file:
+            if BATCH_MARKER in line:
+                match = BATCH_PATTERN.search(line)
+                if match:
+                    index = int(match.group(1))
+                    chunks.setdefault(index, [])
+                    continue
+            if index is not None:
+                chunks[index].append(line)
+
+    return [parse_nec_stream(chunks[i], summary_only, num_frequencies) if i in chunks else None for i in range(count)]
+
+def symmetric_segments(segments):
+    """Segments per half element of a symmetric deck: the whole element gets segments, rounded up to even."""
+    return (segments + 1) // 2
+
+def nec_deck_lines(lengths, distances, frequency, segments=9, radius=0.006, comment="", pattern_step=5, far_field='full',
+                   symmetric=False):
+    """NEC cards of one Yagi, without the closing EN card (see create_nec_input).
+
+    pattern_step is the angular step, in degrees, of the RP theta cut and
+    far_field the part of the cut requested (see pattern_cut).
+
+    symmetric writes the y >= 0 half of every element and mirrors it with a
+    GX card, so NEC solves about half the unknowns. The centre feed becomes a
+    pair of 1 V sources on the two segments next to the symmetry plane (the
+    image's is -1 V, as its segments point the other way); the feed impedance
+    of the whole element is twice that of the first source.
+    """
+    frequencies = frequency if isinstance(frequency, (list, tuple)) else [frequency]
+    lines = ["CM" + (f" {comment}" if comment else ""), "CM forw: 90, 0 ; back:-90, 0", "CE"]
+    x_position = 0
+    for i in range(len(lengths)):
+        half_length = lengths[i] / 2
+        x1 = x_position
+        y1 = -half_length
+        y2 = half_length
+        if symmetric:
+            lines.append(f"GW  {i+1:<2} {symmetric_segments(segments)}   {x1:.4f} 0 0   {x1:.4f} {y2:.4f} 0   {radius}")
+        else:
+            lines.append(f"GW  {i+1:<2} {segments}   {x1:.4f} {y1:.4f} 0   {x1:.4f} {y2:.4f} 0   {radius}")
+        if i < len(distances):
+            x_position += distances[i]
+    if symmetric:
+        # reflect in the y = 0 plane; the image of tag t gets tag t + len(lengths)
+        lines.append(f"GX  {len(lengths)}  010")
+    lines.append("GE  0")
+    lines.append("GN  -1")
+    lines.append("EK")
+    if symmetric:
+        lines.append("EX  0  2  1 0  1 0")
+        lines.append(f"EX  0  {2 + len(lengths)}  1 0  -1 0")
+    else:
+        lines.append(f"EX  0  2  {segments // 2 + 1} 0  1 0")
+    if len(frequencies) == 1:
+        lines.append(f"FR  0  0  0  0  {frequencies[0]}  0")
+        lines.append("XQ")
+    else:
+        # RP repeats the whole frequency loop, so an XQ here would solve every frequency twice
+        freq_step = (frequencies[-1] - frequencies[0]) / (len(frequencies) - 1)
+        lines.append(f"FR  0  {len(frequencies)}  0  0  {frequencies[0]}  {freq_step}")
+    first, count, step = pattern_cut(far_field, pattern_step)
+    lines.append(f"RP  0  {count} 1  1000 {first} 0  {step}")
+    return lines
+
+def create_nec_input(lengths, distances, input_file, frequency, segments=9, radius=0.006, pattern_step=5, far_field='full',
+                     symmetric=False):
+    """Write a NEC input file based on lengths/distances and the chosen frequency.
+
+    frequency may also be a list of evenly spaced frequencies, written as one
+    stepped FR card so the whole sweep runs in a single solver launch.
+    """
+    with open(input_file, "w") as file:
+        for line in nec_deck_lines(lengths, distances, frequency, segments, radius, pattern_step=pattern_step,
+                                   far_field=far_field, symmetric=symmetric):
+            file.write(line + "\n")
+        file.write("EN\n")
+
+def create_nec_batch_input(geometries, input_file, frequency, segments=9, radius=0.006, pattern_step=5, far_field='full',
+                           symmetric=False):
+    """Write several Yagis, given as (lengths, distances) pairs, into one deck chained with NX cards."""
+    with open(input_file, "w") as file:
+        for index, (lengths, distances) in enumerate(geometries):
+            if index:
+                file.write("NX\n")
+            for line in nec_deck_lines(lengths, distances, frequency, segments, radius, f"{BATCH_MARKER} {index}",
+                                       pattern_step, far_field, symmetric):
+                file.write(line + "\n")
+        file.write("EN\n")
 
 def write_tmp_file(tmp_path, nec_input_path, nec_output_path):
     with open(tmp_path, 'w') as file:
@@ -110,7 +606,7 @@ def convert_to_nec(individuo):
         for line in nec_content:
             file.write(line + "\n")
 
-def convert_nec_to_inp(nec_file, inp_file, k_value):
+def convert_nec_to_inp(nec_file, inp_file, k_value, pattern_step=5, far_field='full'):
     with open(nec_file, 'r') as nec, open(inp_file, 'w') as inp:
         for line in nec:
             if "SY k=" in line or "EN" in line:
@@ -122,5 +618,14 @@ def convert_nec_to_inp(nec_file, inp_file, k_value):
 
             inp.write(line)
 
-        inp.write("RP 0 19 73 1003 -90 0 5 5\n")
+        inp.write(dual_band_rp_card(pattern_step, far_field) + "\n")
+
+def dual_band_rp_card(pattern_step=5, far_field='full'):
+    """RP card of the dual-band decks."""
+    if far_field == 'full':
+        # theta from -90 to 0 and phi all around, pattern_step degrees apart (19 x 73 at 5 degrees)
+        return f"RP 0 {90 // pattern_step + 1} {360 // pattern_step + 1} 1003 -90 0 {pattern_step} {pattern_step}"
+    # only the phi = 0 theta cut of the Yagi decks (see pattern_cut)
+    first, count, step = pattern_cut(far_field, pattern_step)
+    return f"RP 0 {count} 1 1003 {first} 0 {step} 0"
 
@@ -0,0 +1,247 @@
+# archive.py
+import json
+import sqlite3
+
+import numpy as np
+
+from optimizer.instrumentation import EVALUATION_PHASES
+
+# file extensions recognised as evaluation archives (rather than result CSVs)
+ARCHIVE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+# objective columns that can be filtered by range, in fitness order
+OBJECTIVE_COLUMNS = ("gain", "real_penalty", "imag_penalty")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    id INTEGER PRIMARY KEY,
+    run TEXT,
+    gen INTEGER,
+    lengths TEXT,
+    distances TEXT,
+    frequencies TEXT,
+    real TEXT,
+    imag TEXT,
+    gain_per_frequency TEXT,
+    gain REAL,
+    real_penalty REAL,
+    imag_penalty REAL,
+    cached INTEGER,
+    failed INTEGER,
+    time_deck REAL,
+    time_solver REAL,
+    time_parse REAL,
+    fidelity TEXT,
+    front_to_back REAL,
+    front_to_back_per_frequency TEXT,
+    impedance BLOB,
+    pattern BLOB,
+    pattern_cut TEXT,
+    settings TEXT
+);
+CREATE INDEX IF NOT EXISTS evaluations_gen ON evaluations (run, gen);
+CREATE INDEX IF NOT EXISTS evaluations_gain ON evaluations (gain);
+CREATE INDEX IF NOT EXISTS evaluations_real_penalty ON evaluations (real_penalty);
+CREATE INDEX IF NOT EXISTS evaluations_imag_penalty ON evaluations (imag_penalty);
+"""
+
+COLUMNS = ("run", "gen", "lengths", "distances", "frequencies", "real", "imag", "gain_per_frequency",
+           "gain", "real_penalty", "imag_penalty", "cached", "failed") + tuple(f"time_{phase}" for phase in EVALUATION_PHASES) + ("fidelity", "front_to_back", "front_to_back_per_frequency", "impedance", "pattern", "pattern_cut", "settings")
+
+# columns added after the first release: (name, SQL type)
+ADDED_COLUMNS = (("fidelity", "TEXT"), ("front_to_back", "REAL"), ("front_to_back_per_frequency", "TEXT"),
+                 ("impedance", "BLOB"), ("pattern", "BLOB"), ("pattern_cut", "TEXT"), ("settings", "TEXT"))
+
+# columns holding JSON lists
+LIST_COLUMNS = ("lengths", "distances", "frequencies", "real", "imag", "gain_per_frequency", "front_to_back_per_frequency")
+
+# evaluation settings that shape the raw results of a design, stored with every row
+RESULT_SETTINGS = ("backend", "segments", "radius", "pattern_step", "far_field", "front_to_back", "symmetric")
+
+# raw solver quantities stored as packed little-endian arrays
+IMPEDANCE_DTYPE = np.dtype('<c16')
+PATTERN_DTYPE = np.dtype('<f4')
+
+
+def result_settings(settings):
+    """The RESULT_SETTINGS of evaluation settings (see run_optimization), as stored in the settings column."""
+    return {name: settings.get(name) for name in RESULT_SETTINGS}
+
+
+def encode_impedance(real, imag):
+    """Per-frequency feed impedance packed as complex128 bytes."""
+    return (np.asarray(real, dtype=float) + 1j * np.asarray(imag, dtype=float)).astype(IMPEDANCE_DTYPE).tobytes()
+
+
+def decode_impedance(blob):
+    """Complex impedance array of an impedance column (empty for None)."""
+    return np.frombuffer(blob, dtype=IMPEDANCE_DTYPE).astype(complex) if blob else np.zeros(0, dtype=complex)
+
+
+def encode_pattern(pattern):
+    """Gain cut (dB, one row per frequency) packed as float32 bytes."""
+    return np.asarray(pattern, dtype=float).astype(PATTERN_DTYPE).tobytes()
+
+
+def decode_pattern(blob, pattern_cut):
+    """(frequencies, thetas) gain array of a pattern column, or None if none was stored."""
+    if not blob or not pattern_cut:
+        return None
+    return np.frombuffer(blob, dtype=PATTERN_DTYPE).astype(float).reshape(-1, int(pattern_cut[1]))
+
+
+class EvaluationArchive:
+    """Append-only SQLite archive of every evaluated design.
+
+    Records are buffered in memory and written buffer_size at a time with a
+    single executemany, so the evaluation loop never waits on the disk for
+    each design.
+    """
+
+    def __init__(self, db_path, run, buffer_size=200):
+        self.run = run
+        self.buffer_size = buffer_size
+        self.buffer = []
+        # islands append to the same file from several processes
+        self.db = sqlite3.connect(db_path, timeout=30)
+        self.db.executescript(SCHEMA)
+        # older archives lack the added columns; their rows read as full fidelity without front-to-back
+        existing = {row[1] for row in self.db.execute("PRAGMA table_info(evaluations)")}
+        for column, column_type in ADDED_COLUMNS:
+            if column not in existing:
+                self.db.execute(f"ALTER TABLE evaluations ADD COLUMN {column} {column_type}")
+        self.db.commit()
+
+    def append(self, gen, lengths, distances, results, fitness, cached, timings, fidelity='full', settings=None):
+        """Queue one evaluation: geometry, raw results (None on failure), fitness, phase timings and fidelity.
+
+        settings are the evaluation settings the results were simulated with;
+        their result_settings go into the settings column.
+
+        The feed impedance is stored packed in the impedance column (the JSON
+        real/imag columns of older rows are left empty), and the gain cut in
+        the pattern column when the results hold one. The front-to-back
+        columns are filled when fitness has the fourth objective.
+        """
+        results = results or {'frequencies': [], 'real': [], 'imag': [], 'gain': []}
+        pattern = results.get('pattern')
+        self.buffer.append((
+            self.run, gen, json.dumps(list(lengths)), json.dumps(list(distances)),
+            json.dumps(results['frequencies']), None, None, json.dumps(results['gain']),
+            fitness[0], fitness[1], fitness[2], int(cached), int(not results['frequencies']),
+        ) + tuple(timings.get(phase, 0.0) for phase in EVALUATION_PHASES) + (
+            fidelity, fitness[3] if len(fitness) > 3 else None, json.dumps(results.get('front_to_back', [])),
+            encode_impedance(results['real'], results['imag']),
+            encode_pattern(pattern) if pattern is not None else None,
+            json.dumps(results['pattern_cut']) if pattern is not None else None,
+            json.dumps(result_settings(settings)) if settings is not None else None,
+        ))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            placeholders = ", ".join("?" * len(COLUMNS))
+            self.db.executemany(f"INSERT INTO evaluations ({', '.join(COLUMNS)}) VALUES ({placeholders})", self.buffer)
+            self.db.commit()
+            self.buffer = []
+
+    def last_row(self):
+        """Id of the last row of this run written so far (0 if none), after flushing the buffer."""
+        self.flush()
+        return self.db.execute("SELECT COALESCE(MAX(id), 0) FROM evaluations WHERE run = ?", (self.run,)).fetchone()[0]
+
+    def truncate(self, last_row):
+        """Delete the rows of this run written after row last_row, e.g. after the checkpoint a run resumes from."""
+        self.buffer = []
+        self.db.execute("DELETE FROM evaluations WHERE run = ? AND id > ?", (self.run, last_row))
+        self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.flush()
+            self.db.close()
+            self.db = None
+
+
+def query_archive(db_path, generation=None, run=None, gain_range=None, real_penalty_range=None,
+                  imag_penalty_range=None, include_failed=False, columns=None, limit=None, fidelity=None):
+    """Rows of the archive as dicts, filtered in SQL so only the matching rows are read.
+
+    generation is a generation number or a (first, last) pair; run defaults to
+    the latest run in the file. The *_range arguments are (low, high) pairs,
+    either end may be None. fidelity ('coarse' or 'full') keeps only the rows
+    simulated at that fidelity. columns restricts the returned columns.
+
+    real, imag and impedance read the same from old (JSON) and packed rows;
+    impedance is returned as a complex array, pattern as a (frequencies,
+    thetas) array (None when not stored), pattern_cut as (first theta,
+    count, step) and settings as a dict (None for rows written before it).
+    """
+    db = sqlite3.connect(db_path)
+    try:
+        if run is None:
+            row = db.execute("SELECT run FROM evaluations ORDER BY id DESC LIMIT 1").fetchone()
+            if row is None:
+                return []
+            run = row[0]
+
+        conditions = ["run = ?"]
+        params = [run]
+        if generation is not None:
+            first, last = generation if isinstance(generation, (tuple, list)) else (generation, generation)
+            conditions.append("gen BETWEEN ? AND ?")
+            params += [first, last]
+        for column, value_range in zip(OBJECTIVE_COLUMNS, (gain_range, real_penalty_range, imag_penalty_range)):
+            low, high = value_range or (None, None)
+            if low is not None:
+                conditions.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                conditions.append(f"{column} <= ?")
+                params.append(high)
+        if not include_failed:
+            conditions.append("failed = 0")
+        if fidelity is not None:
+            conditions.append("COALESCE(fidelity, 'full') = ?")
+            params.append(fidelity)
+
+        selected = [column for column in columns if column in COLUMNS] if columns else list(COLUMNS)
+        # what is needed to unpack the requested columns, dropped again from the rows
+        helpers = []
+        if ("real" in selected or "imag" in selected) and "impedance" not in selected:
+            helpers.append("impedance")
+        if "impedance" in selected:
+            helpers += [column for column in ("real", "imag") if column not in selected]
+        if "pattern" in selected and "pattern_cut" not in selected:
+            helpers.append("pattern_cut")
+        sql = f"SELECT {', '.join(selected + helpers)} FROM evaluations WHERE {' AND '.join(conditions)} ORDER BY id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        rows = []
+        for values in db.execute(sql, params):
+            row = dict(zip(selected + helpers, values))
+            impedance = decode_impedance(row.get("impedance"))
+            packed = {"real": impedance.real.tolist(), "imag": impedance.imag.tolist()}
+            for column in LIST_COLUMNS:
+                if column in row:
+                    row[column] = json.loads(row[column]) if row[column] is not None else packed.get(column, [])
+            if "impedance" in row and row["impedance"] is None:
+                # rows written before the packed column
+                impedance = np.asarray(row["real"], dtype=float) + 1j * np.asarray(row["imag"], dtype=float)
+            pattern_cut = json.loads(row["pattern_cut"]) if row.get("pattern_cut") else None
+            if "pattern" in row:
+                row["pattern"] = decode_pattern(row["pattern"], pattern_cut)
+            if "impedance" in row:
+                row["impedance"] = impedance
+            if "pattern_cut" in row:
+                row["pattern_cut"] = tuple(pattern_cut) if pattern_cut else None
+            if row.get("settings") is not None:
+                row["settings"] = json.loads(row["settings"])
+            for column in helpers:
+                del row[column]
+            rows.append(row)
+        return rows
+    finally:
+        db.close()
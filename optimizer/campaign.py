@@ -0,0 +1,272 @@
+# campaign.py
+"""Headless campaigns: many optimization runs from one job file, no GUI.
+
+    python -m optimizer.campaign jobs.ini [--output DIR] [--workers N] [--concurrent M]
+
+The job file is INI. [Campaign] holds the campaign settings, every other
+section is a job: mode (single or sweep) and config overrides written as
+Section.key = value. Alternatives separated by | expand into one job per
+combination, and [DEFAULT] keys apply to every job:
+
+    [Campaign]
+    config = config.ini
+    output_dir = campaign
+    workers = 8
+    concurrent_jobs = 4
+
+    [DEFAULT]
+    GeneticAlgorithm.num_generations = 20
+
+    [yagi]
+    mode = single | sweep
+    GeneticAlgorithm.num_elements = 3 | 4 | 5 | 6 | 7 | 8 | 9
+
+The base config is never written. Each job gets a directory under
+output_dir, holding its config (the base config plus its overrides), its
+results CSV and its checkpoint, archive and profiling files when those are
+enabled. A summary.csv lists every job with its best design.
+
+The jobs run concurrently in threads and send their batches to one process
+pool (or, with [Distributed] enabled in the base config, to the distributed
+workers), so one job's selection and breeding overlap the others' solver
+calls. They share one evaluation cache.
+"""
+import argparse
+import configparser
+import csv
+import itertools
+import multiprocessing
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from optimizer import evaluation, genetic_optimizer
+from optimizer.distributed import Coordinator
+from optimizer.eval_cache import EvaluationCache
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# per-run files of the base config, moved into each job's directory when enabled
+JOB_FILES = (('Checkpoint', 'file'), ('Archive', 'db_file'),
+             ('Profiling', 'report_json'), ('Profiling', 'report_csv'), ('Profiling', 'cprofile_file'))
+
+
+class SharedPool:
+    """A process pool with the run_jobs method of distributed.Coordinator, shared by the jobs of a campaign."""
+
+    def __init__(self, processes, scratch_dir, input_file, output_file, tmp_file):
+        self.pool = multiprocessing.Pool(processes, initializer=evaluation.init_worker,
+                                         initargs=(scratch_dir, input_file, output_file, tmp_file))
+
+    def run_jobs(self, jobs):
+        """Results of (genomes, frequencies, settings) jobs, in order; the pool runs them in submission order."""
+        pending = [self.pool.apply_async(evaluation.simulate_batch_timed, (genomes, settings, frequencies))
+                   for genomes, frequencies, settings in jobs]
+        return [result.get() for result in pending]
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+
+class TakeTurns:
+    """The campaign's evaluator: the jobs run their Python code one at a time, their solver calls together.
+
+    run_optimization draws from the module-level random generator. A job
+    holds the turn (lock) while it runs and gives it up only while its
+    batches are being solved, with its random state set aside, so it draws
+    the same numbers as the same run on its own.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.lock = threading.Lock()
+
+    def run_jobs(self, jobs):
+        state = random.getstate()
+        self.lock.release()
+        try:
+            return self.workers.run_jobs(jobs)
+        finally:
+            self.lock.acquire()
+            random.setstate(state)
+
+
+def expand_jobs(job_config):
+    """(name, mode, {(section, key): value}) of every job in a parsed job file."""
+    jobs = []
+    for section in job_config.sections():
+        if section == 'Campaign':
+            continue
+        entries = dict(job_config[section])
+        mode_choices = [choice.strip() for choice in entries.pop('mode', 'single').split('|')]
+        keys = []
+        choices = []
+        for option, value in entries.items():
+            if '.' not in option:
+                raise ValueError(f"Job [{section}]: '{option}' is not a Section.key override")
+            keys.append(tuple(option.split('.', 1)))
+            choices.append([choice.strip() for choice in value.split('|')])
+        for mode in mode_choices:
+            if mode not in ('single', 'sweep'):
+                raise ValueError(f"Job [{section}]: unknown mode '{mode}', expected single or sweep")
+            for combination in itertools.product(*choices):
+                # varying values name the job, e.g. yagi_sweep_num_elements-5
+                parts = [section] + ([mode] if len(mode_choices) > 1 else [])
+                parts += [f"{key}-{value}" for (_, key), value, options in zip(keys, combination, choices) if len(options) > 1]
+                jobs.append((re.sub(r'[^\w.-]', '_', "_".join(parts)), mode, dict(zip(keys, combination))))
+    names = [name for name, _, _ in jobs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate job names: {', '.join(duplicates)}")
+    return jobs
+
+
+def write_job_config(base_config_path, job_dir, overrides):
+    """Write the base config plus overrides into job_dir and return its path.
+
+    The results CSV and the enabled per-run files go into job_dir; the jobs
+    evaluate on the campaign's workers, so distributed evaluation is off.
+    """
+    config = configparser.ConfigParser(interpolation=None)
+    config.read(base_config_path)
+    for (section, key), value in overrides.items():
+        if not config.has_section(section):
+            config.add_section(section)
+        config.set(section, key, value)
+    config.set('Output', 'csv_output_file', os.path.join(job_dir, 'results.csv'))
+    for section, key in JOB_FILES:
+        name = config.get(section, key, fallback='')
+        if name:
+            config.set(section, key, os.path.join(job_dir, os.path.basename(name)))
+    if config.has_section('Distributed'):
+        config.set('Distributed', 'enabled', 'False')
+    path = os.path.join(job_dir, 'config.ini')
+    with open(path, 'w') as file:
+        config.write(file)
+    return path
+
+
+def run_job(name, mode, config_path, turns, cache):
+    """Run one job on its turn; returns its summary row (a failed job records its error)."""
+    row = {'job': name, 'mode': mode, 'status': 'failed', 'seconds': 0.0}
+    with turns.lock:
+        print(f"Campaign: starting {name}")
+        start = time.perf_counter()
+        try:
+            _, _, hall_of_fame = genetic_optimizer.run_optimization(
+                mode, config_path=config_path, evaluator=turns, shared_cache=cache)
+        except Exception as exc:
+            row['error'] = repr(exc)
+            print(f"Campaign: {name} failed: {exc!r}")
+            return row
+        finally:
+            row['seconds'] = round(time.perf_counter() - start, 1)
+    best = hall_of_fame[0].fitness.values if len(hall_of_fame) else ()
+    row.update(status='done', best_gain=best[0] if best else None, best_real_penalty=best[1] if best else None,
+               best_imag_penalty=best[2] if best else None,
+               best_design=" ".join(f"{gene:.4f}" for gene in hall_of_fame[0]) if best else "")
+    print(f"Campaign: {name} done in {row['seconds']} s")
+    return row
+
+
+def run_campaign(job_file, output_dir=None, workers=None, concurrent_jobs=None):
+    """Run every job of job_file (see the module docstring) and write summary.csv.
+
+    output_dir, workers and concurrent_jobs override [Campaign]. Returns the
+    summary rows, one per job, in job file order.
+    """
+    job_config = configparser.ConfigParser(interpolation=None)
+    # keep the case of override keys such as GeneticAlgorithm.num_elements
+    job_config.optionxform = str
+    if not job_config.read(job_file):
+        raise FileNotFoundError(job_file)
+    campaign = job_config['Campaign'] if job_config.has_section('Campaign') else {}
+    job_dir_of = os.path.dirname(os.path.abspath(job_file))
+
+    def job_file_path(name):
+        return name if os.path.isabs(name) else os.path.join(job_dir_of, name)
+
+    base_config_path = job_file_path(campaign.get('config', os.path.join(BASE_DIR, 'config.ini')))
+    output_dir = os.path.abspath(output_dir or job_file_path(campaign.get('output_dir', 'campaign')))
+    base = configparser.ConfigParser(interpolation=None)
+    if not base.read(base_config_path):
+        raise FileNotFoundError(base_config_path)
+    workers = workers or int(campaign.get('workers', 0)) or base.getint('Parallel', 'num_workers', fallback=1)
+    concurrent_jobs = concurrent_jobs or int(campaign.get('concurrent_jobs', 0)) or workers
+
+    jobs = expand_jobs(job_config)
+    # DEAP's creator holds one fitness class per process, so every job needs the same objectives
+    objectives = {overrides.get(('FarField', 'front_to_back_objective'),
+                                base.get('FarField', 'front_to_back_objective', fallback='False')).strip().lower()
+                  for _, _, overrides in jobs}
+    if len(objectives) > 1:
+        raise ValueError("All jobs of a campaign must agree on [FarField] front_to_back_objective")
+
+    config_paths = {}
+    for name, _, overrides in jobs:
+        job_dir = os.path.join(output_dir, name)
+        os.makedirs(job_dir, exist_ok=True)
+        config_paths[name] = write_job_config(base_config_path, job_dir, overrides)
+
+    # --- one set of workers and one evaluation cache for every job ---
+    if base.getboolean('Distributed', 'enabled', fallback=False):
+        pool = Coordinator(base.get('Distributed', 'host', fallback='127.0.0.1'), base.getint('Distributed', 'port', fallback=5050),
+                           base.getfloat('Distributed', 'heartbeat_timeout', fallback=10.0),
+                           base.get('Distributed', 'token', fallback='')).start()
+    else:
+        pool = SharedPool(workers, os.path.join(BASE_DIR, base.get('Parallel', 'scratch_dir', fallback='scratch')),
+                          base['Paths']['main_input_file'], base['Paths']['main_output_file'], base['Paths']['tmp_file'])
+    cache = None
+    if base.getboolean('Cache', 'enabled', fallback=True):
+        cache_db_file = base.get('Cache', 'db_file', fallback='')
+        cache = EvaluationCache(base.getint('Cache', 'max_entries', fallback=10000),
+                                (cache_db_file if os.path.isabs(cache_db_file) else os.path.join(BASE_DIR, cache_db_file))
+                                if cache_db_file else None)
+    turns = TakeTurns(pool)
+
+    print(f"Campaign: {len(jobs)} jobs, {concurrent_jobs} at a time, on {workers} workers")
+    try:
+        with ThreadPoolExecutor(max_workers=concurrent_jobs) as executor:
+            futures = [executor.submit(run_job, name, mode, config_paths[name], turns, cache) for name, mode, _ in jobs]
+            rows = [future.result() for future in futures]
+    finally:
+        pool.close()
+        if cache is not None:
+            cache.close()
+
+    for row, (name, _, overrides) in zip(rows, jobs):
+        row['overrides'] = "; ".join(f"{section}.{key}={value}" for (section, key), value in overrides.items())
+        row['results'] = os.path.join(output_dir, name, 'results.csv') if row['status'] == 'done' else ""
+    write_summary(os.path.join(output_dir, 'summary.csv'), rows)
+    failed = sum(1 for row in rows if row['status'] != 'done')
+    print(f"Campaign finished: {len(rows) - failed} jobs done, {failed} failed. Summary: {os.path.join(output_dir, 'summary.csv')}")
+    return rows
+
+
+def write_summary(path, rows):
+    fields = ['job', 'mode', 'overrides', 'status', 'seconds', 'best_gain', 'best_real_penalty',
+              'best_imag_penalty', 'best_design', 'results', 'error']
+    with open(path, mode='w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({field: row.get(field, "") for field in fields})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("job_file", help="INI job file")
+    parser.add_argument("--output", help="output directory (overrides [Campaign] output_dir)")
+    parser.add_argument("--workers", type=int, help="solver processes shared by the jobs (overrides [Campaign] workers)")
+    parser.add_argument("--concurrent", type=int, help="jobs in progress at once (overrides [Campaign] concurrent_jobs)")
+    args = parser.parse_args()
+    rows = run_campaign(args.job_file, args.output, args.workers, args.concurrent)
+    raise SystemExit(1 if any(row['status'] != 'done' for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# checkpoint.py
+"""Periodic snapshots of a GA run, so an interrupted run can be resumed.
+
+A checkpoint is a pickled dict. Individuals are stored as plain
+(genes, fitness values) pairs, so the file does not depend on the DEAP
+creator classes of the process that wrote it.
+"""
+import os
+import pickle
+import tempfile
+
+
+def individuals_to_data(individuals):
+    """Plain (genes, fitness values) pairs of DEAP individuals."""
+    return [(list(ind), tuple(ind.fitness.values)) for ind in individuals]
+
+
+def individuals_from_data(data, factory):
+    """Rebuild individuals with factory (e.g. creator.Individual) and restore their fitness."""
+    individuals = []
+    for genes, values in data:
+        ind = factory(genes)
+        if values:
+            ind.fitness.values = values
+        individuals.append(ind)
+    return individuals
+
+
+def save_checkpoint(path, state):
+    """Write state to path atomically: a crash mid-write leaves the previous checkpoint intact."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_checkpoint(path):
+    with open(path, "rb") as file:
+        return pickle.load(file)
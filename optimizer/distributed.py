@@ -0,0 +1,355 @@
+# distributed.py
+"""Evaluation jobs over a TCP queue: one coordinator, any number of workers.
+
+With enabled = True in [Distributed], run_optimization starts a Coordinator
+and sends every batch of designs it would hand to its process pool to the
+connected workers instead. A job holds the genomes, the frequencies and the
+evaluation settings (fidelity included: coarse jobs carry the coarse
+segments and pattern step). Workers, possibly on other hosts, solve it with
+the configured backend in their own scratch directory and send back the raw
+results, which the optimizer then merges into its evaluation cache as usual.
+
+Messages are JSON objects, one per line:
+
+    worker -> coordinator  {"type": "hello", "worker": name, "capacity": 1, "token": token}
+                           {"type": "heartbeat"}
+                           {"type": "result", "job": id, "results": [...], "timings": {...}}
+    coordinator -> worker  {"type": "job", "job": id, "token": token, "genomes": [...], "frequencies": [...], "settings": {...}}
+
+Both ends share a token ([Distributed] token): the coordinator drops a
+connection whose hello does not carry it, and a worker disconnects from a
+coordinator whose jobs do not. Results are merged into the evaluation cache,
+so only trusted workers may deliver them. The token is not encryption;
+beyond a trusted network, tunnel the port (e.g. over SSH). Workers solve
+with their own [Solver] launcher and command, not the ones in the job,
+unless started with --trust-coordinator-solver.
+
+Workers send a heartbeat every few seconds, busy or idle. A worker that
+disconnects or stays silent for heartbeat_timeout seconds is dropped and its
+unfinished jobs go back to the front of the queue for another worker; a
+late result of a reassigned job is ignored.
+
+Start workers with
+
+    DISTRIBUTED_TOKEN=<token> python -m optimizer.distributed --host <coordinator> --port 5050 --processes 4
+"""
+import argparse
+import configparser
+import hmac
+import itertools
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing import Process
+
+from optimizer import evaluation
+
+
+class Connection:
+    """One end of a JSON-lines socket; send is safe from several threads."""
+
+    def __init__(self, sock, name):
+        self.sock = sock
+        self.name = name
+        self.capacity = 1
+        self.authenticated = False
+        self.jobs = set()
+        self.last_seen = time.monotonic()
+        self.send_lock = threading.Lock()
+
+    def send(self, message):
+        with self.send_lock:
+            self.sock.sendall((json.dumps(message) + "\n").encode())
+
+    def messages(self):
+        """Messages received until the peer closes the connection."""
+        for line in self.sock.makefile("r", encoding="utf-8"):
+            if line.strip():
+                yield json.loads(line)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class Coordinator:
+    """Hands evaluation jobs to connected workers and collects their results."""
+
+    def __init__(self, host='127.0.0.1', port=5050, heartbeat_timeout=10.0, token=''):
+        if not token:
+            raise ValueError("Distributed evaluation needs a shared token: set [Distributed] token")
+        self.token = token
+        self.host = host
+        self.port = port
+        self.heartbeat_timeout = heartbeat_timeout
+        self.condition = threading.Condition()
+        self.ids = itertools.count()
+        self.jobs = {}
+        self.queue = deque()
+        self.results = {}
+        self.workers = []
+        self.server = None
+        self.closed = False
+        self.stats = {'jobs_sent': 0, 'jobs_reassigned': 0, 'workers_lost': 0}
+
+    def start(self):
+        """Listen on host:port; port 0 picks a free port (see self.port)."""
+        self.server = socket.create_server((self.host, self.port))
+        self.port = self.server.getsockname()[1]
+        self.server.settimeout(0.5)
+        for target in (self._accept, self._monitor):
+            threading.Thread(target=target, daemon=True).start()
+        print(f"Coordinator listening on {self.host}:{self.port}")
+        return self
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            workers = list(self.workers)
+            self.condition.notify_all()
+        for worker in workers:
+            worker.close()
+        if self.server is not None:
+            self.server.close()
+
+    def run_jobs(self, jobs):
+        """Results of (genomes, frequencies, settings) jobs, in order, once workers have solved them all.
+
+        Each result is (results list, phase timings), like simulate_batch_timed.
+        """
+        with self.condition:
+            ids = []
+            for genomes, frequencies, settings in jobs:
+                job = next(self.ids)
+                self.jobs[job] = {'type': 'job', 'job': job, 'token': self.token, 'genomes': [list(genome) for genome in genomes],
+                                  'frequencies': list(frequencies), 'settings': settings}
+                self.queue.append(job)
+                ids.append(job)
+            self._dispatch()
+            warned = False
+            while not all(job in self.results for job in ids):
+                if self.closed:
+                    raise RuntimeError("Coordinator closed with jobs outstanding")
+                if not self.workers and not warned:
+                    print(f"Waiting for workers on {self.host}:{self.port}")
+                    warned = True
+                self.condition.wait(1.0)
+            outcomes = []
+            for job in ids:
+                results, timings = self.results.pop(job)
+                del self.jobs[job]
+                outcomes.append((results, timings))
+            return outcomes
+
+    # --- internals (the lock is held where noted) ---
+    def _accept(self):
+        while not self.closed:
+            try:
+                sock, address = self.server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # a peer gets heartbeat_timeout seconds to say hello
+            sock.settimeout(self.heartbeat_timeout)
+            worker = Connection(sock, f"{address[0]}:{address[1]}")
+            threading.Thread(target=self._serve, args=(worker,), daemon=True).start()
+
+    def _serve(self, worker):
+        try:
+            for message in worker.messages():
+                if not worker.authenticated:
+                    if message['type'] != 'hello' or not hmac.compare_digest(str(message.get('token', '')), self.token):
+                        print(f"Rejected worker {worker.name}: wrong token")
+                        break
+                    worker.sock.settimeout(None)
+                    with self.condition:
+                        worker.authenticated = True
+                        worker.name = message.get('worker', worker.name)
+                        worker.capacity = max(1, int(message.get('capacity', 1)))
+                        worker.last_seen = time.monotonic()
+                        self.workers.append(worker)
+                        self._dispatch()
+                    continue
+                with self.condition:
+                    worker.last_seen = time.monotonic()
+                    if message['type'] == 'result':
+                        job = message['job']
+                        worker.jobs.discard(job)
+                        if job in self.jobs and job not in self.results:
+                            self.results[job] = (message['results'], message.get('timings', {}))
+                            self.condition.notify_all()
+                    self._dispatch()
+        except (OSError, ValueError, KeyError):
+            pass
+        finally:
+            self._drop(worker)
+
+    def _drop(self, worker):
+        with self.condition:
+            if worker not in self.workers:
+                worker.close()
+                return
+            self.workers.remove(worker)
+            lost = [job for job in worker.jobs if job in self.jobs and job not in self.results]
+            worker.jobs.clear()
+            if not self.closed:
+                self.stats['workers_lost'] += 1
+                self.stats['jobs_reassigned'] += len(lost)
+                if lost:
+                    print(f"Worker {worker.name} lost, reassigning {len(lost)} jobs")
+            self.queue.extendleft(reversed(lost))
+            self._dispatch()
+            self.condition.notify_all()
+        worker.close()
+
+    def _dispatch(self):
+        """Send queued jobs to workers with free capacity (lock held)."""
+        for worker in list(self.workers):
+            while self.queue and len(worker.jobs) < worker.capacity:
+                job = self.queue.popleft()
+                if job not in self.jobs or job in self.results:
+                    continue
+                try:
+                    worker.send(self.jobs[job])
+                except OSError:
+                    # the worker's reader thread notices the broken connection and drops it
+                    self.queue.appendleft(job)
+                    break
+                worker.jobs.add(job)
+                self.stats['jobs_sent'] += 1
+
+    def _monitor(self):
+        while not self.closed:
+            time.sleep(min(1.0, self.heartbeat_timeout / 4))
+            with self.condition:
+                silent = [worker for worker in self.workers
+                          if time.monotonic() - worker.last_seen > self.heartbeat_timeout]
+            for worker in silent:
+                print(f"Worker {worker.name} missed its heartbeats")
+                self._drop(worker)
+
+
+def local_solver(config_path=None, launcher=None, command=None):
+    """The launcher, solver_command and solver_timeout settings of this host's config."""
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = configparser.ConfigParser()
+    config.read(os.path.abspath(config_path or os.path.join(base_dir, 'config.ini')))
+    return {
+        'launcher': launcher or config.get('Solver', 'launcher', fallback='powershell'),
+        'solver_command': command or config.get('Solver', 'command', fallback='nec2c -i {input} -o {output}'),
+        'solver_timeout': config.getfloat('Solver', 'timeout', fallback=0) or None,
+    }
+
+
+def run_worker(host, port, token, scratch_dir='scratch', name=None, heartbeat_interval=2.0, reconnect_delay=2.0,
+               solver=None, once=False):
+    """Connect to a coordinator and solve its jobs until it goes away.
+
+    The worker reconnects every reconnect_delay seconds, so it serves one
+    run after the other, unless once is set. solver (see local_solver)
+    replaces the launcher, command and timeout sent by the coordinator;
+    None runs the coordinator's.
+    """
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        try:
+            sock = socket.create_connection((host, port))
+        except OSError:
+            if once:
+                raise
+            time.sleep(reconnect_delay)
+            continue
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = Connection(sock, f"{host}:{port}")
+        stopped = threading.Event()
+
+        def heartbeat():
+            while not stopped.wait(heartbeat_interval):
+                try:
+                    connection.send({'type': 'heartbeat'})
+                except OSError:
+                    break
+
+        threading.Thread(target=heartbeat, daemon=True).start()
+        try:
+            connection.send({'type': 'hello', 'worker': name, 'capacity': 1, 'token': token})
+            for job in connection.messages():
+                if not hmac.compare_digest(str(job.get('token', '')), token):
+                    print(f"Coordinator {host}:{port} sent a job without the token, disconnecting")
+                    break
+                settings = dict(job['settings'])
+                if solver is not None:
+                    settings.update(solver)
+                if evaluation.worker_paths is None:
+                    paths = settings['paths']
+                    evaluation.init_worker(scratch_dir, os.path.basename(paths['input']),
+                                           os.path.basename(paths['output']), paths['tmp'])
+                try:
+                    results, timings = evaluation.simulate_batch_timed(job['genomes'], settings, job['frequencies'])
+                except Exception as exc:
+                    print(f"Job {job['job']} failed: {exc}")
+                    results, timings = [None] * len(job['genomes']), {}
+                connection.send({'type': 'result', 'job': job['job'], 'results': results, 'timings': timings})
+        except (OSError, ValueError):
+            pass
+        finally:
+            stopped.set()
+            connection.close()
+        if once:
+            return
+        time.sleep(reconnect_delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="coordinator host")
+    parser.add_argument("--port", type=int, default=5050, help="coordinator port ([Distributed] port)")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes (one solver each)")
+    parser.add_argument("--scratch", default="scratch", help="directory for the workers' scratch directories")
+    parser.add_argument("--heartbeat", type=float, default=2.0, help="seconds between heartbeats")
+    parser.add_argument("--token", default=os.environ.get("DISTRIBUTED_TOKEN"),
+                        help="shared token ([Distributed] token; default: the DISTRIBUTED_TOKEN variable)")
+    parser.add_argument("--config", help="config file of the local [Solver] settings (default: the project's config.ini)")
+    parser.add_argument("--launcher", help="override the local [Solver] launcher")
+    parser.add_argument("--command", help="override the local [Solver] command")
+    parser.add_argument("--trust-coordinator-solver", action="store_true",
+                        help="run the launcher and command sent by the coordinator instead of the local ones")
+    parser.add_argument("--once", action="store_true", help="exit when the coordinator closes instead of reconnecting")
+    args = parser.parse_args()
+    if not args.token:
+        parser.error("a shared token is required: --token or DISTRIBUTED_TOKEN")
+
+    solver = None if args.trust_coordinator_solver else local_solver(args.config, args.launcher, args.command)
+    options = dict(scratch_dir=os.path.abspath(args.scratch), heartbeat_interval=args.heartbeat,
+                   solver=solver, once=args.once)
+    if args.processes <= 1:
+        run_worker(args.host, args.port, args.token, **options)
+        return
+    processes = [Process(target=run_worker, args=(args.host, args.port, args.token), kwargs=options)
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    # stopping the parent (Ctrl-C or kill) stops its workers too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,219 @@
-from NEC_tools import *
-import re
-import matplotlib.pyplot as plt
-import pandas as pd
+# dual_band_optimizer.py
+"""Dual-band placement: sweep the offset k of a deck template.
+
+The template is a 4nec2-style .nec file whose GW cards place wires at
+'<number>+k' / '<number>-k' (its 'SY k=' line is dropped). It is parsed once;
+every k then gets its deck rendered in memory and solved in a private scratch
+directory, several k at a time when num_workers > 1.
+
+The sweep is adaptive: a coarse grid of coarse_points values over
+[k_start, k_stop] first, then, round after round, bisection of every
+interval where the feed reactance changes sign (a resonance) and a
+golden-section step in every bracket around a gain peak, until the
+brackets are narrower than resolution or max_evaluations is spent.
+
+Nothing is read at import time: load_sweep_settings reads config.ini, and
+run_k_sweep works on the plain settings dict it returns.
+"""
 import os
+import re
 import configparser
+import multiprocessing
 
-config = configparser.ConfigParser()
-config.read(CONFIG_PATH)
-
-# Config
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-CONFIG_PATH = os.path.join(BASE_DIR, '..', 'config.ini')
-INP_DIR = os.path.join(BASE_DIR, '..', config['Paths']['input_dir'])
-OUT_DIR = os.path.join(BASE_DIR, '..', config['Paths']['output_dir'])
-main_input_file = config['Paths']['main_input_file']
-main_output_file = config['Paths']['main_output_file']
-
-# Params
-k_start = float(config['Simulation']['k_start'])
-k_stop = float(config['Simulation']['k_stop'])
-k_step = float(config['Simulation']['k_step'])
-
-def update_nec_input(k_value):
-    input_file_path = os.path.join(INP_DIR, main_input_file)
-    
-    with open(input_file_path, "r") as file:
-        lines = file.readlines()
-
-    with open(input_file_path, "w") as file:
-        for line in lines:
-            if "k" in line:
-                line = re.sub(r'k=([-+]?\d*\.\d+|\d+)', f'k={k_value}', line)
-            file.write(line)
+import numpy as np
 
-def main():
-    k_values = [round(k, 2) for k in frange(k_start, k_stop, k_step)]
-    results = []
+from optimizer.NEC_tools import make_launcher, read_nec_output, write_tmp_file, dual_band_rp_card
 
-    for k in k_values:
-        print(f"Simulating k={k}...")
-        update_nec_input(k)
+# a coordinate that moves with k, e.g. 0.52+k or -1.2-k
+K_TERM_PATTERN = re.compile(r'([+-]?\d*\.\d+|\d+)([+-])k')
+# golden-section ratio: the new point sits this fraction into the larger half of a bracket
+GOLDEN = (3 - 5 ** 0.5) / 2
 
-        nec_file_path = os.path.join(INP_DIR, main_input_file)
-        inp_file_path = os.path.join(INP_DIR, main_input_file.replace('.nec', '.inp'))
-        convert_nec_to_inp(nec_file_path, inp_file_path, k)
 
-        stdout, stderr = run_nec2dxs1k5()
+class DeckTemplate:
+    """A .nec template parsed into literal text and k-dependent coordinates."""
 
-        out_file_path = os.path.join(OUT_DIR, main_output_file)
-        real_imp, imag_imp, max_gain = read_nec_output(out_file_path)
+    def __init__(self, lines):
+        self.parts = []
+        for line in lines:
+            if "SY k=" in line or line.strip().upper() == "EN":
+                continue
+            if not line.lstrip().upper().startswith("GW"):
+                self.parts.append(line.rstrip("\n"))
+                continue
+            parts = []
+            position = 0
+            for match in K_TERM_PATTERN.finditer(line):
+                parts.append(line[position:match.start()])
+                parts.append((float(match.group(1)), 1.0 if match.group(2) == "+" else -1.0))
+                position = match.end()
+            parts.append(line[position:].rstrip("\n"))
+            self.parts.append(parts)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r") as file:
+            return cls(file.readlines())
+
+    def render(self, k, pattern_step=5, far_field='full'):
+        """Deck text with every k-term evaluated, closed by the RP and EN cards."""
+        lines = []
+        for part in self.parts:
+            if isinstance(part, str):
+                lines.append(part)
+            else:
+                lines.append("".join(piece if isinstance(piece, str) else f"{piece[0] + piece[1] * k:.4f}" for piece in part))
+        lines.append(dual_band_rp_card(pattern_step, far_field))
+        lines.append("EN")
+        return "\n".join(lines) + "\n"
+
+
+def load_sweep_settings(config_path=None):
+    """Plain settings of a k sweep, read from config_path (default: the project's config.ini)."""
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = configparser.ConfigParser()
+    config.read(os.path.abspath(config_path or os.path.join(base_dir, 'config.ini')))
+
+    def project_path(name):
+        return name if os.path.isabs(name) else os.path.join(base_dir, name)
+
+    return {
+        'template': os.path.join(project_path(config['Paths']['input_dir']), config['Paths']['main_input_file']),
+        'output_file': config['Paths']['main_output_file'],
+        'tmp_file': config['Paths']['tmp_file'],
+        'scratch_dir': project_path(config.get('Parallel', 'scratch_dir', fallback='scratch')),
+        'num_workers': config.getint('Parallel', 'num_workers', fallback=1),
+        'k_start': config.getfloat('Simulation', 'k_start', fallback=-1.0),
+        'k_stop': config.getfloat('Simulation', 'k_stop', fallback=1.0),
+        # the uniform step of the old sweep is now the resolution the refinement stops at
+        'resolution': config.getfloat('Simulation', 'k_step', fallback=0.05),
+        'coarse_points': config.getint('DualBand', 'coarse_points', fallback=9),
+        'max_evaluations': config.getint('DualBand', 'max_evaluations', fallback=40),
+        'far_field': config.get('FarField', 'mode', fallback='full'),
+        'pattern_step': 5,
+        'launcher': config.get('Solver', 'launcher', fallback='powershell'),
+        'solver_command': config.get('Solver', 'command', fallback='nec2c -i {input} -o {output}'),
+        'solver_timeout': config.getfloat('Solver', 'timeout', fallback=0) or None,
+    }
+
+
+def simulate_k(task):
+    """Solve one (k, deck text, settings) task in this process's scratch directory.
+
+    Returns {'k', 'real_impedance', 'imag_impedance', 'max_gain_db'}, with
+    None values if the solver failed.
+    """
+    k, deck, settings = task
+    work_dir = os.path.join(settings['scratch_dir'], f"dual_band_{os.getpid()}")
+    os.makedirs(work_dir, exist_ok=True)
+    paths = {
+        'work_dir': work_dir,
+        'input': os.path.join(work_dir, "dual_band.nec"),
+        'output': os.path.join(work_dir, settings['output_file']),
+        'tmp': os.path.join(work_dir, os.path.basename(settings['tmp_file'])),
+    }
+    write_tmp_file(paths['tmp'], paths['input'], paths['output'])
+    with open(paths['input'], "w") as file:
+        file.write(deck)
+    if os.path.exists(paths['output']):
+        os.remove(paths['output'])
+
+    row = {'k': k, 'real_impedance': None, 'imag_impedance': None, 'max_gain_db': None}
+    launch = make_launcher(settings['launcher'], settings['solver_command'], settings['solver_timeout']).run(paths)
+    if launch.failed or not os.path.exists(paths['output']):
+        return row
+    real, imag, gain = read_nec_output(paths['output'], far_field=settings['far_field'], pattern_step=settings['pattern_step'])
+    if real is not None:
+        row.update(real_impedance=real, imag_impedance=imag, max_gain_db=gain)
+    return row
+
+
+def reactance_brackets(rows):
+    """(k_low, k_high) intervals between neighbouring solved k where the reactance changes sign."""
+    solved = [row for row in rows if row['imag_impedance'] is not None]
+    return [(a['k'], b['k']) for a, b in zip(solved, solved[1:])
+            if np.sign(a['imag_impedance']) != np.sign(b['imag_impedance'])]
+
+
+def gain_brackets(rows):
+    """(k_left, k_best, k_right) around every local gain maximum of the solved k."""
+    solved = [row for row in rows if row['max_gain_db'] is not None]
+    return [(a['k'], b['k'], c['k']) for a, b, c in zip(solved, solved[1:], solved[2:])
+            if b['max_gain_db'] > a['max_gain_db'] and b['max_gain_db'] >= c['max_gain_db']]
+
+
+def golden_point(left, best, right):
+    """Next golden-section probe: into the larger side of the bracket."""
+    if right - best >= best - left:
+        return best + GOLDEN * (right - best)
+    return best - GOLDEN * (best - left)
+
+
+def run_k_sweep(settings, template=None, progress_callback=None):
+    """Adaptive k sweep (see the module docstring).
+
+    template defaults to the DeckTemplate of settings['template'].
+    Returns (rows sorted by k, resonances, peaks): resonances are the k where
+    the reactance crosses zero, interpolated in the final bracket; peaks are
+    (k, gain) of the refined gain maxima.
+    """
+    template = template or DeckTemplate.from_file(settings['template'])
+    resolution = settings['resolution']
+    budget = settings['max_evaluations']
+    results = {}
+
+    pool = multiprocessing.Pool(settings['num_workers']) if settings['num_workers'] > 1 else None
+    mapper = pool.map if pool is not None else map
+
+    def solve(ks):
+        ks = [k for k in dict.fromkeys(round(k, 9) for k in ks) if k not in results][:budget - len(results)]
+        tasks = [(k, template.render(k, settings['pattern_step'], settings['far_field']), settings) for k in ks]
+        for row in mapper(simulate_k, tasks):
+            results[row['k']] = row
+        if progress_callback:
+            progress_callback(len(results) / float(budget))
+        return ks
+
+    def rows():
+        return [results[k] for k in sorted(results)]
+
+    try:
+        solve(np.linspace(settings['k_start'], settings['k_stop'], max(2, settings['coarse_points'])).tolist())
+        while len(results) < budget:
+            # one new point per open bracket and round, all solved together
+            probes = [(low + high) / 2 for low, high in reactance_brackets(rows()) if high - low > resolution]
+            probes += [golden_point(*bracket) for bracket in gain_brackets(rows()) if bracket[2] - bracket[0] > resolution]
+            if not solve(probes):
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    final = rows()
+    resonances = []
+    for low, high in reactance_brackets(final):
+        x_low, x_high = results[low]['imag_impedance'], results[high]['imag_impedance']
+        resonances.append(low + (high - low) * x_low / (x_low - x_high))
+    peaks = [(best, results[best]['max_gain_db']) for _, best, _ in gain_brackets(final)]
+    return final, resonances, peaks
 
-        results.append({
-            'k': k,
-            'real_impedance': real_imp,
-            'imag_impedance': imag_imp,
-            'max_gain_db': max_gain
-        })
 
-    df = pd.DataFrame(results)
+def main():
+    import matplotlib.pyplot as plt
+    import pandas as pd
+
+    settings = load_sweep_settings()
+    rows, resonances, peaks = run_k_sweep(settings)
+
+    df = pd.DataFrame(rows)
     print(df)
+    print("Resonances (reactance = 0) at k =", ", ".join(f"{k:.4f}" for k in resonances) or "none")
+    print("Gain peaks:", ", ".join(f"k={k:.4f} ({gain:.2f} dB)" for k, gain in peaks) or "none")
 
     plt.figure()
-    plt.plot(df['k'], df['real_impedance'], label='real_impedance')
-    plt.plot(df['k'], df['imag_impedance'], label='imag_impedance', color='r', linestyle='--')
+    plt.plot(df['k'], df['real_impedance'], marker='.', label='real_impedance')
+    plt.plot(df['k'], df['imag_impedance'], marker='.', label='imag_impedance', color='r', linestyle='--')
     plt.xlabel('k')
     plt.ylabel('Impedance (Ohm)')
     plt.title('Impedance vs k')
@@ -70,7 +221,7 @@ def main():
     plt.legend()
 
     plt.figure()
-    plt.plot(df['k'], df['max_gain_db'], label='Max gain (dB)', color='orange')
+    plt.plot(df['k'], df['max_gain_db'], marker='.', label='Max gain (dB)', color='orange')
     plt.xlabel('k')
     plt.ylabel('Max gain (dB)')
     plt.title('Max gain vs k')
@@ -79,10 +230,5 @@ def main():
 
     plt.show()
 
-def frange(start, stop, step):
-    while start <= stop:
-        yield round(start, 2)
-        start += step
-
 if __name__ == "__main__":
     main()
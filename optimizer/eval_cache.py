@@ -0,0 +1,105 @@
+# eval_cache.py
+import json
+import sqlite3
+from collections import OrderedDict
+
+
+def make_cache_key(individual, num_elements, frequencies, segments, radius, pattern_step=5, far_field='full',
+                   front_to_back=False, symmetric=False, keep_pattern=False, backend='nec'):
+    """Key an individual on the geometry exactly as create_nec_input writes it.
+
+    segments and pattern_step set the fidelity of the simulation, so results
+    at different fidelities never share a key. far_field and front_to_back
+    set which far-field directions were sampled and whether the results hold
+    the front-to-back ratio; symmetric marks the half-element model and
+    keep_pattern results that hold the whole gain cut. backend names the
+    solver ([Solver] backend): NEC and the MoM solver give slightly
+    different results for the same design, so they never share a key.
+    """
+    lengths = individual[:num_elements]
+    distances = individual[num_elements:]
+
+    wires = []
+    x_position = 0
+    for i in range(len(lengths)):
+        wires.append(f"{x_position:.4f},{lengths[i] / 2:.4f}")
+        if i < len(distances):
+            x_position += distances[i]
+
+    freqs = ",".join(str(freq) for freq in frequencies)
+    key = f"{';'.join(wires)}|{freqs}|{segments}|{radius}"
+    # the default pattern keeps the keys of caches written before pattern_step existed
+    if pattern_step != 5:
+        key += f"|{pattern_step}"
+    if far_field != 'full':
+        key += f"|{far_field}"
+    if front_to_back:
+        key += "|front_to_back"
+    if symmetric:
+        key += "|symmetric"
+    if keep_pattern:
+        key += "|pattern"
+    return f"{key}|{backend}"
+
+
+class EvaluationCache:
+    """LRU cache of raw solver results, optionally backed by a SQLite file.
+
+    Values are the per-frequency results returned by simulate_individual, so a
+    cached design can be re-scored after the objectives change. The cache may
+    be used from several threads as long as they take turns (see campaign.py).
+    """
+
+    def __init__(self, max_entries=10000, db_path=None):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self.db = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get(self, key):
+        """Return the stored results for key, or None on a miss."""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        if self.db is not None:
+            row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.hits += 1
+                value = json.loads(row[0])
+                self._remember(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Store results for key (failed simulations are never cached)."""
+        if value is None:
+            return
+        self._remember(key, value)
+        if self.db is not None:
+            self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?)", (key, json.dumps(value)))
+
+    def flush(self):
+        """Commit pending writes to the on-disk store."""
+        if self.db is not None:
+            self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
@@ -0,0 +1,399 @@
+# evaluation.py
+"""Fitness evaluation: from individuals to solver results and back.
+
+The functions at the top run wherever designs are solved: in the optimizer
+process, in pool workers (init_worker gives each its own scratch directory)
+and in distributed workers. EvaluationPipeline runs in the optimizer
+process. It checks feasibility, looks designs up in the evaluation cache,
+sends the rest to the solver in batches and records every evaluation
+(timing records and archive rows) before assigning the fitness.
+"""
+import os
+from functools import partial
+
+from optimizer.NEC_tools import write_tmp_file
+from optimizer.solver_backends import get_backend
+from optimizer.eval_cache import make_cache_key
+from optimizer.local_search import dominates
+from optimizer.feasibility import feasibility_problems, repair_genes
+from optimizer.scheduler import EvaluationScheduler
+from optimizer.instrumentation import EVALUATION_PHASES, PhaseTimer
+
+# --- Scratch paths of this process (set by init_worker inside pool workers) ---
+worker_paths = None
+
+def make_scratch_paths(scratch_dir, input_file, output_file, tmp_file):
+    """Create a scratch directory holding its own deck, output and tmp file."""
+    os.makedirs(scratch_dir, exist_ok=True)
+    paths = {
+        'work_dir': scratch_dir,
+        'input': os.path.join(scratch_dir, input_file),
+        'output': os.path.join(scratch_dir, output_file),
+        'tmp': os.path.join(scratch_dir, os.path.basename(tmp_file)),
+    }
+    write_tmp_file(paths['tmp'], paths['input'], paths['output'])
+    return paths
+
+def init_worker(scratch_root, input_file, output_file, tmp_file):
+    """Pool initializer: give each worker process a private scratch directory."""
+    global worker_paths
+    scratch_dir = os.path.join(scratch_root, f"worker_{os.getpid()}")
+    worker_paths = make_scratch_paths(scratch_dir, input_file, output_file, tmp_file)
+
+def simulate_individual(individual, settings, frequencies):
+    """Raw solver results of one individual: impedance and max gain per frequency.
+
+    Returns None if the simulation fails.
+    """
+    return simulate_batch([individual], settings, frequencies)[0]
+
+def simulate_batch(individuals, settings, frequencies, timer=None):
+    """Raw solver results of several individuals in one call to the solver backend.
+
+    Returns one results dict (or None on failure) per individual.
+    """
+    paths = worker_paths or settings['paths']
+    num_elements = settings['num_elements']
+    geometries = [(ind[:num_elements], ind[num_elements:]) for ind in individuals]
+    return get_backend(settings['backend']).solve(geometries, frequencies, settings, paths, timer)
+
+def simulate_batch_timed(individuals, settings, frequencies):
+    """simulate_batch plus the seconds spent per phase (deck, solver, parse).
+
+    Used through the pool's map, so the timings of pool workers reach the parent.
+    """
+    timer = PhaseTimer()
+    results = simulate_batch(individuals, settings, frequencies, timer)
+    return results, dict(timer.totals)
+
+def fitness_from_results(results, target_real_impedance, front_to_back=False):
+    """Average gain and impedance penalties over the simulated frequencies.
+
+    With front_to_back the average front-to-back ratio (dB) is added as a
+    fourth objective; results that do not hold it score -1000 on it. A
+    failed simulation gets the worst value of every objective.
+    """
+    if results is None:
+        return (-1000.0, 1000.0, 1000.0, -1000.0) if front_to_back else (-1000.0, 1000.0, 1000.0)
+
+    total_gain = 0.0
+    total_real_penalty = 0.0
+    total_imag_penalty = 0.0
+
+    for real_impedance, imag_impedance, max_gain_db in zip(results['real'], results['imag'], results['gain']):
+        total_gain += max_gain_db
+        total_real_penalty += abs(real_impedance - target_real_impedance)
+        total_imag_penalty += abs(imag_impedance)
+
+    count = len(results['frequencies'])
+    fitness = float(total_gain / count), float(total_real_penalty / count), float(total_imag_penalty / count)
+    if front_to_back:
+        ratios = results.get('front_to_back')
+        fitness += (float(sum(ratios) / len(ratios)) if ratios else -1000.0,)
+    return fitness
+
+def evaluate_single(individual, settings):
+    """Fitness of one individual at the central frequency."""
+    results = simulate_individual(individual, settings, [settings['frequency']])
+    return fitness_from_results(results, settings['target_real_impedance'], settings.get('front_to_back', False))
+
+def evaluate_sweep(individual, settings):
+    """Fitness of one individual averaged over the frequency sweep."""
+    results = simulate_individual(individual, settings, settings['frequencies'])
+    return fitness_from_results(results, settings['target_real_impedance'], settings.get('front_to_back', False))
+
+
+class EvaluationPipeline:
+    """Assigns the fitness of a run's individuals.
+
+    settings are the evaluation settings of run_optimization (sent to the
+    workers as they are) and coarse_settings those of the coarse fidelity.
+    frequencies are those of the evaluation mode. Batches of batch_size
+    designs go to map_function (map or a pool's map) or, if remote is given,
+    to its run_jobs method (distributed.Coordinator, the campaign's shared
+    pool). cache (EvaluationCache) and archive (EvaluationArchive) are
+    optional.
+
+    feasibility_mode, bounds and total_distance configure the [Feasibility]
+    filter; short_circuit, max_real_penalty and gain_cap the sweep
+    short-circuit ([ShortCircuit]); weights are the objective weights.
+    """
+
+    def __init__(self, settings, coarse_settings, frequencies, bounds, weights, batch_size=1, num_workers=1,
+                 map_function=map, remote=None, cache=None, archive=None, feasibility_mode='off', total_distance=1.0,
+                 short_circuit=False, max_real_penalty=0.0, gain_cap=0.0):
+        self.settings = settings
+        self.coarse_settings = coarse_settings
+        self.frequencies = list(frequencies)
+        self.bounds = bounds
+        self.weights = weights
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.map = map_function
+        self.remote = remote
+        self.cache = cache
+        self.archive = archive
+        self.feasibility_mode = feasibility_mode
+        self.total_distance = total_distance
+        # wires closer than one diameter overlap
+        self.min_spacing = 2 * settings['radius']
+        self.short_circuit = short_circuit
+        self.max_real_penalty = max_real_penalty
+        self.gain_cap = gain_cap
+        # band centre of the short-circuit, and the number of frequencies it stands for
+        self.centre_frequency = self.frequencies[len(self.frequencies) // 2]
+        self.band_size = len(self.frequencies)
+        # non-dominated fitness values of the designs simulated over the whole band
+        self.swept_front = []
+        # genomes whose fitness is still the bound proven at the band centre
+        self.bounded = set()
+        # one record per evaluation (cached or not), for the timing report
+        self.evaluations = []
+        # set by start_scheduler for the asynchronous steady-state loop
+        self.scheduler = None
+
+    def score(self, results):
+        return fitness_from_results(results, self.settings['target_real_impedance'], self.settings['front_to_back'])
+
+    def simulate(self, genomes, coarse=False, frequencies=None):
+        """Raw results for genomes, one solver call per genome or per batch of batch_size.
+
+        frequencies defaults to those of the evaluation mode. Returns the
+        results and, per result, its share of the batch's phase timings.
+        """
+        settings = self.coarse_settings if coarse else self.settings
+        frequencies = frequencies or self.frequencies
+        size = max(1, self.batch_size)
+        if size <= 1 and get_backend(settings['backend']).vectorized:
+            # vectorized backends solve a whole share of the population at once
+            size = max(1, -(-len(genomes) // self.num_workers))
+        batches = [genomes[i:i + size] for i in range(0, len(genomes), size)]
+        if self.remote is not None:
+            # remote or shared workers: the same batches, sent as jobs with their settings
+            outcomes = self.remote.run_jobs([(batch, frequencies, settings) for batch in batches])
+        else:
+            outcomes = self.map(partial(simulate_batch_timed, settings=settings, frequencies=frequencies), batches)
+        all_results = []
+        all_timings = []
+        for results, timings in outcomes:
+            share = {name: seconds / len(results) for name, seconds in timings.items()}
+            all_results.extend(results)
+            all_timings.extend([share] * len(results))
+        return all_results, all_timings
+
+    def record(self, gen, genomes, results_list, timings_list, cached, fidelity='full'):
+        """Append per-evaluation records (and archive rows) and return their summed counters and timings."""
+        num_elements = self.settings['num_elements']
+        totals = {'solver_calls': 0, 'solver_failures': 0}
+        totals.update({f"time_{phase}": 0.0 for phase in EVALUATION_PHASES})
+        for genome, results, timings in zip(genomes, results_list, timings_list):
+            entry = {'gen': gen, 'cached': cached, 'failed': results is None}
+            entry.update({f"time_{phase}": timings.get(phase, 0.0) for phase in EVALUATION_PHASES})
+            self.evaluations.append(entry)
+            if self.archive is not None:
+                self.archive.append(gen, genome[:num_elements], genome[num_elements:], results, self.score(results),
+                                    cached, timings, fidelity, self.coarse_settings if fidelity == 'coarse' else self.settings)
+            if not cached:
+                totals['solver_calls'] += 1
+                totals['solver_failures'] += results is None
+                for phase in EVALUATION_PHASES:
+                    totals[f"time_{phase}"] += entry[f"time_{phase}"]
+        return totals
+
+    def cache_key(self, genome, frequencies, coarse=False):
+        settings = self.coarse_settings if coarse else self.settings
+        return make_cache_key(genome, settings['num_elements'], frequencies, settings['segments'], settings['radius'],
+                              settings['pattern_step'], settings['far_field'], settings['front_to_back'],
+                              self.settings['symmetric'], settings['keep_pattern'], settings['backend'])
+
+    def resolve(self, genomes, frequencies, coarse, gen, fidelity):
+        """Raw results of genomes at frequencies, from the cache or the solver.
+
+        Records the evaluations and returns the results (one per genome) and
+        their statistics: cache hits and misses, solver calls and failures,
+        and the seconds spent per evaluation phase.
+        """
+        cache = self.cache
+        if cache is None:
+            results_list, timings_list = self.simulate(genomes, coarse, frequencies)
+            stats = self.record(gen, genomes, results_list, timings_list, False, fidelity)
+            return results_list, dict(cache_hits=0, cache_misses=0, **stats)
+
+        hits_before, misses_before = cache.hits, cache.misses
+        keys = [self.cache_key(genome, frequencies, coarse) for genome in genomes]
+        known = {}
+        pending = {}
+        from_cache = {}
+        for key, genome in zip(keys, genomes):
+            if key in known or key in pending:
+                cache.hits += 1
+                continue
+            results = cache.get(key)
+            if results is None:
+                pending[key] = genome
+            else:
+                known[key] = results
+                from_cache[key] = genome
+
+        results_list, timings_list = self.simulate(list(pending.values()), coarse, frequencies)
+        for key, results in zip(pending, results_list):
+            cache.put(key, results)
+            known[key] = results
+        cache.flush()
+
+        self.record(gen, list(from_cache.values()), [known[key] for key in from_cache], [{}] * len(from_cache), True, fidelity)
+        stats = self.record(gen, list(pending.values()), results_list, timings_list, False, fidelity)
+        return [known[key] for key in keys], dict(cache_hits=cache.hits - hits_before, cache_misses=cache.misses - misses_before, **stats)
+
+    def update_swept_front(self, values):
+        for new in values:
+            if any(dominates(old, new, self.weights) or old == new for old in self.swept_front):
+                continue
+            self.swept_front[:] = [old for old in self.swept_front if not dominates(new, old, self.weights)] + [new]
+
+    def centre_bound(self, centre_fitness):
+        """The best band-average fitness a design can still reach, given its fitness at the band centre.
+
+        The other frequencies can only add to the penalties, so the band
+        averages are at least the centre's share of them; the average gain is
+        at most the centre's share plus gain_cap for every other frequency
+        (with gain_cap 0, the centre gain stands in for it). A front-to-back
+        ratio keeps its centre value.
+        """
+        gain, real_penalty, imag_penalty = centre_fitness[:3]
+        band_size = self.band_size
+        if self.gain_cap > 0:
+            gain = (gain + (band_size - 1) * self.gain_cap) / band_size
+        return (gain, real_penalty / band_size, imag_penalty / band_size) + tuple(centre_fitness[3:])
+
+    def hopeless(self, bound):
+        """True if a design with this centre_bound provably exceeds max_real_penalty or is dominated.
+
+        Dominance is tested against designs simulated over the whole band.
+        """
+        if self.max_real_penalty > 0 and bound[1] > self.max_real_penalty:
+            return True
+        if self.gain_cap <= 0 or self.settings['front_to_back']:
+            return False
+        return any(dominates(values, bound, self.weights) for values in self.swept_front)
+
+    def feasible(self, individuals, stats):
+        """The individuals that may reach the solver: infeasible ones are repaired or rejected ([Feasibility]).
+
+        Rejected individuals get the failure fitness; stats counts
+        infeasible_repaired and infeasible_rejected.
+        """
+        num_elements = self.settings['num_elements']
+        checks = (self.bounds, num_elements, self.total_distance, self.min_spacing)
+        candidates = []
+        for ind in individuals:
+            if self.feasibility_mode != 'off' and feasibility_problems(ind, *checks):
+                if self.feasibility_mode == 'repair':
+                    ind[:] = repair_genes(ind, *checks)
+                if self.feasibility_mode == 'reject' or feasibility_problems(ind, *checks):
+                    ind.fitness.values = self.score(None)
+                    stats['infeasible_rejected'] = stats.get('infeasible_rejected', 0) + 1
+                    continue
+                stats['infeasible_repaired'] = stats.get('infeasible_repaired', 0) + 1
+            candidates.append(ind)
+        return candidates
+
+    def evaluate(self, individuals, gen=0, coarse=False):
+        """Evaluate individuals through the cache and the solver, assigning their fitness.
+
+        coarse selects the coarse fidelity of a multi-fidelity run. Infeasible
+        geometries are repaired or rejected first ([Feasibility]). With the
+        sweep short-circuit, designs are simulated at the band centre first and
+        only those that may still satisfy max_real_penalty, and are not
+        provably dominated, get the whole sweep; the others keep their
+        centre_bound as fitness (see sweep_bounded).
+        Returns the statistics of this batch: cache hits and misses, solver
+        calls and failures, seconds spent per evaluation phase, repaired and
+        rejected designs and skipped sweep calls.
+        """
+        fidelity = 'coarse' if coarse else 'full'
+        stats = {'infeasible_repaired': 0, 'infeasible_rejected': 0, 'sweep_calls_skipped': 0}
+        candidates = self.feasible(individuals, stats)
+
+        def add(batch_stats):
+            for name, value in batch_stats.items():
+                stats[name] = stats.get(name, 0) + value
+
+        if self.short_circuit and self.band_size > 1 and candidates:
+            centre_results, centre_stats = self.resolve([list(ind) for ind in candidates], [self.centre_frequency],
+                                                        coarse, gen, fidelity)
+            add(centre_stats)
+            survivors = []
+            for ind, results in zip(candidates, centre_results):
+                if results is None:
+                    ind.fitness.values = self.score(None)
+                    stats['sweep_calls_skipped'] += 1
+                    continue
+                bound = self.centre_bound(self.score(results))
+                if self.hopeless(bound):
+                    ind.fitness.values = bound
+                    self.bounded.add(tuple(ind))
+                    stats['sweep_calls_skipped'] += 1
+                else:
+                    survivors.append(ind)
+            candidates = survivors
+
+        results_list, batch_stats = self.resolve([list(ind) for ind in candidates], self.frequencies, coarse, gen, fidelity)
+        add(batch_stats)
+        for ind, results in zip(candidates, results_list):
+            ind.fitness.values = self.score(results)
+            self.bounded.discard(tuple(ind))
+        if self.short_circuit:
+            self.update_swept_front([ind.fitness.values for ind, results in zip(candidates, results_list) if results is not None])
+        return stats
+
+    def sweep_bounded(self, individuals, gen):
+        """Simulate the whole band for the individuals whose fitness is still a centre_bound.
+
+        Used before a run reports its designs, so every reported fitness is a
+        band average. Returns the solver calls spent.
+        """
+        pending = [ind for ind in individuals if tuple(ind) in self.bounded]
+        results_list, stats = self.resolve([list(ind) for ind in pending], self.frequencies, False, gen, 'full')
+        for ind, results in zip(pending, results_list):
+            ind.fitness.values = self.score(results)
+            self.bounded.discard(tuple(ind))
+        return stats['solver_calls']
+
+    def start_scheduler(self, slot_paths, timeout=None, retries=2, backoff=0.5):
+        """Solve single designs on an EvaluationScheduler, one slot per scratch paths of slot_paths."""
+        backend = get_backend(self.settings['backend'])
+        num_elements = self.settings['num_elements']
+
+        async def solve_in_slot(genome, slot, timer):
+            geometry = (genome[:num_elements], genome[num_elements:])
+            results = await backend.solve_async([geometry], self.frequencies, self.settings, slot_paths[slot], timer)
+            return results[0]
+
+        self.scheduler = EvaluationScheduler(solve_in_slot, len(slot_paths), timeout, retries, backoff)
+        return self.scheduler
+
+    async def evaluate_async(self, ind, gen, stats):
+        """Assign the fitness of one individual through the feasibility filter, the cache and the scheduler.
+
+        stats collects the counters of the evaluation.
+        """
+        if not self.feasible([ind], stats):
+            return ind
+        genome = list(ind)
+        key = None
+        results = None
+        if self.cache is not None:
+            key = self.cache_key(genome, self.frequencies)
+            results = self.cache.get(key)
+        if results is not None:
+            self.record(gen, [genome], [results], [{}], True)
+        else:
+            results, timings = await self.scheduler.evaluate(genome)
+            if self.cache is not None:
+                self.cache.put(key, results)
+                self.cache.flush()
+            for name, value in self.record(gen, [genome], [results], [timings], False).items():
+                stats[name] = stats.get(name, 0) + value
+        ind.fitness.values = self.score(results)
+        return ind
@@ -0,0 +1,39 @@
+# feasibility.py
+"""Geometry checks run before a design reaches the solver.
+
+cxBlend does not clip, so offspring can leave the gene bounds; distances can
+then overrun total_distance, and two elements closer than a wire diameter
+overlap. Such designs are repaired (clipped into the bounds, distances
+widened to the minimum spacing and scaled down to total_distance) or
+rejected, without a solver call.
+"""
+import numpy as np
+
+FEASIBILITY_MODES = ('off', 'repair', 'reject')
+
+
+def feasibility_problems(genes, bounds, num_elements, total_distance, min_spacing):
+    """Names of the constraints the genes violate (empty if the design is feasible)."""
+    genes = np.asarray(genes, dtype=float)
+    distances = genes[num_elements:]
+    problems = []
+    if np.any(genes < bounds.low - 1e-9) or np.any(genes > bounds.high + 1e-9):
+        problems.append("out_of_bounds")
+    if distances.sum() > total_distance + 1e-9:
+        problems.append("total_distance")
+    if np.any(distances <= min_spacing):
+        problems.append("overlap")
+    return problems
+
+
+def repair_genes(genes, bounds, num_elements, total_distance, min_spacing):
+    """Genes clipped into the bounds, with the unlocked distances made feasible."""
+    genes = bounds.clip(np.asarray(genes, dtype=float))
+    free = ~bounds.locked[num_elements:]
+    distances = genes[num_elements:]
+    distances[free] = np.maximum(distances[free], min_spacing * 1.01)
+    excess = distances.sum() - total_distance
+    if excess > 0 and distances[free].sum() > 0:
+        distances[free] *= max(0.0, 1.0 - excess / distances[free].sum())
+    genes[num_elements:] = distances
+    return genes.tolist()
@@ -3,10 +3,32 @@ import random
 import os
 import csv
 import configparser
+import asyncio
+import multiprocessing
+import cProfile
+import time
+from datetime import datetime
 from functools import partial
+import numpy as np
 from deap import base, creator, tools, algorithms
 
-from optimizer.NEC_tools import run_nec2dxs1k5, read_nec_output, write_tmp_file
+from optimizer.NEC_tools import FAR_FIELD_MODES, write_tmp_file
+from optimizer.solver_backends import get_backend, check_symmetry
+from optimizer.surrogate import RBFSurrogate, prescreen
+from optimizer.population import GeneBounds, init_population_array, vary_array
+from optimizer.warm_start import seed_designs
+from optimizer.eval_cache import EvaluationCache
+from optimizer.archive import EvaluationArchive
+from optimizer.checkpoint import individuals_to_data, individuals_from_data, save_checkpoint, load_checkpoint
+from optimizer.islands import run_islands
+from optimizer.local_search import refine_population
+from optimizer.feasibility import FEASIBILITY_MODES
+from optimizer.scheduler import steady_state_nsga2
+from optimizer.distributed import Coordinator
+from optimizer.evaluation import (
+    EvaluationPipeline, make_scratch_paths, init_worker, evaluate_single, evaluate_sweep
+)
+from optimizer.instrumentation import PhaseTimer, write_timing_report
 
 def init_individual(num_elements, min_length, max_length, total_distance, lock_lengths, lock_distances):
     """Create a single individual (list of lengths + distances)."""
@@ -28,39 +50,136 @@ def make_custom_mutate(num_elements, min_length, max_length, total_distance, loc
         return individual,
     return custom_mutate
 
-def create_nec_input(lengths, distances, input_file, frequency):
-    """Write a NEC input file based on lengths/distances and the chosen frequency."""
-    with open(input_file, "w") as file:
-        file.write("CM\n")
-        file.write("CM forw: 90, 0 ; back:-90, 0\n")
-        file.write("CE\n")
-        x_position = 0
-        for i in range(len(lengths)):
-            half_length = lengths[i] / 2
-            x1 = x_position
-            y1 = -half_length
-            y2 = half_length
-            file.write(f"GW  {i+1:<2} 9   {x1:.4f} {y1:.4f} 0   {x1:.4f} {y2:.4f} 0   0.006\n")
-            if i < len(distances):
-                x_position += distances[i]
-        file.write("GE  0\n")
-        file.write("GN  -1\n")
-        file.write("EK\n")
-        file.write("EX  0  2  5 0  1 0\n")
-        file.write(f"FR  0  0  0  0  {frequency}  0\n")
-        file.write("XQ\n")
-        file.write("RP  0  73 1  1000 -180 0  5\n")
-        file.write("EN\n")
-
-def run_optimization(mode='single', progress_callback=None):
+def vary_population(rng, population, crossover_probability, mutation_probability, bounds):
+    """varAnd on the population as one array (vectorized = True); unchanged children keep their fitness."""
+    children, changed = vary_array(rng, np.array(population, dtype=float), crossover_probability,
+                                   mutation_probability, mutation_probability, bounds)
+    offspring = []
+    for parent, genome, was_changed in zip(population, children.tolist(), changed):
+        child = creator.Individual(genome)
+        if not was_changed:
+            child.fitness.values = parent.fitness.values
+        offspring.append(child)
+    return offspring
+
+def train_surrogate(surrogate, individuals):
+    """Add the successfully evaluated individuals to the surrogate's samples (if there is a surrogate)."""
+    if surrogate is not None:
+        evaluated = [ind for ind in individuals if ind.fitness.values[1] < 1000.0]
+        surrogate.add(evaluated, [ind.fitness.values for ind in evaluated])
+
+def screen_offspring(surrogate, offspring, eval_fraction, exploration_fraction):
+    """Drop the offspring the surrogate predicts to be unpromising.
+
+    Returns the offspring to keep and the number of solver calls saved.
+    """
+    invalid = [ind for ind in offspring if not ind.fitness.valid]
+    if surrogate is None or not surrogate.ready or not invalid:
+        return offspring, 0
+    predictions = surrogate.predict([list(ind) for ind in invalid])
+    chosen = set(prescreen(predictions, creator.FitnessMulti.weights, eval_fraction, exploration_fraction))
+    rejected = {id(ind) for i, ind in enumerate(invalid) if i not in chosen}
+    return [ind for ind in offspring if id(ind) not in rejected], len(rejected)
+
+def upgrade_fidelity(population, hall_of_fame, pipeline, surrogate, gen):
+    """Re-evaluate a coarse-fidelity population at full fidelity.
+
+    Coarse and full objective values are not comparable, so the hall of
+    fame and the surrogate restart from the re-evaluated population.
+    Returns the solver calls spent.
+    """
+    for ind in population:
+        del ind.fitness.values
+    pipeline.swept_front.clear()
+    upgrade_stats = pipeline.evaluate(population, gen)
+    hall_of_fame.clear()
+    hall_of_fame.update(population)
+    if surrogate is not None:
+        surrogate.genomes, surrogate.objectives = [], []
+        train_surrogate(surrogate, population)
+    print("Fidelity upgrade (gen {}): {} solver calls".format(gen, upgrade_stats['solver_calls']))
+    return upgrade_stats['solver_calls']
+
+async def run_steady_state(population, hall_of_fame, logbook, stats, pipeline, breed, mu, lambda_, budget,
+                           progress_callback=None):
+    """Evaluate the initial population, then evolve it one offspring at a time ([Async] enabled).
+
+    breed(population) returns new offspring; pipeline must have a scheduler
+    (EvaluationPipeline.start_scheduler). Every lambda_ completed
+    evaluations form one logbook record (gen counts those windows), and
+    progress_callback gets the fraction of the budget done.
+    """
+    cache = pipeline.cache
+    scheduler = pipeline.scheduler
+    # counters of the current logbook window
+    window_stats = {}
+    await asyncio.gather(*(pipeline.evaluate_async(ind, 0, window_stats) for ind in population if not ind.fitness.valid))
+    population[:] = tools.selNSGA2(population, mu)
+    hall_of_fame.update(population)
+
+    done = 0
+    window_start = time.perf_counter()
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    window_stats.clear()
+
+    def on_result(ind, completed):
+        nonlocal done, window_start, hits, misses
+        done = completed
+        hall_of_fame.update([ind])
+        if completed % lambda_ == 0 or completed == budget:
+            if cache is not None:
+                window_stats.update(cache_hits=cache.hits - hits, cache_misses=cache.misses - misses)
+                hits, misses = cache.hits, cache.misses
+            logbook.record(gen=-(-completed // lambda_), evaluations=completed, **window_stats, **scheduler.stats,
+                           time_window=time.perf_counter() - window_start, **stats.compile(population))
+            window_stats.clear()
+            scheduler.stats = dict.fromkeys(scheduler.stats, 0)
+            window_start = time.perf_counter()
+        if progress_callback:
+            try:
+                progress_callback(completed / float(budget))
+            except Exception:
+                pass
+
+    await steady_state_nsga2(population, breed, lambda ind: pipeline.evaluate_async(ind, done // lambda_ + 1, window_stats),
+                             tools.selNSGA2, budget, scheduler.slots, on_result)
+
+def island_path(path, island):
+    """path with an _island<i> suffix, so islands don't share per-run files."""
+    if path is None or island is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_island{island.index}{ext}"
+
+def write_results_csv(csv_path, population, num_elements):
+    header = [f"Length{i+1}" for i in range(num_elements)] + [f"Distance{i+1}" for i in range(max(0, num_elements - 1))] + ["Max Gain (dB)", "Real Impedance Penalty", "Imaginary Impedance Penalty"]
+    if population and len(population[0].fitness.values) > 3:
+        header.append("Front-to-Back (dB)")
+    with open(csv_path, "w", newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(header)
+        for ind in population:
+            lengths = ind[:num_elements]
+            distances = ind[num_elements:]
+            fitness = ind.fitness.values
+            writer.writerow(list(lengths) + list(distances) + list(fitness))
+
+def run_optimization(mode='single', progress_callback=None, config_path=None, resume=False, island=None,
+                     evaluator=None, shared_cache=None):
     """
     Run the GA optimizer.
     mode: 'single' or 'sweep'
     progress_callback: optional function(progress_float_between_0_and_1)
+    config_path: optional config file to use instead of the project's config.ini
+    resume: continue from the checkpoint file ([Checkpoint] file) of an earlier run
+    island: set by run_islands inside each island process ([Islands] count > 1)
+    evaluator: object with the run_jobs method of distributed.Coordinator that solves
+               the batches instead of a process pool (the campaign runner's shared pool)
+    shared_cache: EvaluationCache used instead of this run's own, left open at the end
     """
 
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    CONFIG_PATH = os.path.join(BASE_DIR, 'config.ini')
+    CONFIG_PATH = config_path or os.path.join(BASE_DIR, 'config.ini')
     CONFIG_PATH = os.path.abspath(CONFIG_PATH)
 
     config = configparser.ConfigParser()
@@ -87,6 +206,12 @@ def run_optimization(mode='single', progress_callback=None):
     min_freq = float(config['Simulation'].get('min_freq', frequency))
     max_freq = float(config['Simulation'].get('max_freq', frequency))
     num_freq_steps = int(config['Simulation'].get('num_freq_steps', 1))
+    segments = int(config['Simulation'].get('segments', 9))
+    wire_radius = float(config['Simulation'].get('wire_radius', 0.006))
+    solver_backend = config.get('Solver', 'backend', fallback='nec')
+    solver_launcher = config.get('Solver', 'launcher', fallback='powershell')
+    solver_command = config.get('Solver', 'command', fallback='nec2c -i {input} -o {output}')
+    solver_timeout = config.getfloat('Solver', 'timeout', fallback=0) or None
     if num_freq_steps < 1:
         num_freq_steps = 1
 
@@ -108,13 +233,154 @@ def run_optimization(mode='single', progress_callback=None):
     total_distance = float(config['GeneticAlgorithm'].get('total_distance', 1.0))
     lock_lengths = config['GeneticAlgorithm'].getboolean('lock_lengths', False)
     lock_distances = config['GeneticAlgorithm'].getboolean('lock_distances', False)
+    vectorized = config['GeneticAlgorithm'].getboolean('vectorized', False)
+
+    # --- Parallel evaluation params ---
+    num_workers = config.getint('Parallel', 'num_workers', fallback=1)
+    batch_size = config.getint('Parallel', 'batch_size', fallback=1)
+    SCRATCH_DIR = os.path.join(BASE_DIR, config.get('Parallel', 'scratch_dir', fallback='scratch'))
+
+    # --- Evaluation cache params ---
+    cache_enabled = config.getboolean('Cache', 'enabled', fallback=True)
+    cache_max_entries = config.getint('Cache', 'max_entries', fallback=10000)
+    cache_db_file = config.get('Cache', 'db_file', fallback='')
+    cache_db_path = None
+    if cache_db_file:
+        cache_db_path = cache_db_file if os.path.isabs(cache_db_file) else os.path.join(BASE_DIR, cache_db_file)
+
+    # --- Surrogate pre-screening params ---
+    surrogate_enabled = config.getboolean('Surrogate', 'enabled', fallback=False)
+    surrogate_eval_fraction = config.getfloat('Surrogate', 'eval_fraction', fallback=0.5)
+    surrogate_exploration_fraction = config.getfloat('Surrogate', 'exploration_fraction', fallback=0.1)
+    surrogate_min_samples = config.getint('Surrogate', 'min_samples', fallback=30)
+    surrogate_max_samples = config.getint('Surrogate', 'max_samples', fallback=500)
+
+    # --- Profiling (empty file names disable the report/profile) ---
+    def profiling_path(key):
+        name = config.get('Profiling', key, fallback='')
+        if not name:
+            return None
+        return name if os.path.isabs(name) else os.path.join(BASE_DIR, name)
+
+    report_json_path = profiling_path('report_json')
+    report_csv_path = profiling_path('report_csv')
+    cprofile_path = profiling_path('cprofile_file')
+
+    # --- Checkpoint params (interval 0 disables checkpoints) ---
+    checkpoint_interval = config.getint('Checkpoint', 'interval', fallback=0)
+    checkpoint_file = config.get('Checkpoint', 'file', fallback='checkpoint.pkl')
+    CHECKPOINT_PATH = checkpoint_file if os.path.isabs(checkpoint_file) else os.path.join(BASE_DIR, checkpoint_file)
+
+    # --- Warm start from earlier result files (empty files disables it) ---
+    warm_start_files = [
+        name if os.path.isabs(name) else os.path.join(BASE_DIR, name)
+        for name in (item.strip() for item in config.get('WarmStart', 'files', fallback='').split(',')) if name
+    ]
+    warm_start_fraction = config.getfloat('WarmStart', 'fraction', fallback=1.0)
+    warm_start_reuse_fitness = config.getboolean('WarmStart', 'reuse_fitness', fallback=True)
+    warm_start_mismatch = config.get('WarmStart', 'mismatch', fallback='repair')
+
+    # --- Archive of every evaluation (empty db_file disables it) ---
+    archive_db_file = config.get('Archive', 'db_file', fallback='')
+    archive_buffer_size = config.getint('Archive', 'buffer_size', fallback=200)
+    # also store the whole gain cut of every evaluation, for re-scoring (see rescore.py)
+    archive_store_pattern = config.getboolean('Archive', 'store_pattern', fallback=False)
+    archive_db_path = None
+    if archive_db_file:
+        archive_db_path = archive_db_file if os.path.isabs(archive_db_file) else os.path.join(BASE_DIR, archive_db_file)
+
+    # --- Far-field sampling and the optional front-to-back objective ---
+    far_field_mode = config.get('FarField', 'mode', fallback='full')
+    front_to_back_objective = config.getboolean('FarField', 'front_to_back_objective', fallback=False)
+    if far_field_mode not in FAR_FIELD_MODES:
+        raise ValueError(f"Unknown far-field mode '{far_field_mode}', expected one of {FAR_FIELD_MODES}")
+    if front_to_back_objective and far_field_mode == 'forward':
+        raise ValueError("The front-to-back objective needs the back direction: use far-field mode "
+                         "'forward_back', 'adaptive' or 'full'")
+
+    # --- Feasibility filter before any solver call (off, repair or reject) ---
+    feasibility_mode = config.get('Feasibility', 'mode', fallback='off')
+    if feasibility_mode not in FEASIBILITY_MODES:
+        raise ValueError(f"Unknown feasibility mode '{feasibility_mode}', expected one of {FEASIBILITY_MODES}")
+
+    # --- Sweep short-circuit: band centre first, the rest only for designs that can still compete ---
+    short_circuit_enabled = config.getboolean('ShortCircuit', 'enabled', fallback=False)
+    # highest band-average real impedance penalty (ohms) worth a sweep; 0 disables the test
+    short_circuit_max_real_penalty = config.getfloat('ShortCircuit', 'max_real_penalty', fallback=0.0)
+    # highest gain (dBi) a design can reach at any frequency; 0 disables the dominance test
+    short_circuit_gain_cap = config.getfloat('ShortCircuit', 'gain_cap', fallback=0.0)
+
+    # --- Symmetric half-element model, checked against the full model before the run ---
+    symmetry_enabled = config.getboolean('Symmetry', 'enabled', fallback=False)
+    symmetry_tolerance = config.getfloat('Symmetry', 'tolerance', fallback=0.05)
+    symmetry_gain_tolerance = config.getfloat('Symmetry', 'gain_tolerance', fallback=0.2)
+
+    # --- Multi-fidelity schedule: coarse segments and pattern until full_from x num_generations ---
+    fidelity_enabled = config.getboolean('Fidelity', 'enabled', fallback=False)
+    coarse_segments = config.getint('Fidelity', 'coarse_segments', fallback=5)
+    coarse_pattern_step = config.getint('Fidelity', 'coarse_pattern_step', fallback=15)
+    full_fidelity_from = config.getfloat('Fidelity', 'full_from', fallback=0.7)
+
+    def is_coarse(gen):
+        """True if generation gen (0 = initial population) is evaluated at coarse fidelity."""
+        return fidelity_enabled and gen < full_fidelity_from * num_generations
+
+    # --- Memetic local search params (interval 0 = only after the last generation) ---
+    local_search_enabled = config.getboolean('LocalSearch', 'enabled', fallback=False)
+    local_search_interval = config.getint('LocalSearch', 'interval', fallback=0)
+    local_search_top = config.getint('LocalSearch', 'top', fallback=5)
+    local_search_step = config.getfloat('LocalSearch', 'step', fallback=0.02)
+    local_search_min_step = config.getfloat('LocalSearch', 'min_step', fallback=0.001)
+    local_search_iterations = config.getint('LocalSearch', 'max_iterations', fallback=10)
+
+    # --- Island model params (count 1 = a single population) ---
+    island_count = config.getint('Islands', 'count', fallback=1)
+    migration_interval = config.getint('Islands', 'migration_interval', fallback=5)
+    migrants = config.getint('Islands', 'migrants', fallback=2)
+
+    # --- Distributed evaluation: workers connect over TCP (python -m optimizer.distributed) ---
+    distributed_enabled = config.getboolean('Distributed', 'enabled', fallback=False)
+    distributed_host = config.get('Distributed', 'host', fallback='127.0.0.1')
+    distributed_port = config.getint('Distributed', 'port', fallback=5050)
+    heartbeat_timeout = config.getfloat('Distributed', 'heartbeat_timeout', fallback=10.0)
+    # shared with the workers; only peers that know it may deliver results
+    distributed_token = config.get('Distributed', 'token', fallback='')
+    if distributed_enabled and island_count > 1:
+        raise ValueError("Distributed evaluation ([Distributed] enabled) serves a single population: set [Islands] count = 1")
+    if evaluator is not None and (island_count > 1 or distributed_enabled):
+        raise ValueError("A shared evaluator serves a single population on its own workers: "
+                         "set [Islands] count = 1 and [Distributed] enabled = False")
+
+    # --- Asynchronous steady-state evaluation (slots 0 = num_workers, timeout 0 = none) ---
+    async_enabled = config.getboolean('Async', 'enabled', fallback=False)
+    async_slots = config.getint('Async', 'slots', fallback=0) or num_workers
+    async_timeout = config.getfloat('Async', 'timeout', fallback=0) or None
+    async_retries = config.getint('Async', 'retries', fallback=2)
+    async_backoff = config.getfloat('Async', 'backoff', fallback=0.5)
+    if async_enabled:
+        # these stages work generation by generation
+        clashes = [name for name, enabled in (('Fidelity', fidelity_enabled), ('ShortCircuit', short_circuit_enabled),
+                                              ('Surrogate', surrogate_enabled), ('Islands', island_count > 1),
+                                              ('Distributed', distributed_enabled), ('shared evaluator', evaluator is not None),
+                                              ('resume', resume)) if enabled]
+        if clashes:
+            raise ValueError(f"The asynchronous steady-state loop ([Async] enabled) does not support: {', '.join(clashes)}")
+    if island is not None:
+        # every island evaluates in its own process and keeps its own per-run files
+        num_workers = 1
+        cache_db_path = island_path(cache_db_path, island)
+        CHECKPOINT_PATH = island_path(CHECKPOINT_PATH, island)
+        report_json_path = island_path(report_json_path, island)
+        report_csv_path = island_path(report_csv_path, island)
+        cprofile_path = island_path(cprofile_path, island)
 
     # gene-level mutation probability (used inside custom_mutate)
     gene_mut_prob = mutation_probability
 
     # --- DEAP setup (safe creation) ---
     try:
-        creator.create("FitnessMulti", base.Fitness, weights=(1.0, -1.0, -1.0))
+        # maximise gain, minimise both impedance penalties (and maximise front-to-back)
+        creator.create("FitnessMulti", base.Fitness, weights=(1.0, -1.0, -1.0) + ((1.0,) if front_to_back_objective else ()))
     except Exception:
         # already created
         pass
@@ -139,128 +405,369 @@ def run_optimization(mode='single', progress_callback=None):
 
     toolbox.register("select", tools.selNSGA2)
 
-    # --- define evaluation functions capturing local variables ---
-    def evaluate_single(individual):
-        lengths = individual[:num_elements]
-        distances = individual[num_elements:]
-
-        nec_input_file = os.path.join(INP_DIR, INPUT_FILE)
-        create_nec_input(lengths, distances, nec_input_file, frequency)
-
-        output, error = run_nec2dxs1k5()
-        if error:
-            return 1000.0, 1000.0, 1000.0
-
-        output_file = os.path.join(OUT_DIR, OUTPUT_FILE)
-        real_impedance, imag_impedance, max_gain_db = read_nec_output(output_file)
-
-        if real_impedance is None or max_gain_db is None:
-            return 1000.0, 1000.0, 1000.0
-
-        real_penalty = abs(real_impedance - target_real_impedance)
-        imag_penalty = abs(imag_impedance)
-
-        return float(max_gain_db), float(real_penalty), float(imag_penalty)
-
-    def evaluate_sweep(individual):
-        lengths = individual[:num_elements]
-        distances = individual[num_elements:]
-
-        total_gain = 0.0
-        total_real_penalty = 0.0
-        total_imag_penalty = 0.0
-
-        for freq in frequencies:
-            nec_input_file = os.path.join(INP_DIR, INPUT_FILE)
-            create_nec_input(lengths, distances, nec_input_file, freq)
-
-            output, error = run_nec2dxs1k5()
-            if error:
-                return 1000.0, 1000.0, 1000.0
-
-            output_file = os.path.join(OUT_DIR, OUTPUT_FILE)
-            real_impedance, imag_impedance, max_gain_db = read_nec_output(output_file)
-            if real_impedance is None or max_gain_db is None:
-                return 1000.0, 1000.0, 1000.0
-
-            total_gain += max_gain_db
-            total_real_penalty += abs(real_impedance - target_real_impedance)
-            total_imag_penalty += abs(imag_impedance)
-
-        avg_gain = total_gain / len(frequencies)
-        avg_real_penalty = total_real_penalty / len(frequencies)
-        avg_imag_penalty = total_imag_penalty / len(frequencies)
-
-        return float(avg_gain), float(avg_real_penalty), float(avg_imag_penalty)
+    if island is None and island_count > 1:
+        # --- Island model: run the islands, then merge them into one result ---
+        print("🚀 Starting optimization on {} islands (mode = {})".format(island_count, mode))
+        outcomes = run_islands(run_optimization, island_count, migration_interval, migrants, progress_callback,
+                               mode=mode, config_path=config_path, resume=resume)
+        population = []
+        hall_of_fame = tools.HallOfFame(5)
+        logbook = tools.Logbook()
+        for index, (island_population, island_logbook, island_hall_of_fame) in enumerate(outcomes):
+            population += individuals_from_data(island_population, creator.Individual)
+            hall_of_fame.update(individuals_from_data(island_hall_of_fame, creator.Individual))
+            for record in island_logbook:
+                logbook.record(island=index, **record)
+        # merged final populations, best fronts first
+        population = tools.selNSGA2(population, len(population))
+        write_results_csv(CSV_OUTPUT_PATH, population, num_elements)
+        print("✅ Optimization finished. Results saved to:", CSV_OUTPUT_PATH)
+        return population, logbook, hall_of_fame
+
+    # --- array-backed variation (vectorized = True) ---
+    bounds = GeneBounds(num_elements, min_length, max_length, total_distance, lock_lengths, lock_distances)
+    # each island evolves from its own seed
+    seed = 42 + (island.index if island is not None else 0)
+    rng = np.random.default_rng(seed)
+
+    # --- evaluation settings (plain data, so they can be sent to pool workers) ---
+    settings = {
+        'num_elements': num_elements,
+        'frequency': frequency,
+        'frequencies': frequencies,
+        'target_real_impedance': target_real_impedance,
+        'segments': segments,
+        'radius': wire_radius,
+        'pattern_step': 5,
+        'far_field': far_field_mode,
+        'front_to_back': front_to_back_objective,
+        'symmetric': symmetry_enabled,
+        'keep_pattern': bool(archive_db_path) and archive_store_pattern,
+        'backend': solver_backend,
+        'launcher': solver_launcher,
+        'solver_command': solver_command,
+        'solver_timeout': solver_timeout,
+        'paths': {
+            'work_dir': None,
+            'input': os.path.join(INP_DIR, INPUT_FILE),
+            'output': os.path.join(OUT_DIR, OUTPUT_FILE),
+            'tmp': os.path.join(EXE_DIR, TMP_FILE),
+        },
+    }
 
     # register chosen fitness/evaluate
     if mode == 'sweep':
-        toolbox.register("evaluate", evaluate_sweep)
+        eval_frequencies = frequencies
+        toolbox.register("evaluate", evaluate_sweep, settings=settings)
     else:
-        toolbox.register("evaluate", evaluate_single)
+        eval_frequencies = [frequency]
+        toolbox.register("evaluate", evaluate_single, settings=settings)
+
+    # early generations of a multi-fidelity run: fewer segments, sparser pattern
+    coarse_settings = dict(settings, segments=coarse_segments, pattern_step=coarse_pattern_step)
+
+    # --- evaluation cache keyed on the written geometry ---
+    cache = shared_cache
+    if cache is None and cache_enabled:
+        cache = EvaluationCache(cache_max_entries, cache_db_path)
+
+    # --- optional archive of every evaluation, shared by the whole run ---
+    archive = None
+    if archive_db_path:
+        archive_run = datetime.now().isoformat(timespec='microseconds')
+        if island is not None:
+            archive_run += f" island {island.index}"
+        archive = EvaluationArchive(archive_db_path, archive_run, archive_buffer_size)
+
+    # --- optional surrogate model, trained on every successful evaluation ---
+    surrogate = None
+    if surrogate_enabled:
+        surrogate = RBFSurrogate(surrogate_min_samples, surrogate_max_samples)
 
     # --- warmup / tmp write (NEC input template) ---
-    write_tmp_file(os.path.join(EXE_DIR, TMP_FILE), os.path.join(INP_DIR, INPUT_FILE), os.path.join(OUT_DIR, OUTPUT_FILE))
-
-    print("🚀 Starting optimization (mode = {})".format(mode))
-    random.seed(42)
-    # --- Initialize population & evaluate initial individuals ---
-    population = toolbox.population(n=population_size)
-
-    # Evaluate initial population
-    invalid_ind = [ind for ind in population if not ind.fitness.valid]
-    for ind in invalid_ind:
-        ind.fitness.values = toolbox.evaluate(ind)
-
-    # statistics
-    stats = tools.Statistics(lambda ind: ind.fitness.values)
-    stats.register("avg", lambda vals: [sum(x)/len(x) for x in zip(*vals)])
-    stats.register("min", lambda vals: [min(x) for x in zip(*vals)])
-    stats.register("max", lambda vals: [max(x) for x in zip(*vals)])
-
-    hall_of_fame = tools.HallOfFame(5)
-
-    # mu/lambda
-    mu = max(1, int(population_size * 0.6))
-    lambda_ = max(1, int(population_size * 0.6))
-
-    # --- Evolution loop with NSGA-II selection and progress callback ---
-    logbook = tools.Logbook()
-    for gen in range(1, num_generations + 1):
-        # --- Variation: create offspring ---
-        offspring = algorithms.varAnd(population, toolbox, cxpb=crossover_probability, mutpb=mutation_probability)
-
-        # Evaluate offspring
-        invalid_off = [ind for ind in offspring if not ind.fitness.valid]
-        for ind in invalid_off:
-            ind.fitness.values = toolbox.evaluate(ind)
-
-        # --- Next population via NSGA-II selection ---
-        population = tools.selNSGA2(population + offspring, mu)
-
-        # Update hall of fame and stats
-        hall_of_fame.update(population)
-        record = stats.compile(population) if stats is not None else {}
-        logbook.record(gen=gen, **record)
-
-        # Progress callback (0..1)
-        if progress_callback:
-            try:
-                progress_callback(gen / float(num_generations))
-            except Exception:
-                pass
+    write_tmp_file(settings['paths']['tmp'], settings['paths']['input'], settings['paths']['output'])
+
+    # --- symmetric model: use it only if it matches the full model on a mid-range design ---
+    if symmetry_enabled:
+        reference = bounds.clip((bounds.low + bounds.high) / 2).tolist()
+        within, impedance_error, gain_error = check_symmetry(
+            get_backend(solver_backend), (reference[:num_elements], reference[num_elements:]), eval_frequencies,
+            settings, settings['paths'], symmetry_tolerance, symmetry_gain_tolerance)
+        print("Symmetric model check: impedance error {:.2%}, gain error {:.3f} dB".format(impedance_error, gain_error))
+        if not within:
+            print("⚠️ Symmetric model outside tolerance, using the full model")
+            settings['symmetric'] = coarse_settings['symmetric'] = False
+
+    # --- process pool: every worker gets its own scratch dir, deck and tmp file ---
+    if island is not None:
+        init_worker(SCRATCH_DIR, INPUT_FILE, OUTPUT_FILE, TMP_FILE)
+    pool = None
+    # the asynchronous loop runs its solvers from the event loop, distributed runs on remote workers
+    # and campaign jobs on the campaign's shared pool
+    coordinator = None
+    if distributed_enabled:
+        coordinator = Coordinator(distributed_host, distributed_port, heartbeat_timeout, distributed_token).start()
+    remote = coordinator or evaluator
+    if num_workers > 1 and not async_enabled and remote is None:
+        pool = multiprocessing.Pool(
+            processes=num_workers,
+            initializer=init_worker,
+            initargs=(SCRATCH_DIR, INPUT_FILE, OUTPUT_FILE, TMP_FILE)
+        )
+        toolbox.register("map", pool.map)
+
+    # --- evaluation pipeline: feasibility filter, cache, solver workers, archive and sweep short-circuit ---
+    pipeline = EvaluationPipeline(settings, coarse_settings, eval_frequencies, bounds, creator.FitnessMulti.weights,
+                                  batch_size, num_workers, toolbox.map, remote, cache, archive, feasibility_mode,
+                                  total_distance, short_circuit_enabled, short_circuit_max_real_penalty, short_circuit_gain_cap)
+    if async_enabled:
+        # one scratch directory per solver slot
+        pipeline.start_scheduler([make_scratch_paths(os.path.join(SCRATCH_DIR, f"slot_{slot}"), INPUT_FILE, OUTPUT_FILE, TMP_FILE)
+                                  for slot in range(async_slots)], async_timeout, async_retries, async_backoff)
+
+    # memetic stage: refine(population, gen, evaluate) polishes the best designs in place
+    refine = partial(refine_population, individual_class=creator.Individual, bounds=bounds,
+                     weights=creator.FitnessMulti.weights, top=local_search_top, step=local_search_step,
+                     min_step=local_search_min_step, max_iterations=local_search_iterations)
+
+    profiler = None
+    if cprofile_path:
+        profiler = cProfile.Profile()
+        profiler.enable()
 
+    try:
+        print("🚀 Starting optimization (mode = {})".format(mode))
+        random.seed(seed)
+
+        # statistics
+        stats = tools.Statistics(lambda ind: ind.fitness.values)
+        stats.register("avg", lambda vals: np.mean(vals, axis=0).tolist())
+        stats.register("min", lambda vals: np.min(vals, axis=0).tolist())
+        stats.register("max", lambda vals: np.max(vals, axis=0).tolist())
+
+        hall_of_fame = tools.HallOfFame(5)
+
+        # mu/lambda
+        mu = max(1, int(population_size * 0.6))
+        lambda_ = max(1, int(population_size * 0.6))
+
+        logbook = tools.Logbook()
+
+        # a checkpoint only fits a run that evaluates, varies and schedules designs the same way
+        run_signature = {
+            'mode': mode,
+            'num_elements': num_elements,
+            'frequencies': eval_frequencies,
+            'population_size': population_size,
+            'num_generations': num_generations,
+            'target_real_impedance': target_real_impedance,
+            'variation': (crossover_probability, mutation_probability),
+            'bounds': (min_length, max_length, total_distance, lock_lengths, lock_distances),
+            'surrogate': (surrogate_enabled, surrogate_eval_fraction, surrogate_exploration_fraction,
+                          surrogate_min_samples, surrogate_max_samples),
+            'local_search': (local_search_enabled, local_search_interval, local_search_top, local_search_step,
+                             local_search_min_step, local_search_iterations),
+            'islands': (island_count, migration_interval, migrants),
+            'segments': segments,
+            'radius': wire_radius,
+            'backend': solver_backend,
+            'vectorized': vectorized,
+            'far_field': (far_field_mode, front_to_back_objective),
+            'symmetric': settings['symmetric'],
+            'feasibility': feasibility_mode,
+            'short_circuit': (short_circuit_enabled, short_circuit_max_real_penalty, short_circuit_gain_cap),
+            'fidelity': (fidelity_enabled, coarse_segments, coarse_pattern_step, full_fidelity_from),
+        }
+
+        if resume:
+            # --- Restore the last checkpoint instead of a new initial population ---
+            state = load_checkpoint(CHECKPOINT_PATH)
+            differing = sorted(name for name in set(state['run']) | set(run_signature)
+                               if state['run'].get(name) != run_signature.get(name))
+            # a finished run may be extended by raising num_generations
+            if differing == ['num_generations'] and state['gen'] == state['run']['num_generations'] < num_generations:
+                differing = []
+            if differing:
+                raise ValueError(f"Checkpoint {CHECKPOINT_PATH} was written by a run with different settings: {', '.join(differing)}")
+            population = individuals_from_data(state['population'], creator.Individual)
+            # inserted worst first, so tied entries keep their order
+            for ind in reversed(individuals_from_data(state['hall_of_fame'], creator.Individual)):
+                hall_of_fame.insert(ind)
+            logbook = state['logbook']
+            pipeline.evaluations.extend(state['evaluations'])
+            random.setstate(state['random_state'])
+            rng.bit_generator.state = state['numpy_rng_state']
+            if cache is not None and state['cache'] is not None:
+                cache.entries, cache.hits, cache.misses = state['cache']
+            if surrogate is not None and state['surrogate'] is not None:
+                surrogate.genomes, surrogate.objectives = state['surrogate']
+            if archive is not None and state.get('archive_run'):
+                archive.run = state['archive_run']
+                # rows flushed after the checkpoint are evaluated again from here
+                if state.get('archive_row') is not None:
+                    archive.truncate(state['archive_row'])
+            pipeline.swept_front[:] = state.get('swept_front', [])
+            pipeline.bounded.update(tuple(genome) for genome in state.get('bounded', []))
+            start_gen = state['gen'] + 1
+            population_coarse = is_coarse(state['gen'])
+            print(f"Resuming from generation {state['gen']} ({CHECKPOINT_PATH})")
+        else:
+            # --- Initialize population & evaluate initial individuals ---
+            if vectorized:
+                population = [creator.Individual(genome) for genome in init_population_array(rng, population_size, bounds).tolist()]
+            else:
+                population = toolbox.population(n=population_size)
+
+            # Warm start: earlier designs replace the first random individuals
+            if warm_start_files:
+                seeds = seed_designs(warm_start_files, int(round(warm_start_fraction * population_size)), num_elements,
+                                     bounds, rng, creator.FitnessMulti.weights, eval_frequencies, settings,
+                                     lambda results: pipeline.score(results) if 'front_to_back' in results or not front_to_back_objective else None,
+                                     warm_start_reuse_fitness, warm_start_mismatch)
+                population[:len(seeds)] = individuals_from_data(seeds, creator.Individual)
+                if is_coarse(0):
+                    # stored fitness is full fidelity; the first generations compare coarse values
+                    for ind in population[:len(seeds)]:
+                        del ind.fitness.values
+                print(f"Warm start: {len(seeds)} seeded designs, {sum(1 for _, fitness in seeds if fitness)} with stored fitness")
+
+            # Evaluate initial population (seeds with a stored fitness cost no solver call)
+            if not async_enabled:
+                invalid_ind = [ind for ind in population if not ind.fitness.valid]
+                pipeline.evaluate(invalid_ind, 0, is_coarse(0))
+                train_surrogate(surrogate, population)
+            start_gen = 1
+            population_coarse = is_coarse(0)
+
+        if async_enabled:
+            # --- Steady-state NSGA-II on the asynchronous scheduler, instead of the generations below ---
+            def breed(population):
+                parents = random.sample(population, min(2, len(population)))
+                if vectorized:
+                    return vary_population(rng, parents, crossover_probability, mutation_probability, bounds)
+                return algorithms.varAnd(parents, toolbox, cxpb=crossover_probability, mutpb=mutation_probability)
+
+            asyncio.run(run_steady_state(population, hall_of_fame, logbook, stats, pipeline, breed, mu, lambda_,
+                                         num_generations * lambda_, progress_callback))
+            if local_search_enabled:
+                logbook.record(gen=num_generations, **refine(population, num_generations, pipeline.evaluate))
+                hall_of_fame.update(population)
+            generations = range(0)
+        else:
+            generations = range(start_gen, num_generations + 1)
+
+        # --- Evolution loop with NSGA-II selection and progress callback ---
+        for gen in generations:
+            timer = PhaseTimer()
+            coarse = is_coarse(gen)
+            fidelity_stats = {'fidelity': 'coarse' if coarse else 'full'}
+            if population_coarse and not coarse:
+                with timer.phase("fidelity_upgrade"):
+                    fidelity_stats['fidelity_upgrade_calls'] = upgrade_fidelity(population, hall_of_fame, pipeline, surrogate, gen)
+                population_coarse = False
+            # --- Variation: create offspring ---
+            with timer.phase("variation"):
+                if vectorized:
+                    offspring = vary_population(rng, population, crossover_probability, mutation_probability, bounds)
+                else:
+                    offspring = algorithms.varAnd(population, toolbox, cxpb=crossover_probability, mutpb=mutation_probability)
+
+                # Surrogate pre-screening: only promising offspring reach the solver
+                offspring, surrogate_saved = screen_offspring(surrogate, offspring, surrogate_eval_fraction,
+                                                              surrogate_exploration_fraction)
+
+            # Evaluate offspring
+            with timer.phase("evaluation"):
+                invalid_off = [ind for ind in offspring if not ind.fitness.valid]
+                eval_stats = pipeline.evaluate(invalid_off, gen, coarse)
+                train_surrogate(surrogate, invalid_off)
+
+            # --- Next population via NSGA-II selection ---
+            with timer.phase("selection"):
+                population = tools.selNSGA2(population + offspring, mu)
+
+            # --- Memetic stage: polish the best designs with a local pattern search ---
+            local_stats = {}
+            if local_search_enabled and (gen == num_generations or (local_search_interval > 0 and gen % local_search_interval == 0)):
+                with timer.phase("local_search"):
+                    local_stats = refine(population, gen, partial(pipeline.evaluate, gen=gen, coarse=coarse))
+
+            # Update hall of fame and stats
+            hall_of_fame.update(population)
+            record = stats.compile(population) if stats is not None else {}
+            logbook.record(gen=gen, surrogate_saved=surrogate_saved, **fidelity_stats, **eval_stats, **local_stats,
+                           **timer.as_dict(prefix="time_"), **record)
+
+            # --- Island model: swap the best non-dominated individuals with the neighbours ---
+            # (before the checkpoint, so a resumed island does not skip this exchange)
+            if island is not None and island.due(gen):
+                front = tools.sortNondominated(population, len(population), first_front_only=True)[0]
+                emigrants = individuals_to_data(tools.selNSGA2(front, min(island.migrants, len(front))))
+                immigrants = individuals_from_data(island.exchange(emigrants), creator.Individual)
+                population = tools.selNSGA2(population + immigrants, len(population))
+
+            # --- Checkpoint: everything needed to continue exactly from here ---
+            if checkpoint_interval > 0 and (gen % checkpoint_interval == 0 or gen == num_generations):
+                save_checkpoint(CHECKPOINT_PATH, {
+                    'run': run_signature,
+                    'gen': gen,
+                    'population': individuals_to_data(population),
+                    'hall_of_fame': individuals_to_data(hall_of_fame),
+                    'logbook': logbook,
+                    'evaluations': pipeline.evaluations,
+                    'random_state': random.getstate(),
+                    'numpy_rng_state': rng.bit_generator.state,
+                    'cache': (cache.entries, cache.hits, cache.misses) if cache is not None else None,
+                    'surrogate': (surrogate.genomes, surrogate.objectives) if surrogate is not None else None,
+                    'archive_run': archive.run if archive is not None else None,
+                    'archive_row': archive.last_row() if archive is not None else None,
+                    'swept_front': list(pipeline.swept_front),
+                    'bounded': [list(genome) for genome in pipeline.bounded],
+                })
+
+            # Progress callback (0..1)
+            if island is not None:
+                island.report(gen / float(num_generations))
+            elif progress_callback:
+                try:
+                    progress_callback(gen / float(num_generations))
+                except Exception:
+                    pass
+
+        # full_from > 1: the last generation was coarse, the results must not be
+        if population_coarse:
+            upgrade_fidelity(population, hall_of_fame, pipeline, surrogate, num_generations)
+
+        # designs still scored by their short-circuit bound get the whole sweep before they are reported
+        if pipeline.bounded:
+            reported = population + list(hall_of_fame)
+            calls = pipeline.sweep_bounded(reported, num_generations)
+            hall_of_fame.clear()
+            hall_of_fame.update(reported)
+            print("Short-circuit: {} solver calls to sweep the reported designs".format(calls))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if coordinator is not None:
+            coordinator.close()
+            print("Distributed: {jobs_sent} jobs sent, {jobs_reassigned} reassigned, {workers_lost} workers lost".format(**coordinator.stats))
+        if cache is not None and cache is not shared_cache:
+            cache.close()
+        if archive is not None:
+            archive.close()
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+
+    write_timing_report(logbook, pipeline.evaluations, report_json_path, report_csv_path)
+
+    if island is not None:
+        # the parent process merges the islands and writes the CSV
+        return individuals_to_data(population), logbook, individuals_to_data(hall_of_fame)
 
     # --- Save results to CSV ---
-    header = [f"Length{i+1}" for i in range(num_elements)] + [f"Distance{i+1}" for i in range(max(0, num_elements - 1))] + ["Max Gain (dB)", "Real Impedance Penalty", "Imaginary Impedance Penalty"]
-    with open(CSV_OUTPUT_PATH, "w", newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(header)
-        for ind in population:
-            lengths = ind[:num_elements]
-            distances = ind[num_elements:]
-            fitness = ind.fitness.values
-            writer.writerow(list(lengths) + list(distances) + [fitness[0], fitness[1], fitness[2]])
+    write_results_csv(CSV_OUTPUT_PATH, population, num_elements)
 
     print("✅ Optimization finished. Results saved to:", CSV_OUTPUT_PATH)
     return population, logbook, hall_of_fame
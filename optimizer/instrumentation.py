@@ -0,0 +1,49 @@
+# instrumentation.py
+import csv
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# phases timed inside one solver call, in the order they happen
+EVALUATION_PHASES = ("deck", "solver", "parse")
+
+
+class PhaseTimer:
+    """Accumulates wall-clock seconds per named phase."""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] += time.perf_counter() - start
+
+    def add(self, timings):
+        """Add a dict of phase -> seconds (e.g. timings sent back by a worker)."""
+        for name, seconds in timings.items():
+            self.totals[name] += seconds
+
+    def as_dict(self, prefix=""):
+        return {f"{prefix}{name}": seconds for name, seconds in self.totals.items()}
+
+
+def write_timing_report(logbook, evaluations, json_path=None, csv_path=None):
+    """Export per-generation (logbook) and per-evaluation timings.
+
+    The JSON file holds both; the CSV file holds one row per evaluation.
+    """
+    if json_path:
+        with open(json_path, "w") as file:
+            json.dump({"generations": list(logbook), "evaluations": evaluations}, file, indent=1)
+
+    if csv_path:
+        fields = ["gen", "cached", "failed"] + [f"time_{phase}" for phase in EVALUATION_PHASES]
+        with open(csv_path, "w", newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(evaluations)
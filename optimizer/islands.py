@@ -0,0 +1,98 @@
+# islands.py
+"""Island model: K populations evolved in separate processes.
+
+Islands are connected in a ring of multiprocessing queues. Every
+migration_interval generations each island sends copies of its best
+non-dominated individuals to the next island and takes in those of the
+previous one. Individuals travel as plain (genes, fitness) pairs.
+"""
+import multiprocessing
+import queue
+
+
+class Migration:
+    """One island's end of the migration ring."""
+
+    def __init__(self, index, count, inbox, outbox, progress, interval, migrants):
+        self.index = index
+        self.count = count
+        self.inbox = inbox
+        self.outbox = outbox
+        self.progress = progress
+        self.interval = interval
+        self.migrants = migrants
+
+    def due(self, gen):
+        return self.interval > 0 and gen % self.interval == 0
+
+    def exchange(self, emigrants):
+        """Send emigrants to the next island and return the previous island's.
+
+        Every island sends before it receives, so the ring cannot deadlock;
+        each island waits for its neighbour to reach the same generation.
+        """
+        self.outbox.put(emigrants)
+        return self.inbox.get()
+
+    def report(self, progress):
+        self.progress.put((self.index, progress))
+
+
+def island_main(run, run_kwargs, migration, results):
+    """Process target: run one island and send back its outcome (or the error)."""
+    try:
+        results.put((migration.index, run(island=migration, **run_kwargs), None))
+    except Exception as exc:
+        results.put((migration.index, None, repr(exc)))
+
+
+def run_islands(run, count, interval, migrants, progress_callback=None, **run_kwargs):
+    """Run count islands of run(island=..., **run_kwargs) and return their outcomes by island index.
+
+    run must be a module-level function returning picklable data. Raises
+    RuntimeError if an island fails.
+    """
+    ring = [multiprocessing.Queue() for _ in range(count)]
+    progress = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+
+    processes = []
+    for index in range(count):
+        migration = Migration(index, count, ring[index], ring[(index + 1) % count], progress, interval, migrants)
+        process = multiprocessing.Process(target=island_main, args=(run, run_kwargs, migration, results))
+        process.start()
+        processes.append(process)
+
+    outcomes = {}
+    errors = []
+    island_progress = [0.0] * count
+    try:
+        # an island that fails leaves its neighbour waiting for migrants, so stop at the first error
+        while len(outcomes) < count and not errors:
+            try:
+                index, outcome, error = results.get(timeout=0.2)
+                if error:
+                    errors.append(f"island {index}: {error}")
+                else:
+                    outcomes[index] = outcome
+            except queue.Empty:
+                dead = [index for index, process in enumerate(processes) if not process.is_alive() and index not in outcomes]
+                if dead and results.empty():
+                    errors.append(f"island {dead[0]} exited without a result")
+            while not progress.empty():
+                index, value = progress.get()
+                island_progress[index] = value
+                if progress_callback:
+                    try:
+                        progress_callback(sum(island_progress) / count)
+                    except Exception:
+                        pass
+    finally:
+        for process in processes:
+            if errors:
+                process.terminate()
+            process.join()
+
+    if errors:
+        raise RuntimeError("Island run failed: " + "; ".join(errors))
+    return [outcomes[index] for index in range(count)]
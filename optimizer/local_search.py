@@ -0,0 +1,126 @@
+# local_search.py
+"""Memetic refinement: compass (pattern) search around the best GA designs.
+
+Every iteration probes each unlocked gene of every active design by +/- step
+(a fraction of the gene's range). All probes of all designs go to the
+evaluator as one batch, so they run in parallel and through the cache.
+
+A design moves to the probe with the best scaled weighted sum of the
+objectives, provided that probe is better than the design on that sum and
+not dominated by it (it never trades away the design's Pareto position);
+if no probe qualifies its step is halved, and it stops once the step falls
+below min_step.
+"""
+import numpy as np
+from deap import tools
+
+from optimizer.checkpoint import individuals_to_data, individuals_from_data
+
+
+def dominates(a, b, weights):
+    """True if objective values a Pareto-dominate b (weights > 0 maximise, < 0 minimise)."""
+    a = np.asarray(a) * np.sign(weights)
+    b = np.asarray(b) * np.sign(weights)
+    return bool(np.all(a >= b) and np.any(a > b))
+
+
+def scalarize(values, weights, scales):
+    """Weighted sum of objective values, each divided by its scale (higher is better)."""
+    return float(np.sum(np.sign(weights) * np.asarray(values) / scales))
+
+
+def compass_probes(genes, step, bounds):
+    """Neighbours of genes one step up and down along every unlocked gene.
+
+    Only the probed gene is clipped to its bounds, so a design that cxBlend
+    pushed slightly out of bounds is probed around where it is.
+    """
+    genes = np.asarray(genes, dtype=float)
+    span = bounds.high - bounds.low
+    probes = []
+    for i in np.flatnonzero(~bounds.locked):
+        for sign in (1.0, -1.0):
+            probe = genes.copy()
+            probe[i] = np.clip(probe[i] + sign * step * span[i], bounds.low[i], bounds.high[i])
+            if probe[i] != genes[i]:
+                probes.append(probe.tolist())
+    return probes
+
+
+def pattern_search(designs, evaluate, bounds, weights, step=0.02, min_step=0.001, max_iterations=10, scales=None):
+    """Refine (genes, fitness) designs; evaluate(genomes) returns (fitness list, solver calls).
+
+    scales gives the typical spread of each objective (e.g. over the
+    population), so dB and ohms weigh alike in the weighted sum.
+    Returns the refined designs and a report with the solver calls spent, the
+    summed change of each objective and that change per solver call.
+    """
+    scales = np.where(np.asarray(scales, dtype=float) > 0, scales, 1.0) if scales is not None else np.ones(len(weights))
+    current = [(list(genes), tuple(fitness)) for genes, fitness in designs]
+    steps = [step] * len(current)
+    solver_calls = 0
+
+    for _ in range(max_iterations):
+        active = [i for i, size in enumerate(steps) if size >= min_step]
+        if not active:
+            break
+        probes = {i: compass_probes(current[i][0], steps[i], bounds) for i in active}
+        batch = [probe for i in active for probe in probes[i]]
+        if not batch:
+            break
+        fitnesses, calls = evaluate(batch)
+        solver_calls += calls
+
+        position = 0
+        for i in active:
+            results = list(zip(probes[i], fitnesses[position:position + len(probes[i])]))
+            position += len(probes[i])
+            score = scalarize(current[i][1], weights, scales)
+            better = [(genes, fitness) for genes, fitness in results
+                      if scalarize(fitness, weights, scales) > score and not dominates(current[i][1], fitness, weights)]
+            if better:
+                current[i] = max(better, key=lambda item: scalarize(item[1], weights, scales))
+            else:
+                steps[i] /= 2
+
+    start = np.array([fitness for _, fitness in designs], dtype=float).reshape(len(designs), -1)
+    end = np.array([fitness for _, fitness in current], dtype=float).reshape(len(current), -1)
+    improvement = (end - start).sum(axis=0).tolist() if len(designs) else []
+    report = {
+        'solver_calls': solver_calls,
+        'improvement': improvement,
+        'improvement_per_call': [value / solver_calls for value in improvement] if solver_calls else [0.0] * len(improvement),
+    }
+    return current, report
+
+
+def refine_population(population, gen, evaluate, individual_class, bounds, weights, top=5, step=0.02, min_step=0.001,
+                      max_iterations=10):
+    """Pattern search on the top non-dominated DEAP individuals; refined designs replace their originals.
+
+    evaluate(individuals) assigns their fitness and returns its statistics
+    (solver_calls among them). Returns the logbook fields of the stage
+    (solver calls and objective improvement).
+    """
+    front = tools.sortNondominated(population, len(population), first_front_only=True)[0]
+    chosen = tools.selNSGA2(front, min(top, len(front)))
+
+    def evaluate_probes(genomes):
+        probes = [individual_class(genome) for genome in genomes]
+        probe_stats = evaluate(probes)
+        return [probe.fitness.values for probe in probes], probe_stats['solver_calls']
+
+    # failed designs (penalty 1000) would swamp the spread of the objectives
+    valid = [ind.fitness.values for ind in population if ind.fitness.values[1] < 1000.0]
+    scales = np.std(valid, axis=0) if len(valid) > 1 else None
+    refined, report = pattern_search(individuals_to_data(chosen), evaluate_probes, bounds, weights,
+                                     step, min_step, max_iterations, scales)
+    replacements = {id(ind): new for ind, new in zip(chosen, individuals_from_data(refined, individual_class))}
+    population[:] = [replacements.get(id(ind), ind) for ind in population]
+    print("Local search (gen {}): {} solver calls, improvement per call {}".format(
+        gen, report['solver_calls'], [round(value, 5) for value in report['improvement_per_call']]))
+    return {
+        'local_search_calls': report['solver_calls'],
+        'local_search_improvement': report['improvement'],
+        'local_search_improvement_per_call': report['improvement_per_call'],
+    }
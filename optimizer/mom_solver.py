@@ -0,0 +1,260 @@
+# mom_solver.py
+"""Thin-wire method-of-moments solver for Yagis of parallel straight wires.
+
+Every wire runs along y, centred on y = 0, at its own x position on the boom
+(the geometry written by create_nec_input). Currents are expanded in
+triangle functions on each wire and tested with the same functions
+(Galerkin, mixed-potential EFIE in free space). The 1/R part of the kernel is
+integrated analytically, the rest with Gauss-Legendre quadrature.
+
+All arrays carry a leading population axis, so a whole population is solved
+with one batched numpy.linalg.solve per frequency.
+
+A centre-fed Yagi is symmetric about y = 0, so its current is too. With
+symmetric=True only the basis functions of one half of each wire are tested,
+and every basis function is folded onto its mirror image: the matrix to fill
+has about half the rows and the system to solve a quarter of the entries.
+"""
+import numpy as np
+
+C0 = 299792458.0
+MU0 = 4e-7 * np.pi
+EPS0 = 1.0 / (MU0 * C0 ** 2)
+ETA0 = MU0 * C0
+
+QUAD_POINTS = 3
+# upper bound on the number of pair-quadrature samples held in memory at once
+MAX_CHUNK_SAMPLES = 2_000_000
+
+
+def mom_segments(segments):
+    """Segments per wire used by the solver: even, so the feed sits on a node."""
+    return segments + 1 if segments % 2 else segments
+
+
+def wire_discretization(half_lengths, x_positions, segments):
+    """Segment start points, lengths and x positions, each shaped (P, E * n_seg)."""
+    n_seg = mom_segments(segments)
+    half_lengths = np.asarray(half_lengths, dtype=float)
+    x_positions = np.asarray(x_positions, dtype=float)
+    pop, elements = half_lengths.shape
+
+    delta = 2.0 * half_lengths / n_seg
+    starts = -half_lengths[:, :, None] + delta[:, :, None] * np.arange(n_seg)
+    seg_start = starts.reshape(pop, elements * n_seg)
+    seg_len = np.repeat(delta, n_seg, axis=1)
+    seg_x = np.repeat(x_positions, n_seg, axis=1)
+    return seg_start, seg_len, seg_x
+
+
+def basis_segments(elements, segments):
+    """Indices of the rising and falling segment of every triangle basis function."""
+    n_seg = mom_segments(segments)
+    wires = np.repeat(np.arange(elements), n_seg - 1)
+    nodes = np.tile(np.arange(1, n_seg), elements)
+    rise = wires * n_seg + nodes - 1
+    fall = wires * n_seg + nodes
+    return rise, fall
+
+
+def symmetric_groups(elements, segments):
+    """Mirror groups of the basis functions of symmetric currents.
+
+    Node j of a wire and its mirror node n_seg - j carry the same current.
+    Returns the group of every basis function and, per group, the basis
+    function (on the lower half of its wire) that tests it.
+    """
+    n_seg = mom_segments(segments)
+    half = n_seg // 2
+    wires = np.repeat(np.arange(elements), n_seg - 1)
+    nodes = np.tile(np.arange(1, n_seg), elements)
+    group = wires * half + np.minimum(nodes, n_seg - nodes) - 1
+    representative = np.repeat(np.arange(elements), half) * (n_seg - 1) + np.tile(np.arange(half), elements)
+    return group, representative
+
+
+def segment_integrals(seg_start, seg_len, seg_x, k, radius, test=None):
+    """Double integrals of the free-space kernel over pairs of segments.
+
+    Returns G0[s, t] = int_s int_t G and M[a][b][s, t] = int_s int_t phi_a phi_b G,
+    where phi_0 rises and phi_1 falls linearly along the segment and
+    G = exp(-jkR) / R (the 1/4pi factor is applied by the caller). s runs
+    over the test segments (default all), t over all segments.
+    """
+    u, w = np.polynomial.legendre.leggauss(QUAD_POINTS)
+    u = 0.5 * (u + 1.0)
+    w = 0.5 * w
+    test = np.arange(seg_start.shape[1]) if test is None else test
+
+    y_q = seg_start[:, :, None] + seg_len[:, :, None] * u              # (P, S, Q)
+    y_t = y_q[:, test]                                                  # (P, T, Q)
+    rho2 = (seg_x[:, test, None] - seg_x[:, None, :]) ** 2 + radius ** 2   # (P, T, S)
+    rho = np.sqrt(rho2)
+
+    # smooth part of the kernel, (exp(-jkR) - 1) / R, by quadrature on both segments
+    dy = y_t[:, :, None, :, None] - y_q[:, None, :, None, :]            # (P, T, S, Q, Q)
+    dist = np.sqrt(rho2[:, :, :, None, None] + dy ** 2)
+    smooth = np.expm1(-1j * k * dist) / dist
+    inner_w = w * seg_len[:, None, :, None, None]                       # (P, 1, S, 1, Q)
+    k_all = np.sum(smooth * inner_w, axis=-1)                           # (P, S, S, Q)
+    k_rise = np.sum(smooth * inner_w * u, axis=-1)
+
+    # static part, 1 / R, integrated analytically over the inner segment
+    y = y_t[:, :, None, :]                                              # (P, T, 1, Q)
+    y1 = seg_start[:, None, :, None]
+    y2 = y1 + seg_len[:, None, :, None]
+    r = rho[..., None]
+    asinh_part = np.arcsinh((y2 - y) / r) - np.arcsinh((y1 - y) / r)
+    root_part = np.sqrt((y2 - y) ** 2 + rho2[..., None]) - np.sqrt((y1 - y) ** 2 + rho2[..., None])
+    static_rise = (root_part + (y - y1) * asinh_part) / seg_len[:, None, :, None]
+
+    k_all = k_all + asinh_part
+    k_rise = k_rise + static_rise
+    k_fall = k_all - k_rise
+
+    outer_w = w * seg_len[:, test, None]                                # (P, T, Q)
+    outer_w = outer_w[:, :, None, :]
+    g0 = np.sum(outer_w * k_all, axis=-1)
+    m_rise = [np.sum(outer_w * u * k_rise, axis=-1), np.sum(outer_w * u * k_fall, axis=-1)]
+    m_fall = [np.sum(outer_w * (1 - u) * k_rise, axis=-1), np.sum(outer_w * (1 - u) * k_fall, axis=-1)]
+    return g0, [m_rise, m_fall]
+
+
+def impedance_matrix(seg_start, seg_len, seg_x, rise, fall, k, radius, test=None):
+    """Galerkin impedance matrices, shaped (P, M, N), for wave number k.
+
+    test selects the M testing basis functions (rows); default all N.
+    """
+    omega = k * C0
+    test = np.arange(len(rise)) if test is None else test
+    test_segments = np.unique(np.concatenate((rise[test], fall[test])))
+    g0, moments = segment_integrals(seg_start, seg_len, seg_x, k, radius, test_segments)
+
+    parts = [(rise, 1.0), (fall, -1.0)]
+    pop = seg_start.shape[0]
+    rows = np.arange(pop)[:, None, None]
+    z = 0
+    for a, (seg_m, slope_m) in enumerate(parts):
+        seg_m = seg_m[test]
+        # row of each testing segment in the integrals over test_segments
+        tm = np.searchsorted(test_segments, seg_m)[None, :, None]
+        for b, (seg_n, slope_n) in enumerate(parts):
+            sm = seg_m[None, :, None]
+            sn = seg_n[None, None, :]
+            vector = moments[a][b][rows, tm, sn]
+            scalar = g0[rows, tm, sn] * slope_m * slope_n / (seg_len[rows, sm] * seg_len[rows, sn])
+            z = z + 1j * omega * MU0 * vector + scalar / (1j * omega * EPS0)
+    return z / (4 * np.pi)
+
+
+def far_field_gain(currents, seg_start, seg_len, seg_x, rise, fall, k, feed_current, thetas, phis):
+    """Power gain (linear) at each (theta, phi) direction, in degrees, shaped (P, D).
+
+    thetas and phis are shared by all designs (shape (D,)) or given per design (shape (P, D)).
+    """
+    u, w = np.polynomial.legendre.leggauss(QUAD_POINTS)
+    u = 0.5 * (u + 1.0)
+    w = 0.5 * w
+
+    pop, segs = seg_start.shape
+    # current at the quadrature points of every segment
+    seg_current = np.zeros((pop, segs, QUAD_POINTS), dtype=complex)
+    np.add.at(seg_current, (slice(None), rise), currents[:, :, None] * u)
+    np.add.at(seg_current, (slice(None), fall), currents[:, :, None] * (1 - u))
+
+    theta = np.radians(np.atleast_2d(np.asarray(thetas, dtype=float)))
+    phi = np.radians(np.atleast_2d(np.asarray(phis, dtype=float)))
+    rx = np.sin(theta) * np.cos(phi)
+    ry = np.sin(theta) * np.sin(phi)
+
+    y_q = seg_start[:, :, None] + seg_len[:, :, None] * u
+    phase = np.exp(1j * k * (rx[:, None, None, :] * seg_x[:, :, None, None] + ry[:, None, None, :] * y_q[..., None]))
+    weights = (w * seg_len[:, :, None])[..., None]
+    field = np.sum(seg_current[..., None] * weights * phase, axis=(1, 2))   # (P, D)
+
+    input_power = 0.5 * np.real(feed_current)                              # V = 1 at the feed
+    radiated = ETA0 * k ** 2 * np.abs(field) ** 2 * (1 - ry ** 2) / (8 * np.pi)
+    return radiated / input_power[:, None]
+
+
+def solve_yagis(half_lengths, x_positions, frequencies, segments=9, radius=0.006, feed_element=1,
+                thetas=None, phis=None, return_pattern=False, symmetric=False, refine_step=None):
+    """Feed impedance and max gain of a population of Yagis.
+
+    half_lengths, x_positions: arrays shaped (P, E), in metres.
+    frequencies: MHz. The feed is a 1 V delta gap at the centre of feed_element.
+    thetas/phis: far-field directions in degrees (default: the 73-point theta
+    cut at phi = 0 requested by create_nec_input).
+    symmetric: solve for the symmetric current only (see the module docstring);
+    the result equals the full solve.
+    refine_step: for an evenly spaced theta cut, a second pass samples every
+    refine_step degrees within one cut step of each design's peak, and the
+    max gain is the peak of both passes (the pattern stays the first cut).
+
+    Returns (impedance, max_gain_db), complex and float arrays shaped (P, F),
+    and with return_pattern the gain in dB at every direction, shaped (P, F, D).
+    """
+    half_lengths = np.atleast_2d(np.asarray(half_lengths, dtype=float))
+    x_positions = np.atleast_2d(np.asarray(x_positions, dtype=float))
+    if thetas is None:
+        thetas = np.arange(-180.0, 180.0 + 1e-9, 5.0)
+        phis = np.zeros_like(thetas)
+
+    pop, elements = half_lengths.shape
+    feed_element = min(feed_element, elements - 1)
+    n_seg = mom_segments(segments)
+    rise, fall = basis_segments(elements, segments)
+    feed_index = feed_element * (n_seg - 1) + n_seg // 2 - 1
+    test, fold = None, None
+    if symmetric:
+        group, test = symmetric_groups(elements, segments)
+        # fold[n, g] = 1 if basis function n belongs to mirror group g
+        fold = np.zeros((len(group), len(test)))
+        fold[np.arange(len(group)), group] = 1.0
+
+    fine = None
+    if refine_step and len(thetas) > 1:
+        cut_step = thetas[1] - thetas[0]
+        fine = np.arange(-cut_step, cut_step + 1e-9, refine_step)
+
+    segs = elements * n_seg
+    chunk = max(1, MAX_CHUNK_SAMPLES // (segs * segs * QUAD_POINTS ** 2))
+
+    impedance = np.empty((pop, len(frequencies)), dtype=complex)
+    max_gain_db = np.empty((pop, len(frequencies)))
+    pattern_db = np.empty((pop, len(frequencies), len(thetas))) if return_pattern else None
+    for start in range(0, pop, chunk):
+        part = slice(start, start + chunk)
+        seg_start, seg_len, seg_x = wire_discretization(half_lengths[part], x_positions[part], segments)
+        for f_index, freq in enumerate(frequencies):
+            k = 2 * np.pi * freq * 1e6 / C0
+            z = impedance_matrix(seg_start, seg_len, seg_x, rise, fall, k, radius, test)
+            if symmetric:
+                z = z @ fold
+                excitation = np.zeros(z.shape[:2], dtype=complex)
+                excitation[:, group[feed_index]] = 1.0
+                currents = np.linalg.solve(z, excitation[..., None])[..., 0][:, group]
+            else:
+                excitation = np.zeros(z.shape[:2], dtype=complex)
+                excitation[:, feed_index] = 1.0
+                currents = np.linalg.solve(z, excitation[..., None])[..., 0]
+            feed_current = currents[:, feed_index]
+
+            gain = far_field_gain(currents, seg_start, seg_len, seg_x, rise, fall, k, feed_current, thetas, phis)
+            impedance[part, f_index] = 1.0 / feed_current
+            peak = np.max(gain, axis=1)
+            if fine is not None:
+                # second pass around the coarse peak of each design, with the same currents
+                centre = np.asarray(thetas, dtype=float)[np.argmax(gain, axis=1)]
+                fine_thetas = centre[:, None] + fine
+                fine_gain = far_field_gain(currents, seg_start, seg_len, seg_x, rise, fall, k, feed_current,
+                                           fine_thetas, np.zeros_like(fine_thetas))
+                peak = np.maximum(peak, np.max(fine_gain, axis=1))
+            max_gain_db[part, f_index] = 10 * np.log10(peak)
+            if return_pattern:
+                # nulls floored at -999.99 dB, as NEC prints them
+                with np.errstate(divide='ignore'):
+                    pattern_db[part, f_index] = np.maximum(10 * np.log10(gain), -999.99)
+    if return_pattern:
+        return impedance, max_gain_db, pattern_db
+    return impedance, max_gain_db
@@ -3,8 +3,18 @@ import matplotlib.pyplot as plt
 import csv
 from configparser import ConfigParser
 
+from optimizer.archive import ARCHIVE_EXTENSIONS, query_archive
+
+
+def read_optimized_data(csv_file, config, generation=None, gain_range=None, real_penalty_range=None, imag_penalty_range=None):
+    """Read (lengths, distances, gain, real impedance, imaginary impedance penalty) per individual.
+
+    csv_file may also be an evaluation archive (.db/.sqlite); only the rows of
+    the given generation(s) and objective ranges are then read from it.
+    """
+    if csv_file.endswith(ARCHIVE_EXTENSIONS):
+        return read_archived_data(csv_file, generation, gain_range, real_penalty_range, imag_penalty_range)
 
-def read_optimized_data(csv_file, config):
     individuals = []
 
     num_elements = int(config['GeneticAlgorithm']['num_elements']) 
@@ -27,6 +37,15 @@ def read_optimized_data(csv_file, config):
 
     return individuals
 
+def read_archived_data(db_file, generation=None, gain_range=None, real_penalty_range=None, imag_penalty_range=None):
+    rows = query_archive(db_file, generation=generation, gain_range=gain_range, real_penalty_range=real_penalty_range,
+                         imag_penalty_range=imag_penalty_range, columns=['lengths', 'distances', 'real', 'gain', 'imag_penalty'])
+    individuals = []
+    for row in rows:
+        real_impedance = sum(row['real']) / len(row['real'])
+        individuals.append((row['lengths'], row['distances'], row['gain'], real_impedance, row['imag_penalty']))
+    return individuals
+
 def plot_geometry(lengths, distances, gain, real_impedance,img_impedance_penalty):
     x_position = 0
     x_coords = [x_position] 
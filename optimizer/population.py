@@ -0,0 +1,85 @@
+# population.py
+"""NumPy-backed population operators.
+
+The population is a 2-D array, one row per individual (lengths followed by
+distances). Initialization, mutation and blend crossover work on the whole
+array at once; the rows are turned into DEAP individuals only for
+NSGA-II selection.
+"""
+import numpy as np
+
+
+class GeneBounds:
+    """Per-gene lower/upper bounds and the genes held fixed by lock_lengths/lock_distances."""
+
+    def __init__(self, num_elements, min_length, max_length, total_distance, lock_lengths, lock_distances):
+        num_distances = num_elements - 1
+        self.low = np.array([min_length] * num_elements + [0.1] * num_distances)
+        self.high = np.array([max_length] * num_elements + [total_distance / num_elements] * num_distances)
+
+        # locked genes keep the fixed values used by init_individual
+        self.locked = np.array([lock_lengths] * num_elements + [lock_distances] * num_distances, dtype=bool)
+        self.fixed = np.array([0.3] * num_elements + [0.15] * num_distances)
+
+    @property
+    def size(self):
+        return len(self.low)
+
+    def sample(self, rng, shape):
+        genes = rng.uniform(self.low, self.high, size=shape + (self.size,))
+        return np.where(self.locked, self.fixed, genes)
+
+    def clip(self, genomes):
+        return np.where(self.locked, self.fixed, np.clip(genomes, self.low, self.high))
+
+
+def init_population_array(rng, size, bounds):
+    """Random population of shape (size, genes) inside the bounds."""
+    return bounds.sample(rng, (size,))
+
+
+def blend_crossover_array(rng, genomes, cxpb, bounds, alpha=0.5):
+    """cxBlend on consecutive pairs of rows, each pair crossed with probability cxpb.
+
+    Children are clipped to the bounds. Returns (children, changed_mask).
+    """
+    children = genomes.copy()
+    n_pairs = len(genomes) // 2
+    first = np.arange(n_pairs) * 2
+    second = first + 1
+    mate = rng.random(n_pairs) < cxpb
+
+    gamma = (1.0 + 2.0 * alpha) * rng.random((n_pairs, genomes.shape[1])) - alpha
+    x1 = genomes[first]
+    x2 = genomes[second]
+    children[first] = np.where(mate[:, None], (1.0 - gamma) * x1 + gamma * x2, x1)
+    children[second] = np.where(mate[:, None], gamma * x1 + (1.0 - gamma) * x2, x2)
+
+    changed = np.zeros(len(genomes), dtype=bool)
+    changed[first[mate]] = True
+    changed[second[mate]] = True
+    return bounds.clip(children), changed
+
+
+def mutate_array(rng, genomes, mutpb, gene_mut_prob, bounds):
+    """Resample genes uniformly in their bounds, like make_custom_mutate.
+
+    Each row is mutated with probability mutpb; inside a mutated row each
+    unlocked gene is redrawn with probability gene_mut_prob.
+    Returns (mutants, changed_mask).
+    """
+    rows = rng.random(len(genomes)) < mutpb
+    genes = (rng.random(genomes.shape) < gene_mut_prob) & rows[:, None] & ~bounds.locked
+    mutants = np.where(genes, bounds.sample(rng, (len(genomes),)), genomes)
+    return mutants, rows
+
+
+def vary_array(rng, genomes, cxpb, mutpb, gene_mut_prob, bounds):
+    """Array version of algorithms.varAnd: crossover then mutation.
+
+    Returns (offspring, changed_mask); unchanged rows keep their parent's fitness.
+    """
+    children, crossed = blend_crossover_array(rng, genomes, cxpb, bounds)
+    children, mutated = mutate_array(rng, children, mutpb, gene_mut_prob, bounds)
+    return children, crossed | mutated
+
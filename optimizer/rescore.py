@@ -0,0 +1,166 @@
+# rescore.py
+"""Re-score archived evaluations under new objectives, without the solver.
+
+Archive rows keep the raw solver quantities: the feed impedance of every
+frequency and, with [Archive] store_pattern, the whole gain cut. Objectives
+that only depend on them (another target impedance, VSWR, the gain in the
+forward direction, the front-to-back ratio) are recomputed from the file
+and the Pareto front of the archive is found again.
+"""
+import csv
+
+import numpy as np
+
+from optimizer.archive import query_archive
+from optimizer.NEC_tools import FORWARD_THETA, pattern_summary
+
+# objectives that can be recomputed, with their weight (> 0 maximise, < 0 minimise)
+OBJECTIVES = {
+    'gain': 1.0,
+    'real_penalty': -1.0,
+    'imag_penalty': -1.0,
+    'vswr': -1.0,
+    'max_vswr': -1.0,
+    'forward_gain': 1.0,
+    'front_to_back': 1.0,
+}
+DEFAULT_OBJECTIVES = ('gain', 'real_penalty', 'imag_penalty')
+
+# value of an objective the stored quantities cannot give, like a failed simulation's
+MISSING = 1000.0
+
+
+def vswr(impedance, z0=50.0):
+    """VSWR of feed impedances of any shape relative to z0 ohms (as NecResult.vswr)."""
+    reflection = np.abs((impedance - z0) / (impedance + z0))
+    with np.errstate(divide='ignore'):
+        return (1 + reflection) / (1 - reflection)
+
+
+def objective_values(impedance, gain, objectives, target_real_impedance=50.0, z0=50.0,
+                     pattern=None, cut=None, ratios=None):
+    """(rows, objectives) values of stacked rows, averaged over frequencies like fitness_from_results.
+
+    impedance and gain are (rows, frequencies) arrays, pattern the
+    (rows, frequencies, thetas) gain cut sampled at cut, ratios the stored
+    front-to-back ratios. forward_gain needs the pattern; front_to_back is
+    taken from the pattern when there is one, otherwise from ratios.
+    """
+    thetas = cut[0] + cut[2] * np.arange(cut[1], dtype=float) if pattern is not None else np.zeros(0)
+    forward = np.flatnonzero(np.isclose(thetas, FORWARD_THETA))
+    missing = np.full(len(impedance), np.nan)
+
+    columns = []
+    for name in objectives:
+        if name == 'gain':
+            value = gain.mean(axis=1)
+        elif name == 'real_penalty':
+            value = np.abs(impedance.real - target_real_impedance).mean(axis=1)
+        elif name == 'imag_penalty':
+            value = np.abs(impedance.imag).mean(axis=1)
+        elif name == 'vswr':
+            value = vswr(impedance, z0).mean(axis=1)
+        elif name == 'max_vswr':
+            value = vswr(impedance, z0).max(axis=1)
+        elif name == 'forward_gain':
+            value = pattern[:, :, forward[0]].mean(axis=1) if len(forward) else missing
+        elif name == 'front_to_back':
+            if pattern is not None:
+                value = pattern_summary(pattern, thetas)[1].mean(axis=1)
+            else:
+                value = ratios.mean(axis=1) if ratios is not None else missing
+        else:
+            raise ValueError(f"Unknown objective '{name}', expected one of {sorted(OBJECTIVES)}")
+        columns.append(np.where(np.isfinite(value), value, -MISSING * OBJECTIVES[name]))
+    return np.column_stack(columns)
+
+
+def pareto_front(values, weights, block=1024):
+    """Indices of the non-dominated rows of values (weights > 0 maximise, < 0 minimise).
+
+    Rows are visited in lexicographic order, best first, so a row can only
+    be dominated by a row already on the front: each block of rows is
+    checked against the front at once, and only its survivors one by one.
+    """
+    values = np.asarray(values, dtype=float).reshape(len(values), -1) * np.sign(weights)
+    order = np.lexsort(-values.T[::-1])
+    front = []
+    for start in range(0, len(order), block):
+        candidates = order[start:start + block]
+        if front:
+            members = values[front][None, :, :]
+            rows = values[candidates][:, None, :]
+            dominated = np.any(np.all(members >= rows, axis=2) & np.any(members > rows, axis=2), axis=1)
+            candidates = candidates[~dominated]
+        for i in candidates:
+            if front:
+                members = values[front]
+                if np.any(np.all(members >= values[i], axis=1) & np.any(members > values[i], axis=1)):
+                    continue
+            front.append(i)
+    return sorted(int(i) for i in front)
+
+
+def rescore_archive(db_path, objectives=DEFAULT_OBJECTIVES, target_real_impedance=50.0, z0=50.0,
+                    run=None, generation=None, fidelity='full'):
+    """Recompute objectives over an archive and mark its new Pareto front.
+
+    run defaults to the latest run, generation and fidelity filter as in
+    query_archive. Each design appears once. Returns dicts with 'lengths',
+    'distances', one entry per objective and 'front' (True on the Pareto
+    front). Rows are scored as stacked arrays, one stack per number of
+    frequencies and pattern cut, so an archive of many thousand rows takes
+    seconds.
+    """
+    objectives = tuple(objectives)
+    unknown = [name for name in objectives if name not in OBJECTIVES]
+    if unknown or not objectives:
+        raise ValueError(f"Unknown objectives {unknown}, expected some of {sorted(OBJECTIVES)}")
+    rows = query_archive(db_path, run=run, generation=generation, fidelity=fidelity,
+                         columns=['lengths', 'distances', 'gain_per_frequency', 'front_to_back_per_frequency',
+                                  'impedance', 'pattern', 'pattern_cut'])
+
+    # one row per design, grouped by what can be stacked into arrays
+    seen = set()
+    groups = {}
+    for row in rows:
+        key = tuple(row['lengths'] + row['distances'])
+        if key in seen or not len(row['impedance']):
+            continue
+        seen.add(key)
+        shape = (len(row['impedance']), row['pattern_cut'] if row['pattern'] is not None else None,
+                 bool(row['front_to_back_per_frequency']))
+        groups.setdefault(shape, []).append(row)
+
+    designs = []
+    values = []
+    for (_, cut, has_ratios), group in groups.items():
+        values.append(objective_values(
+            np.array([row['impedance'] for row in group]), np.array([row['gain_per_frequency'] for row in group]),
+            objectives, target_real_impedance, z0,
+            pattern=np.array([row['pattern'] for row in group]) if cut else None, cut=cut,
+            ratios=np.array([row['front_to_back_per_frequency'] for row in group]) if has_ratios else None))
+        designs += [{'lengths': row['lengths'], 'distances': row['distances']} for row in group]
+    if not designs:
+        return []
+
+    values = np.concatenate(values)
+    front = set(pareto_front(values, [OBJECTIVES[name] for name in objectives]))
+    for i, (design, row) in enumerate(zip(designs, values)):
+        design.update(zip(objectives, row.tolist()))
+        design['front'] = i in front
+    return designs
+
+
+def write_rescored_csv(path, designs, objectives=DEFAULT_OBJECTIVES, front_only=True):
+    """Write re-scored designs (by default only the front), best first objective first."""
+    designs = [design for design in designs if design['front'] or not front_only]
+    designs.sort(key=lambda design: -OBJECTIVES[objectives[0]] * design[objectives[0]])
+    num_elements = max((len(design['lengths']) for design in designs), default=0)
+    with open(path, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow([f"Length {i + 1}" for i in range(num_elements)]
+                        + [f"Distance {i + 1}" for i in range(num_elements - 1)] + list(objectives))
+        for design in designs:
+            writer.writerow(design['lengths'] + design['distances'] + [design[name] for name in objectives])
+    return len(designs)
@@ -0,0 +1,108 @@
+# scheduler.py
+"""Asynchronous evaluation with a steady-state NSGA-II.
+
+The generational loop waits for the slowest solver call of every
+generation. Here an asyncio event loop keeps one evaluation in flight per
+slot (each slot owns a scratch directory, so that many solver subprocesses
+run at once) and starts the next one as soon as a slot frees up. Every
+finished offspring is inserted into the population by NSGA-II survivor
+selection right away, and the next offspring is bred from that population.
+
+Each solver call has a timeout; a call that times out or fails (crashed
+solver, missing or unreadable output) is retried after a pause that doubles
+with every attempt.
+"""
+import asyncio
+
+from optimizer.instrumentation import PhaseTimer
+
+
+class EvaluationScheduler:
+    """Runs solve(genome, slot, timer) coroutines, at most one per slot at a time.
+
+    solve returns the raw results, or None on failure. timeout (seconds,
+    None for no limit) bounds each attempt; a failed or timed-out attempt
+    is retried up to retries times, backoff × 2^(attempt - 1) seconds later.
+    The slot is released during the pause, so other designs keep it busy.
+    """
+
+    def __init__(self, solve, slots, timeout=None, retries=2, backoff=0.5):
+        self.solve = solve
+        self.slots = slots
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.free = None
+        self.stats = {'timeouts': 0, 'retries': 0, 'retry_failures': 0}
+
+    async def evaluate(self, genome):
+        """(results or None, phase timings summed over the attempts) of one genome."""
+        if self.free is None:
+            # created here so it belongs to the running event loop
+            self.free = asyncio.Queue()
+            for slot in range(self.slots):
+                self.free.put_nowait(slot)
+
+        timer = PhaseTimer()
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats['retries'] += 1
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            slot = await self.free.get()
+            try:
+                results = await asyncio.wait_for(self.solve(genome, slot, timer), self.timeout)
+            except asyncio.TimeoutError:
+                self.stats['timeouts'] += 1
+                results = None
+            finally:
+                self.free.put_nowait(slot)
+            if results is not None:
+                return results, dict(timer.totals)
+        if self.retries:
+            self.stats['retry_failures'] += 1
+        return None, dict(timer.totals)
+
+
+async def steady_state_nsga2(population, breed, evaluate, select, budget, in_flight, on_result=None):
+    """Steady-state NSGA-II: each offspring joins the population as soon as it is evaluated.
+
+    breed(population) returns new individuals, evaluate(individual) is a
+    coroutine assigning its fitness, and select(individuals, k) is the NSGA-II
+    survivor selection that keeps the population size. Up to in_flight
+    evaluations run at once, budget in total; on_result(individual,
+    completed) is called after every insertion. Offspring whose fitness is
+    still valid (unchanged clones) are dropped without an evaluation.
+    """
+    size = len(population)
+    queue = []
+    pending = set()
+    submitted = completed = 0
+
+    try:
+        while completed < budget:
+            while len(pending) < in_flight and submitted < budget:
+                if not queue:
+                    # many rounds without a changed child means variation is off
+                    for _ in range(100):
+                        queue = [ind for ind in breed(population) if not ind.fitness.valid]
+                        if queue:
+                            break
+                    else:
+                        break
+                pending.add(asyncio.ensure_future(evaluate(queue.pop(0))))
+                submitted += 1
+            if not pending:
+                break
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                individual = task.result()
+                population[:] = select(population + [individual], size)
+                completed += 1
+                if on_result is not None:
+                    on_result(individual, completed)
+    finally:
+        # an error in one evaluation must not leave solvers running
+        for task in pending:
+            task.cancel()
+    return population
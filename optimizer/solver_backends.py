@@ -0,0 +1,220 @@
+# solver_backends.py
+import os
+import asyncio
+from functools import partial
+
+import numpy as np
+
+from optimizer.NEC_tools import (
+    make_launcher, parse_nec_output, read_nec_batch_results, create_nec_input, create_nec_batch_input,
+    pattern_cut, pattern_thetas, pattern_summary
+)
+from optimizer.mom_solver import solve_yagis
+from optimizer.instrumentation import PhaseTimer
+
+
+def make_results(frequencies, real, imag, gain, front_to_back=None, pattern=None, cut=None):
+    """Raw per-frequency results in the form stored by the evaluation cache.
+
+    front_to_back is only stored when the far-field mode samples it. pattern,
+    the gain cut (dB) of each frequency, is stored with its cut (first
+    theta, count, step) when settings ask to keep it.
+    """
+    results = {
+        'frequencies': list(frequencies),
+        'real': [float(v) for v in real],
+        'imag': [float(v) for v in imag],
+        'gain': [float(v) for v in gain],
+    }
+    if front_to_back is not None and np.all(np.isfinite(front_to_back)):
+        results['front_to_back'] = [float(v) for v in front_to_back]
+    if pattern is not None:
+        results['pattern'] = np.round(np.asarray(pattern, dtype=float), 2).tolist()
+        results['pattern_cut'] = list(cut)
+    return results
+
+
+def far_field_settings(settings):
+    """(far-field mode, pattern step, whether the front-to-back ratio is needed) of settings."""
+    return settings.get('far_field', 'full'), settings.get('pattern_step', 5), settings.get('front_to_back', False)
+
+
+class SolverBackend:
+    """Turns Yagi geometries into raw per-frequency solver results."""
+
+    name = None
+    # True if solving many geometries in one call is much cheaper than one by one
+    vectorized = False
+
+    def solve(self, geometries, frequencies, settings, paths, timer=None):
+        """Return one results dict (or None on failure) per (lengths, distances) geometry.
+
+        timer, a PhaseTimer, receives the time spent writing the deck, in the
+        solver and parsing its output.
+        """
+        raise NotImplementedError
+
+    async def solve_async(self, geometries, frequencies, settings, paths, timer=None):
+        """solve for an asyncio event loop; by default it runs in the loop's thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self.solve, geometries, frequencies, settings, paths, timer))
+
+
+class NecBackend(SolverBackend):
+    """External NEC-2 executable, driven through deck and output files."""
+
+    name = 'nec'
+
+    def write_deck(self, geometries, frequencies, settings, paths, timer):
+        far_field, pattern_step, _ = far_field_settings(settings)
+        symmetric = settings.get('symmetric', False)
+        with timer.phase("deck"):
+            if len(geometries) == 1:
+                lengths, distances = geometries[0]
+                create_nec_input(lengths, distances, paths['input'], frequencies, settings['segments'], settings['radius'],
+                                 pattern_step, far_field, symmetric)
+            else:
+                create_nec_batch_input(geometries, paths['input'], frequencies, settings['segments'], settings['radius'],
+                                       pattern_step, far_field, symmetric)
+
+            # a stale output from an earlier run must never be read as this run's result
+            if os.path.exists(paths['output']):
+                os.remove(paths['output'])
+
+    def read_results(self, launch, count, frequencies, settings, paths, timer):
+        """Parse the output of a launch into one results dict (or None) per geometry."""
+        if launch.failed or not os.path.exists(paths['output']):
+            return [None] * count
+
+        far_field, pattern_step, front_to_back = far_field_settings(settings)
+        keep_pattern = settings.get('keep_pattern', False)
+        cut = pattern_cut(far_field, pattern_step)
+        symmetric = settings.get('symmetric', False)
+        with timer.phase("parse"):
+            # the full cut only needs the running maximum, the other modes read the gain column;
+            # the max gain comes from the pattern, so parsing stops after the last frequency's pattern
+            summary_only = far_field == 'full' and not front_to_back and not keep_pattern
+            if count == 1:
+                parsed = [parse_nec_output(paths['output'], summary_only=summary_only,
+                                           num_frequencies=len(frequencies), need_pattern=True)]
+            else:
+                parsed = read_nec_batch_results(paths['output'], count, summary_only, len(frequencies))
+
+        results = []
+        for result in parsed:
+            if result is None or len(result) != len(frequencies) or np.isnan(result.impedance.real).any():
+                results.append(None)
+                continue
+            result = result.far_field(far_field, pattern_step)
+            # a symmetric deck splits the feed into two sources in series
+            impedance = result.impedance * 2 if symmetric else result.impedance
+            pattern = None
+            if keep_pattern and all(len(gains) == cut[1] for gains in result.gains):
+                pattern = result.gains
+            results.append(make_results(frequencies, impedance.real, impedance.imag, result.max_gain,
+                                        result.front_to_back, pattern, cut))
+        return results
+
+    @staticmethod
+    def launcher(settings):
+        return make_launcher(settings.get('launcher', 'powershell'), settings.get('solver_command'), settings.get('solver_timeout'))
+
+    def solve(self, geometries, frequencies, settings, paths, timer=None):
+        """Solve all geometries in one deck.
+
+        NEC stops at the first bad structure of a deck and a failed launch
+        loses the whole batch, so the geometries a batch leaves without
+        results are solved again one by one; only those that also fail
+        alone get None.
+        """
+        timer = timer or PhaseTimer()
+        frequencies = list(frequencies)
+        self.write_deck(geometries, frequencies, settings, paths, timer)
+        with timer.phase("solver"):
+            launch = self.launcher(settings).run(paths)
+        results = self.read_results(launch, len(geometries), frequencies, settings, paths, timer)
+        if len(geometries) > 1:
+            for i, result in enumerate(results):
+                if result is None:
+                    results[i] = self.solve([geometries[i]], frequencies, settings, paths, timer)[0]
+        return results
+
+    async def solve_async(self, geometries, frequencies, settings, paths, timer=None):
+        """solve with the solver awaited as an asyncio subprocess, so many can run from one event loop."""
+        timer = timer or PhaseTimer()
+        frequencies = list(frequencies)
+        self.write_deck(geometries, frequencies, settings, paths, timer)
+        with timer.phase("solver"):
+            launch = await self.launcher(settings).run_async(paths)
+        results = self.read_results(launch, len(geometries), frequencies, settings, paths, timer)
+        if len(geometries) > 1:
+            for i, result in enumerate(results):
+                if result is None:
+                    results[i] = (await self.solve_async([geometries[i]], frequencies, settings, paths, timer))[0]
+        return results
+
+
+class MomBackend(SolverBackend):
+    """In-process NumPy thin-wire method of moments (see mom_solver)."""
+
+    name = 'mom'
+    vectorized = True
+
+    def solve(self, geometries, frequencies, settings, paths, timer=None):
+        timer = timer or PhaseTimer()
+        half_lengths = np.array([[length / 2 for length in lengths] for lengths, _ in geometries])
+        x_positions = np.array([np.concatenate(([0.0], np.cumsum(distances))) for _, distances in geometries])
+
+        # the same theta cut as the RP card of create_nec_input
+        far_field, pattern_step, _ = far_field_settings(settings)
+        thetas = pattern_thetas(far_field, pattern_step)
+        # the adaptive mode resamples every pattern_step degrees around the peak of its coarse cut
+        refine_step = pattern_step if far_field == 'adaptive' else None
+        with timer.phase("solver"):
+            impedance, max_gain, pattern = solve_yagis(half_lengths, x_positions, list(frequencies), settings['segments'],
+                                                       settings['radius'], thetas=thetas, phis=np.zeros_like(thetas),
+                                                       return_pattern=True, symmetric=settings.get('symmetric', False),
+                                                       refine_step=refine_step)
+            gain, front_to_back = pattern_summary(pattern, thetas, far_field)
+            if refine_step:
+                gain = max_gain
+        results = []
+        keep_pattern = settings.get('keep_pattern', False)
+        cut = pattern_cut(far_field, pattern_step)
+        for row_z, row_gain, row_ratio, row_pattern in zip(impedance, gain, front_to_back, pattern):
+            if not np.all(np.isfinite(row_z)) or not np.all(np.isfinite(row_gain)):
+                results.append(None)
+                continue
+            results.append(make_results(frequencies, row_z.real, row_z.imag, row_gain, row_ratio,
+                                        row_pattern if keep_pattern else None, cut))
+        return results
+
+
+def check_symmetry(backend, geometry, frequencies, settings, paths, tolerance=0.05, gain_tolerance=0.2):
+    """Compare the symmetric model of one (lengths, distances) geometry with the full model.
+
+    Returns (within tolerance, largest relative feed impedance error, largest
+    gain error in dB); a failed simulation is never within tolerance.
+    """
+    full = backend.solve([geometry], frequencies, dict(settings, symmetric=False), paths)[0]
+    half = backend.solve([geometry], frequencies, dict(settings, symmetric=True), paths)[0]
+    if full is None or half is None:
+        return False, float("nan"), float("nan")
+    z_full = np.array(full['real']) + 1j * np.array(full['imag'])
+    z_half = np.array(half['real']) + 1j * np.array(half['imag'])
+    impedance_error = float(np.max(np.abs(z_half - z_full) / np.abs(z_full)))
+    gain_error = float(np.max(np.abs(np.subtract(half['gain'], full['gain']))))
+    return impedance_error <= tolerance and gain_error <= gain_tolerance, impedance_error, gain_error
+
+
+BACKENDS = {
+    NecBackend.name: NecBackend(),
+    MomBackend.name: MomBackend(),
+}
+
+def get_backend(name):
+    """Look up a solver backend by its config name ([Solver] backend)."""
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown solver backend '{name}', expected one of {sorted(BACKENDS)}")
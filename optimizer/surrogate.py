@@ -0,0 +1,103 @@
+# surrogate.py
+import math
+import random
+
+import numpy as np
+
+
+class RBFSurrogate:
+    """Gaussian radial-basis-function model from genomes to objective values.
+
+    Trained on every successful evaluation so far (the most recent max_samples
+    of them), it predicts the objectives of offspring before they reach the
+    solver.
+    """
+
+    def __init__(self, min_samples=30, max_samples=500, smoothing=1e-6):
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.smoothing = smoothing
+        self.genomes = []
+        self.objectives = []
+        self.model = None
+
+    @property
+    def ready(self):
+        return len(self.genomes) >= self.min_samples
+
+    def add(self, genomes, objectives):
+        """Record evaluated genomes and their objective values."""
+        for genome, values in zip(genomes, objectives):
+            self.genomes.append(list(genome))
+            self.objectives.append(list(values))
+        del self.genomes[:-self.max_samples]
+        del self.objectives[:-self.max_samples]
+        self.model = None
+
+    def fit(self):
+        x = np.asarray(self.genomes, dtype=float)
+        y = np.asarray(self.objectives, dtype=float)
+
+        # scale genes and objectives so every dimension weighs the same
+        x_low = x.min(axis=0)
+        x_span = np.where(np.ptp(x, axis=0) > 0, np.ptp(x, axis=0), 1.0)
+        y_mean = y.mean(axis=0)
+        y_std = np.where(y.std(axis=0) > 0, y.std(axis=0), 1.0)
+        xs = (x - x_low) / x_span
+
+        dist2 = np.sum((xs[:, None, :] - xs[None, :, :]) ** 2, axis=-1)
+        # kernel width: mean distance to the nearest neighbour
+        nearest = np.sqrt(np.min(dist2 + np.diag(np.full(len(xs), np.inf)), axis=1))
+        width2 = max(float(np.mean(nearest)) ** 2, 1e-12)
+
+        kernel = np.exp(-dist2 / (2 * width2)) + self.smoothing * np.eye(len(xs))
+        weights = np.linalg.lstsq(kernel, (y - y_mean) / y_std, rcond=None)[0]
+        self.model = (xs, x_low, x_span, width2, weights, y_mean, y_std)
+
+    def predict(self, genomes):
+        """Predicted objectives, shaped (len(genomes), n_objectives)."""
+        if self.model is None:
+            self.fit()
+        xs, x_low, x_span, width2, weights, y_mean, y_std = self.model
+        q = (np.asarray(genomes, dtype=float) - x_low) / x_span
+        dist2 = np.sum((q[:, None, :] - xs[None, :, :]) ** 2, axis=-1)
+        return np.exp(-dist2 / (2 * width2)) @ weights * y_std + y_mean
+
+
+def pareto_ranks(objectives, weights):
+    """Non-domination rank (0 = front) of each row; weights > 0 maximise, < 0 minimise."""
+    values = np.asarray(objectives, dtype=float) * np.sign(weights)
+    ranks = np.full(len(values), -1)
+    remaining = np.arange(len(values))
+    rank = 0
+    while remaining.size:
+        sub = values[remaining]
+        dominated = np.array([
+            np.any(np.all(sub >= row, axis=1) & np.any(sub > row, axis=1)) for row in sub
+        ])
+        ranks[remaining[~dominated]] = rank
+        remaining = remaining[dominated]
+        rank += 1
+    return ranks
+
+
+def prescreen(predictions, weights, eval_fraction, exploration_fraction):
+    """Indices of the individuals worth a real evaluation.
+
+    The best eval_fraction by predicted Pareto rank are kept, plus a random
+    exploration_fraction of the rest so the model keeps learning outside its
+    predicted front.
+    """
+    count = len(predictions)
+    if count == 0:
+        return []
+    ranks = pareto_ranks(predictions, weights)
+    # within a rank, prefer higher predicted gain (the first objective)
+    order = sorted(range(count), key=lambda i: (ranks[i], -weights[0] * predictions[i][0]))
+
+    n_best = min(count, max(1, math.ceil(eval_fraction * count)))
+    chosen = order[:n_best]
+    rest = order[n_best:]
+    n_explore = min(len(rest), math.ceil(exploration_fraction * count))
+    chosen += random.sample(rest, n_explore)
+    return sorted(chosen)
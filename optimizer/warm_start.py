@@ -0,0 +1,129 @@
+# warm_start.py
+"""Seed an initial population from the results of earlier runs.
+
+Sources are result CSV files (as written by run_optimization) and evaluation
+archives (.db/.sqlite, see archive.py). Archive designs that fit the current
+run and were simulated at its frequencies, with its solver backend, segments,
+wire radius, far-field sampling and symmetry, are re-scored from their raw
+results, so they cost no solver call. CSV designs only rank the seeds: a CSV
+does not record the band, far-field mode or target impedance its objectives
+were computed under, so they are evaluated again. Designs that do not fit
+are repaired (padded/truncated and clipped into the bounds) or resampled.
+"""
+import csv
+
+import numpy as np
+
+from optimizer.archive import ARCHIVE_EXTENSIONS, query_archive, result_settings
+from optimizer.surrogate import pareto_ranks
+
+
+def read_csv_designs(path):
+    """(lengths, distances, objectives) of every row of a result CSV (3 or 4 objectives)."""
+    designs = []
+    with open(path, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader)
+        num_lengths = sum(1 for name in header if name.startswith("Length"))
+        num_distances = sum(1 for name in header if name.startswith("Distance"))
+        for row in reader:
+            values = [float(v) for v in row]
+            lengths = values[:num_lengths]
+            distances = values[num_lengths:num_lengths + num_distances]
+            designs.append((lengths, distances, tuple(values[num_lengths + num_distances:])))
+    return designs
+
+
+def read_archive_designs(path):
+    """(lengths, distances, objectives, raw results, settings) of the full-fidelity rows of the latest run in an archive.
+
+    settings are the result settings the row was simulated with (None for
+    rows written before they were stored).
+    """
+    rows = query_archive(path, fidelity='full', columns=['lengths', 'distances', 'frequencies', 'real', 'imag',
+                                                         'gain_per_frequency', 'gain', 'real_penalty', 'imag_penalty',
+                                                         'front_to_back', 'front_to_back_per_frequency', 'settings'])
+    designs = []
+    for row in rows:
+        results = {'frequencies': row['frequencies'], 'real': row['real'], 'imag': row['imag'], 'gain': row['gain_per_frequency']}
+        objectives = (row['gain'], row['real_penalty'], row['imag_penalty'])
+        if row['front_to_back_per_frequency']:
+            results['front_to_back'] = row['front_to_back_per_frequency']
+            objectives += (row['front_to_back'],)
+        designs.append((row['lengths'], row['distances'], objectives, results, row['settings']))
+    return designs
+
+
+def in_bounds(genes, bounds):
+    genes = np.asarray(genes, dtype=float)
+    if len(genes) != bounds.size:
+        return False
+    locked_ok = np.all(np.isclose(genes[bounds.locked], bounds.fixed[bounds.locked]))
+    return bool(locked_ok and np.all(genes >= bounds.low - 1e-9) and np.all(genes <= bounds.high + 1e-9))
+
+
+def repair_design(lengths, distances, num_elements, bounds, rng):
+    """Truncate or pad (with random genes) a design to num_elements, then clip it into the bounds."""
+    random_genes = bounds.sample(rng, ())
+    lengths = list(lengths[:num_elements]) + list(random_genes[len(lengths):num_elements])
+    distances = list(distances[:num_elements - 1]) + list(random_genes[num_elements + len(distances):])
+    return bounds.clip(np.array(lengths + distances, dtype=float)).tolist()
+
+
+def seed_designs(paths, count, num_elements, bounds, rng, weights, frequencies, settings, rescore,
+                 reuse_fitness=True, mismatch='repair', max_candidates=2000):
+    """Up to count (genes, fitness) pairs taken from earlier result files.
+
+    Designs are ranked by their stored objectives (Pareto rank, then gain) and
+    duplicates dropped. fitness is () when the design must be evaluated again:
+    it did not fit num_elements/bounds, reuse_fitness is off, it came from a
+    CSV, or an archive row was simulated at other frequencies or with other
+    result settings (see archive.result_settings) than settings, the
+    evaluation settings of the current run. Matching archive rows are
+    re-scored with rescore(results), so a changed target impedance is taken
+    into account; rescore returns None for results it cannot score.
+    mismatch is 'repair' or 'resample'.
+
+    Archives can hold many thousand rows, so only the max_candidates designs
+    with the highest stored gain are ranked.
+    """
+    current = result_settings(settings)
+    candidates = {}
+    for path in paths:
+        if path.endswith(ARCHIVE_EXTENSIONS):
+            for lengths, distances, objectives, results, stored in read_archive_designs(path):
+                same_problem = results['frequencies'] == list(frequencies) and stored == current
+                fitness = rescore(results) if same_problem else None
+                candidates[tuple(lengths + distances)] = (lengths, distances, objectives, fitness)
+        else:
+            for lengths, distances, objectives in read_csv_designs(path):
+                # the objectives only rank the design: the CSV does not say what problem they score
+                candidates[tuple(lengths + distances)] = (lengths, distances, objectives, None)
+    if not candidates or count <= 0:
+        return []
+    candidates = sorted(candidates.values(), key=lambda candidate: -weights[0] * candidate[2][0])[:max_candidates]
+
+    # rank on the three objectives every source stores
+    ranks = pareto_ranks([objectives[:3] for _, _, objectives, _ in candidates], weights[:3])
+    order = sorted(range(len(candidates)), key=lambda i: (ranks[i], -weights[0] * candidates[i][2][0]))
+
+    seeds = []
+    seen = set()
+    for i in order:
+        lengths, distances, _, fitness = candidates[i]
+        genes = list(lengths) + list(distances)
+        if in_bounds(genes, bounds) and len(lengths) == num_elements:
+            fitness = fitness if reuse_fitness and fitness is not None else ()
+        elif mismatch == 'resample':
+            genes, fitness = bounds.sample(rng, ()).tolist(), ()
+        else:
+            genes, fitness = repair_design(lengths, distances, num_elements, bounds, rng), ()
+
+        key = tuple(round(gene, 6) for gene in genes)
+        if key in seen:
+            continue
+        seen.add(key)
+        seeds.append((genes, tuple(fitness)))
+        if len(seeds) == count:
+            break
+    return seeds
@@ -0,0 +1,58 @@
+# conftest.py
+"""Shared fixtures: small configs that run in seconds without a NEC binary.
+
+Runs use the in-process MoM backend, or benchmarks/fake_nec.py through the
+direct launcher for the NEC file path, and keep every file under tmp_path.
+"""
+import configparser
+import os
+import sys
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FAKE_NEC = f'"{sys.executable}" "{os.path.join(PROJECT_DIR, "benchmarks", "fake_nec.py")}" -i {{input}} -o {{output}}'
+
+
+def designs(population):
+    """(genes, fitness) of every individual, for exact comparisons of two runs."""
+    return [(list(ind), tuple(ind.fitness.values)) for ind in population]
+
+
+def sweep_settings(config_path):
+    """evaluate_sweep settings of a 'sweep' run of config_path at full fidelity, to re-check reported fitness."""
+    config = configparser.ConfigParser(interpolation=None)
+    config.read(config_path)
+    simulation = config['Simulation']
+    return {'num_elements': 3, 'frequency': 144.0, 'frequencies': [143.0, 144.0, 145.0], 'target_real_impedance': 50.0,
+            'segments': simulation.getint('segments'), 'radius': simulation.getfloat('wire_radius'), 'pattern_step': 5,
+            'far_field': 'full', 'front_to_back': False, 'symmetric': False, 'keep_pattern': False, 'backend': 'mom',
+            'paths': None}
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """Write the project's config.ini with test defaults and overrides ({section: {key: value}}) into tmp_path."""
+    def make(overrides=None, name='config.ini'):
+        config = configparser.ConfigParser(interpolation=None)
+        config.read(os.path.join(PROJECT_DIR, 'config.ini'))
+        defaults = {
+            'Paths': {'input_dir': tmp_path / 'data', 'output_dir': tmp_path / 'data', 'tmp_file': tmp_path / 'nec.tmp'},
+            'Solver': {'backend': 'mom', 'launcher': 'direct', 'command': FAKE_NEC, 'timeout': 30},
+            'GeneticAlgorithm': {'population_size': 8, 'num_generations': 3},
+            'Parallel': {'num_workers': 1, 'scratch_dir': tmp_path / 'scratch'},
+            'Output': {'csv_output_file': tmp_path / f'{name}.csv', 'enable_plots': False},
+            'Checkpoint': {'file': tmp_path / f'{name}.pkl'},
+        }
+        for values in (defaults, overrides or {}):
+            for section, entries in values.items():
+                if not config.has_section(section):
+                    config.add_section(section)
+                for key, value in entries.items():
+                    config.set(section, key, str(value))
+        path = tmp_path / name
+        with open(path, 'w') as file:
+            config.write(file)
+        return str(path)
+    return make
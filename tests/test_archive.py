@@ -0,0 +1,50 @@
+# test_archive.py
+"""Packed raw results in the archive (user-022) read back as written and re-score like the optimizer."""
+import numpy as np
+import pytest
+
+from optimizer.archive import (EvaluationArchive, decode_impedance, decode_pattern, encode_impedance,
+                               encode_pattern, query_archive)
+from optimizer.evaluation import fitness_from_results
+from optimizer.rescore import rescore_archive
+from optimizer.solver_backends import get_backend
+
+SETTINGS = {'segments': 9, 'radius': 0.006, 'pattern_step': 5, 'far_field': 'full', 'keep_pattern': True}
+GEOMETRIES = [([0.48, 0.44, 0.42], [0.2, 0.25]), ([0.5, 0.46, 0.4], [0.3, 0.3])]
+FREQUENCIES = [143.0, 144.0, 145.0]
+
+
+def test_blobs_round_trip():
+    real, imag = [12.5, 50.0, 73.25], [-30.0, 0.0, 4.5]
+    impedance = decode_impedance(encode_impedance(real, imag))
+    assert impedance.real.tolist() == real and impedance.imag.tolist() == imag
+    assert len(decode_impedance(None)) == 0
+
+    pattern = np.round(np.random.default_rng(1).uniform(-40, 10, (3, 73)), 2)
+    decoded = decode_pattern(encode_pattern(pattern), (-180, 73, 5))
+    assert decoded.shape == (3, 73)
+    # float32 keeps the two stored decimals
+    np.testing.assert_allclose(decoded, pattern, atol=1e-5)
+    assert decode_pattern(None, (-180, 73, 5)) is None
+
+
+def test_archive_rows_round_trip_and_rescore(tmp_path):
+    results = get_backend('mom').solve(GEOMETRIES, FREQUENCIES, SETTINGS, paths=None)
+    db_path = str(tmp_path / "archive.db")
+    archive = EvaluationArchive(db_path, run="test")
+    for (lengths, distances), result in zip(GEOMETRIES, results):
+        archive.append(1, lengths, distances, result, fitness_from_results(result, 50.0), False, {})
+    archive.close()
+
+    rows = query_archive(db_path, columns=['lengths', 'real', 'imag', 'impedance', 'pattern', 'pattern_cut'])
+    for row, result in zip(rows, results):
+        assert row['real'] == result['real'] and row['imag'] == result['imag']
+        assert row['impedance'].tolist() == [complex(r, i) for r, i in zip(result['real'], result['imag'])]
+        assert row['pattern_cut'] == tuple(result['pattern_cut'])
+        np.testing.assert_allclose(row['pattern'], result['pattern'], atol=1e-5)
+
+    # re-scoring without the solver gives the optimizer's own fitness, here under another target
+    rescored = rescore_archive(db_path, target_real_impedance=25.0)
+    for design, result in zip(rescored, results):
+        assert tuple(design[name] for name in ('gain', 'real_penalty', 'imag_penalty')) == \
+            pytest.approx(fitness_from_results(result, 25.0))
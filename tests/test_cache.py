@@ -0,0 +1,34 @@
+# test_cache.py
+"""Evaluation cache (user-002, user-005): a SQLite cache never mixes the results of two solver backends."""
+import sqlite3
+
+from optimizer.eval_cache import make_cache_key
+from optimizer.genetic_optimizer import run_optimization
+
+GENOME = [0.48, 0.44, 0.42, 0.2, 0.25]
+
+
+def test_backends_get_different_keys():
+    keys = {make_cache_key(GENOME, 3, [144.0], 9, 0.006, backend=backend) for backend in ('nec', 'mom')}
+
+    assert len(keys) == 2
+
+
+def test_backends_do_not_share_a_cache_file(make_config, tmp_path):
+    db_file = tmp_path / 'cache.db'
+
+    def run(backend, name):
+        # generation 0 only: both backends evaluate the same random designs
+        overrides = {'Cache': {'db_file': db_file}, 'Solver': {'backend': backend}, 'GeneticAlgorithm': {'num_generations': 0}}
+        population = run_optimization('sweep', config_path=make_config(overrides, name))[0]
+        with sqlite3.connect(db_file) as db:
+            return [ind.fitness.values for ind in population], db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    mom, mom_rows = run('mom', 'mom.ini')
+    nec, nec_rows = run('nec', 'nec.ini')
+    mom_again, mom_again_rows = run('mom', 'mom_again.ini')
+
+    # the NEC run solves every design again; the second MoM run finds its own results only
+    assert mom_rows == 8 and nec_rows == 16 and mom_again_rows == 16
+    assert nec != mom
+    assert mom_again == mom
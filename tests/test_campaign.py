@@ -0,0 +1,75 @@
+# test_campaign.py
+"""Headless campaigns (user-025): job expansion and jobs that run like standalone runs."""
+import configparser
+import csv
+import os
+
+import pytest
+
+from optimizer.campaign import expand_jobs, run_campaign
+from optimizer.genetic_optimizer import run_optimization
+
+
+def parse_jobs(text):
+    job_config = configparser.ConfigParser(interpolation=None)
+    job_config.optionxform = str
+    job_config.read_string(text)
+    return expand_jobs(job_config)
+
+
+def test_alternatives_expand_into_named_jobs():
+    jobs = parse_jobs("""
+[Campaign]
+workers = 2
+
+[DEFAULT]
+GeneticAlgorithm.num_generations = 5
+
+[yagi]
+mode = single | sweep
+GeneticAlgorithm.num_elements = 3 | 4
+""")
+
+    assert [(name, mode) for name, mode, _ in jobs] == [
+        ('yagi_single_num_elements-3', 'single'), ('yagi_single_num_elements-4', 'single'),
+        ('yagi_sweep_num_elements-3', 'sweep'), ('yagi_sweep_num_elements-4', 'sweep')]
+    assert jobs[1][2] == {('GeneticAlgorithm', 'num_generations'): '5', ('GeneticAlgorithm', 'num_elements'): '4'}
+
+
+@pytest.mark.parametrize("job", ["[bad]\nnum_elements = 3\n", "[bad]\nmode = single | broad\n"])
+def test_bad_jobs_are_refused(job):
+    with pytest.raises(ValueError, match=r"\[bad\]"):
+        parse_jobs(job)
+
+
+def test_jobs_match_standalone_runs(make_config, tmp_path):
+    base_config = make_config({'GeneticAlgorithm': {'num_generations': 2}})
+    job_file = tmp_path / 'jobs.ini'
+    job_file.write_text(f"""
+[Campaign]
+config = {base_config}
+output_dir = {tmp_path / 'campaign'}
+workers = 2
+concurrent_jobs = 2
+
+[yagi]
+mode = sweep
+GeneticAlgorithm.num_elements = 3 | 4
+
+[broken]
+Solver.backend = missing
+""")
+
+    rows = run_campaign(str(job_file))
+
+    assert [(row['job'], row['status']) for row in rows] == [
+        ('yagi_num_elements-3', 'done'), ('yagi_num_elements-4', 'done'), ('broken', 'failed')]
+    with open(tmp_path / 'campaign' / 'summary.csv', newline='') as file:
+        assert [row['status'] for row in csv.DictReader(file)] == ['done', 'done', 'failed']
+    for row in rows[:2]:
+        with open(row['results']) as file:
+            campaign_results = file.read()
+        # the job's own config, run on its own, writes the same results CSV
+        run_optimization('sweep', config_path=os.path.join(os.path.dirname(row['results']), 'config.ini'))
+        with open(row['results']) as file:
+            assert file.read() == campaign_results
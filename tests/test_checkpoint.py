@@ -0,0 +1,71 @@
+# test_checkpoint.py
+"""A run resumed from a checkpoint (user-012) ends exactly like the uninterrupted run."""
+from collections import Counter
+
+import pytest
+
+from optimizer import genetic_optimizer
+from optimizer.archive import query_archive
+from conftest import designs
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_resume_matches_uninterrupted_run(make_config, monkeypatch):
+    overrides = {'GeneticAlgorithm': {'num_generations': 4}, 'Checkpoint': {'interval': 1}}
+    uninterrupted = genetic_optimizer.run_optimization('sweep', config_path=make_config(overrides, 'full.ini'))
+
+    config_path = make_config(overrides, 'resumed.ini')
+    save_checkpoint = genetic_optimizer.save_checkpoint
+
+    def save_and_crash(path, state):
+        save_checkpoint(path, state)
+        if state['gen'] == 2:
+            raise Interrupted()
+
+    monkeypatch.setattr(genetic_optimizer, 'save_checkpoint', save_and_crash)
+    with pytest.raises(Interrupted):
+        genetic_optimizer.run_optimization('sweep', config_path=config_path)
+    monkeypatch.setattr(genetic_optimizer, 'save_checkpoint', save_checkpoint)
+    resumed = genetic_optimizer.run_optimization('sweep', config_path=config_path, resume=True)
+
+    assert designs(resumed[0]) == designs(uninterrupted[0])
+    assert designs(resumed[2]) == designs(uninterrupted[2])
+    assert [record['gen'] for record in resumed[1]] == [1, 2, 3, 4]
+
+
+def test_resume_keeps_one_archive_row_per_evaluation(make_config, monkeypatch, tmp_path):
+    def overrides(name):
+        return {'GeneticAlgorithm': {'population_size': 20, 'num_generations': 4}, 'Checkpoint': {'interval': 2},
+                'Archive': {'db_file': tmp_path / name, 'buffer_size': 1}}
+
+    genetic_optimizer.run_optimization('sweep', config_path=make_config(overrides('full.db'), 'full.ini'))
+
+    config_path = make_config(overrides('resumed.db'), 'resumed.ini')
+    save_checkpoint = genetic_optimizer.save_checkpoint
+
+    def crash_after_checkpoint(path, state):
+        # generations 3 and 4 are archived row by row, then the run dies before their checkpoint
+        if state['gen'] == 4:
+            raise Interrupted()
+        save_checkpoint(path, state)
+
+    monkeypatch.setattr(genetic_optimizer, 'save_checkpoint', crash_after_checkpoint)
+    with pytest.raises(Interrupted):
+        genetic_optimizer.run_optimization('sweep', config_path=config_path)
+    monkeypatch.setattr(genetic_optimizer, 'save_checkpoint', save_checkpoint)
+    genetic_optimizer.run_optimization('sweep', config_path=config_path, resume=True)
+
+    def rows_per_gen(name):
+        return Counter(row['gen'] for row in query_archive(str(tmp_path / name), include_failed=True, columns=['gen']))
+
+    assert rows_per_gen('resumed.db') == rows_per_gen('full.db')
+
+
+def test_resume_refuses_changed_objectives(make_config):
+    genetic_optimizer.run_optimization('single', config_path=make_config({'Checkpoint': {'interval': 1}}))
+    changed = make_config({'Checkpoint': {'interval': 1}, 'GeneticAlgorithm': {'target_real_impedance': 75}})
+    with pytest.raises(ValueError, match="target_real_impedance"):
+        genetic_optimizer.run_optimization('single', config_path=changed, resume=True)
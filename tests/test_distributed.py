@@ -0,0 +1,64 @@
+# test_distributed.py
+"""Coordinator and workers on localhost (user-024): token check and reassignment of a lost worker's jobs."""
+import multiprocessing
+import socket
+import time
+
+from optimizer.distributed import Connection, Coordinator, run_worker
+from optimizer.solver_backends import get_backend
+
+TOKEN = "test-token"
+FREQUENCIES = [144.0]
+GENOMES = [[0.48, 0.44, 0.42, 0.2, 0.25], [0.5, 0.46, 0.4, 0.3, 0.3], [0.45, 0.45, 0.45, 0.25, 0.25]]
+
+
+def job_settings(tmp_path):
+    return {'backend': 'mom', 'num_elements': 3, 'segments': 9, 'radius': 0.006, 'pattern_step': 5,
+            'far_field': 'full', 'paths': {'input': str(tmp_path / 'input.nec'), 'output': str(tmp_path / 'output.out'),
+                                           'tmp': str(tmp_path / 'nec.tmp')}}
+
+
+def connect(port, token):
+    connection = Connection(socket.create_connection(("127.0.0.1", port)), "test")
+    connection.send({'type': 'hello', 'worker': 'test', 'capacity': 1, 'token': token})
+    return connection
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_wrong_token_is_rejected():
+    coordinator = Coordinator("127.0.0.1", 0, heartbeat_timeout=5.0, token=TOKEN).start()
+    try:
+        connection = connect(coordinator.port, "wrong")
+        # the coordinator closes the connection instead of registering a worker
+        assert connection.sock.recv(1) == b""
+        assert coordinator.workers == []
+    finally:
+        coordinator.close()
+
+
+def test_jobs_of_a_silent_worker_are_reassigned(tmp_path):
+    coordinator = Coordinator("127.0.0.1", 0, heartbeat_timeout=0.5, token=TOKEN).start()
+    # takes the first job, then never answers nor sends a heartbeat
+    silent = connect(coordinator.port, TOKEN)
+    wait_for(lambda: len(coordinator.workers) == 1)
+    worker = multiprocessing.Process(target=run_worker, args=("127.0.0.1", coordinator.port, TOKEN),
+                                     kwargs=dict(scratch_dir=str(tmp_path / "scratch"), heartbeat_interval=0.1, once=True))
+    worker.start()
+    try:
+        settings = job_settings(tmp_path)
+        outcomes = coordinator.run_jobs([([genome], FREQUENCIES, settings) for genome in GENOMES])
+    finally:
+        coordinator.close()
+        silent.close()
+        worker.join(10)
+
+    assert coordinator.stats['workers_lost'] == 1
+    assert coordinator.stats['jobs_reassigned'] == 1
+    local = get_backend('mom').solve([(genome[:3], genome[3:]) for genome in GENOMES], FREQUENCIES, settings, None)
+    assert [results[0] for results, _ in outcomes] == local
@@ -0,0 +1,40 @@
+# test_far_field.py
+"""The reduced far-field modes (user-018) agree with the full theta cut."""
+import numpy as np
+import pytest
+
+from optimizer.evaluation import make_scratch_paths
+from optimizer.solver_backends import get_backend
+from conftest import FAKE_NEC
+
+FREQUENCIES = [143.0, 145.0]
+SETTINGS = {'segments': 9, 'radius': 0.006, 'pattern_step': 5, 'front_to_back': True,
+            'launcher': 'direct', 'solver_command': FAKE_NEC, 'solver_timeout': 30}
+
+
+def solve(backend, mode, tmp_path):
+    """Gain and front-to-back (dB) of random 4-element designs, shaped (designs, frequencies)."""
+    rng = np.random.default_rng(1)
+    geometries = [(rng.uniform(0.3, 1.2, 4).tolist(), rng.uniform(0.1, 0.6, 3).tolist()) for _ in range(20)]
+    paths = make_scratch_paths(str(tmp_path), "input.nec", "output.out", "nec.tmp")
+    results = get_backend(backend).solve(geometries, FREQUENCIES, dict(SETTINGS, far_field=mode), paths)
+    return (np.array([result['gain'] for result in results]),
+            np.array([result.get('front_to_back', [np.nan] * len(FREQUENCIES)) for result in results]))
+
+
+@pytest.mark.parametrize("backend", ["mom", "nec"])
+def test_adaptive_peak_matches_full_cut(tmp_path, backend):
+    full, _ = solve(backend, 'full', tmp_path)
+    adaptive, _ = solve(backend, 'adaptive', tmp_path)
+    # MoM resamples around the coarse peak; NEC interpolates the coarse cut
+    tolerance = 1e-9 if backend == 'mom' else 0.05
+    np.testing.assert_allclose(adaptive, full, atol=tolerance)
+
+
+@pytest.mark.parametrize("backend", ["mom", "nec"])
+def test_forward_back_front_to_back_matches_full_cut(tmp_path, backend):
+    full_gain, full_ratio = solve(backend, 'full', tmp_path)
+    forward_gain, forward_ratio = solve(backend, 'forward_back', tmp_path)
+
+    np.testing.assert_allclose(forward_ratio, full_ratio, atol=0.01)
+    assert np.all(forward_gain <= full_gain + 0.01)
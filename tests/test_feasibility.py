@@ -0,0 +1,69 @@
+# test_feasibility.py
+"""The feasibility filter (user-021) repairs or rejects designs before they reach the solver."""
+import numpy as np
+import pytest
+
+from optimizer.evaluation import evaluate_sweep
+from optimizer.feasibility import feasibility_problems, repair_genes
+from optimizer.genetic_optimizer import run_optimization
+from optimizer.population import GeneBounds
+from conftest import sweep_settings
+
+NUM_ELEMENTS = 3
+MIN_SPACING = 0.012
+BOUNDS = GeneBounds(NUM_ELEMENTS, 0.3, 1.2, 1.0, False, False)
+
+
+def checks(total_distance=1.0, bounds=BOUNDS):
+    return bounds, NUM_ELEMENTS, total_distance, MIN_SPACING
+
+
+@pytest.mark.parametrize("genes, problems", [
+    ([0.5, 0.45, 0.42, 0.2, 0.25], []),
+    ([1.5, 0.45, 0.42, 0.2, 0.25], ["out_of_bounds"]),
+    ([0.5, 0.45, 0.42, 0.005, 0.25], ["out_of_bounds", "overlap"]),
+])
+def test_problems_name_the_violated_constraints(genes, problems):
+    assert feasibility_problems(genes, *checks()) == problems
+
+
+def test_problems_include_total_distance():
+    assert feasibility_problems([0.5, 0.45, 0.42, 0.3, 0.3], *checks(total_distance=0.5)) == ["total_distance"]
+
+
+def test_repaired_genes_are_feasible():
+    rng = np.random.default_rng(3)
+    # cxBlend children can land up to half the parents' spread outside the bounds
+    spread = BOUNDS.high - BOUNDS.low
+    for genes in rng.uniform(BOUNDS.low - spread, BOUNDS.high + spread, size=(200, BOUNDS.size)):
+        repaired = repair_genes(genes, *checks())
+        assert feasibility_problems(repaired, *checks()) == []
+        assert repaired == repair_genes(repaired, *checks())
+
+    # distances scaled down to a total_distance tighter than the bounds
+    repaired = repair_genes([0.5, 0.45, 0.42, 0.3, 0.3], *checks(total_distance=0.5))
+    assert sum(repaired[NUM_ELEMENTS:]) == pytest.approx(0.5)
+
+
+def test_repair_keeps_locked_genes():
+    bounds = GeneBounds(NUM_ELEMENTS, 0.3, 1.2, 1.0, False, True)
+    repaired = repair_genes([1.5, 0.45, 0.42, 0.005, 0.9], *checks(bounds=bounds))
+    assert repaired[NUM_ELEMENTS:] == list(bounds.fixed[NUM_ELEMENTS:])
+    assert repaired[0] == 1.2
+
+
+@pytest.mark.parametrize("mode", ["repair", "reject"])
+def test_run_filters_infeasible_offspring(make_config, mode):
+    config_path = make_config({'Feasibility': {'mode': mode}, 'GeneticAlgorithm': {'population_size': 10, 'num_generations': 4}})
+    population, logbook, hall_of_fame = run_optimization('sweep', config_path=config_path)
+
+    repaired = sum(record['infeasible_repaired'] for record in logbook)
+    rejected = sum(record['infeasible_rejected'] for record in logbook)
+    assert (repaired > 0, rejected > 0) == (mode == 'repair', mode == 'reject')
+    # a rejected design never reaches the solver, so it never outranks a simulated one
+    settings = sweep_settings(config_path)
+    # the bounds of the project's config.ini
+    run_bounds = GeneBounds(NUM_ELEMENTS, 0.25, 0.5, 1.0, False, False)
+    for ind in hall_of_fame:
+        assert feasibility_problems(ind, *checks(bounds=run_bounds)) == []
+        assert ind.fitness.values == evaluate_sweep(ind, settings)
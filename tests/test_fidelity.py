@@ -0,0 +1,44 @@
+# test_fidelity.py
+"""Multi-fidelity runs (user-017) evaluate early generations coarse and report full-fidelity designs only."""
+from optimizer.archive import query_archive
+from optimizer.evaluation import evaluate_sweep
+from optimizer.genetic_optimizer import run_optimization
+from conftest import sweep_settings
+
+
+def fidelity_config(make_config, tmp_path, full_from):
+    return make_config({'Fidelity': {'enabled': True, 'coarse_segments': 5, 'coarse_pattern_step': 15, 'full_from': full_from},
+                        'GeneticAlgorithm': {'population_size': 10, 'num_generations': 4},
+                        'Archive': {'db_file': tmp_path / 'archive.db'}})
+
+
+def assert_full_fidelity(config_path, population, hall_of_fame):
+    settings = sweep_settings(config_path)
+    for ind in list(population) + list(hall_of_fame):
+        assert ind.fitness.values == evaluate_sweep(ind, settings)
+
+
+def test_upgrade_switches_to_full_fidelity(make_config, tmp_path):
+    config_path = fidelity_config(make_config, tmp_path, 0.5)
+    population, logbook, hall_of_fame = run_optimization('sweep', config_path=config_path)
+
+    assert [record['fidelity'] for record in logbook] == ['coarse', 'full', 'full', 'full']
+    upgrades = [record.get('fidelity_upgrade_calls') for record in logbook]
+    assert upgrades[1] > 0 and upgrades[0] is None and upgrades[2:] == [None, None]
+    assert_full_fidelity(config_path, population, hall_of_fame)
+
+    # archived rows carry the fidelity and the segments they were simulated with
+    for row in query_archive(str(tmp_path / 'archive.db'), columns=['gen', 'fidelity', 'settings']):
+        coarse = row['gen'] < 2
+        assert row['fidelity'] == ('coarse' if coarse else 'full')
+        assert row['settings']['segments'] == (5 if coarse else sweep_settings(config_path)['segments'])
+        assert row['settings']['pattern_step'] == (15 if coarse else 5)
+
+
+def test_coarse_last_generation_is_upgraded_before_reporting(make_config, tmp_path):
+    # full_from above 1: every generation is coarse
+    config_path = fidelity_config(make_config, tmp_path, 1.5)
+    population, logbook, hall_of_fame = run_optimization('sweep', config_path=config_path)
+
+    assert all(record['fidelity'] == 'coarse' for record in logbook)
+    assert_full_fidelity(config_path, population, hall_of_fame)
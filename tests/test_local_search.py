@@ -0,0 +1,55 @@
+# test_local_search.py
+"""Memetic pattern search (user-016): improves without trading away Pareto position, and respects locks."""
+import numpy as np
+
+from optimizer.genetic_optimizer import run_optimization
+from optimizer.local_search import dominates, pattern_search
+from optimizer.population import GeneBounds
+
+WEIGHTS = (1.0, -1.0, -1.0)
+BOUNDS = GeneBounds(3, 0.25, 0.5, 1.0, False, False)
+TARGET = np.array([0.45, 0.4, 0.35, 0.2, 0.3])
+
+
+def distance_objectives(genomes):
+    """Gain falls and both penalties grow with the distance to TARGET; one call per genome."""
+    fitnesses = []
+    for genes in genomes:
+        distance = float(np.linalg.norm(np.asarray(genes) - TARGET))
+        fitnesses.append((-distance ** 2, distance, 2 * distance))
+    return fitnesses, len(genomes)
+
+
+def test_pattern_search_moves_towards_the_optimum():
+    start = [[0.3, 0.3, 0.3, 0.15, 0.15], [0.5, 0.5, 0.5, 0.3, 0.3]]
+    designs = list(zip(start, distance_objectives(start)[0]))
+
+    refined, report = pattern_search(designs, distance_objectives, BOUNDS, WEIGHTS, step=0.05, max_iterations=20)
+
+    assert report['solver_calls'] > 0
+    for (_, before), (genes, after) in zip(designs, refined):
+        assert after[1] < before[1]
+        assert not dominates(before, after, WEIGHTS)
+        assert np.all(BOUNDS.clip(np.array(genes)) == np.array(genes))
+
+
+def test_pattern_search_keeps_locked_genes():
+    bounds = GeneBounds(3, 0.25, 0.5, 1.0, True, False)
+    start = bounds.fixed.tolist()
+    refined, _ = pattern_search([(start, distance_objectives([start])[0][0])], distance_objectives, bounds, WEIGHTS)
+
+    assert refined[0][0][:3] == start[:3]
+
+
+def test_local_search_stage_never_worsens_a_design(make_config):
+    plain = run_optimization('single', config_path=make_config(name='plain.ini'))
+    refined = run_optimization('single', config_path=make_config({'LocalSearch': {'enabled': True}}, 'refined.ini'))
+
+    # the same seed gives the same last population; the stage (after the last generation) refines it in place
+    assert refined[1][-1]['local_search_calls'] > 0
+    changed = 0
+    for before, after in zip(plain[0], refined[0]):
+        if list(after) != list(before):
+            changed += 1
+            assert not dominates(before.fitness.values, after.fitness.values, WEIGHTS)
+    assert changed > 0
@@ -0,0 +1,35 @@
+# test_nec_backend.py
+"""A failed NEC batch (user-004) only costs the designs that fail on their own."""
+import asyncio
+
+from optimizer.evaluation import make_scratch_paths
+from optimizer.solver_backends import get_backend
+from conftest import FAKE_NEC
+
+FREQUENCIES = [143.0, 144.0, 145.0]
+SETTINGS = {'segments': 9, 'radius': 0.006, 'pattern_step': 5, 'far_field': 'full',
+            'launcher': 'direct', 'solver_command': FAKE_NEC, 'solver_timeout': 30}
+# fake_nec, like NEC-2, stops the deck at the zero-length element of the second design
+GEOMETRIES = [([0.48, 0.44, 0.42], [0.2, 0.25]), ([0.48, 0.0, 0.42], [0.2, 0.25]),
+              ([0.5, 0.45, 0.43], [0.25, 0.2]), ([0.49, 0.46, 0.41], [0.22, 0.24])]
+
+
+def solve_alone(backend, paths):
+    return [backend.solve([geometry], FREQUENCIES, SETTINGS, paths)[0] for geometry in GEOMETRIES]
+
+
+def test_failed_batch_is_solved_one_by_one(tmp_path):
+    backend = get_backend('nec')
+    paths = make_scratch_paths(str(tmp_path), "input.nec", "output.out", "nec.tmp")
+    alone = solve_alone(backend, paths)
+    assert alone[1] is None and all(alone[i] is not None for i in (0, 2, 3))
+
+    assert backend.solve(GEOMETRIES, FREQUENCIES, SETTINGS, paths) == alone
+
+
+def test_failed_async_batch_is_solved_one_by_one(tmp_path):
+    backend = get_backend('nec')
+    paths = make_scratch_paths(str(tmp_path), "input.nec", "output.out", "nec.tmp")
+    alone = solve_alone(backend, paths)
+
+    assert asyncio.run(backend.solve_async(GEOMETRIES, FREQUENCIES, SETTINGS, paths)) == alone
@@ -0,0 +1,16 @@
+# test_parallel.py
+"""The process pool (user-001) changes where designs are solved, not the result."""
+import pytest
+
+from optimizer.genetic_optimizer import run_optimization
+from conftest import designs
+
+
+@pytest.mark.parametrize("backend", ["nec", "mom"])
+def test_pool_matches_serial_run(make_config, backend):
+    serial = run_optimization('sweep', config_path=make_config({'Solver': {'backend': backend}}, 'serial.ini'))
+    parallel = run_optimization('sweep', config_path=make_config(
+        {'Solver': {'backend': backend}, 'Parallel': {'num_workers': 2, 'batch_size': 2}}, 'parallel.ini'))
+
+    assert designs(parallel[0]) == designs(serial[0])
+    assert designs(parallel[2]) == designs(serial[2])
@@ -0,0 +1,82 @@
+# test_parser.py
+"""The streaming NEC output parser (user-007) reads fake_nec output like the original parser."""
+import numpy as np
+import pytest
+
+from benchmarks.bench_parser import legacy_read_nec_output
+from benchmarks.fake_nec import run as run_fake_nec
+from optimizer.NEC_tools import (create_nec_batch_input, create_nec_input, parse_nec_output, read_nec_batch_results,
+                                 read_nec_output)
+
+FREQUENCIES = [143.0, 144.0, 145.0]
+GEOMETRIES = [([0.48, 0.44, 0.42], [0.2, 0.25]), ([0.5, 0.45, 0.43], [0.25, 0.2]), ([1.0, 0.9, 0.8], [0.3, 0.3])]
+
+
+def solve(tmp_path, geometry, frequencies=FREQUENCIES, far_field='full', name="deck"):
+    deck, output = str(tmp_path / f"{name}.nec"), str(tmp_path / f"{name}.out")
+    create_nec_input(*geometry, deck, frequencies, far_field=far_field)
+    run_fake_nec(deck, output)
+    return output
+
+
+def assert_same(result, expected):
+    np.testing.assert_array_equal(result.frequencies, expected.frequencies)
+    np.testing.assert_array_equal(result.impedance, expected.impedance)
+    np.testing.assert_array_equal(result.max_gain, expected.max_gain)
+    assert (result.gains is None) == (expected.gains is None)
+    for gains, expected_gains in zip(result.gains or [], expected.gains or []):
+        np.testing.assert_array_equal(gains, expected_gains)
+
+
+@pytest.mark.parametrize("far_field", ["full", "forward_back", "adaptive"])
+@pytest.mark.parametrize("geometry", GEOMETRIES)
+def test_summary_matches_original_parser(tmp_path, geometry, far_field):
+    single = solve(tmp_path, geometry, FREQUENCIES[:1], far_field, "single")
+    sweep = solve(tmp_path, geometry, FREQUENCIES, far_field, "sweep")
+
+    # the original parser reports the last impedance and the largest gain of the whole file
+    for output in (single, sweep):
+        assert read_nec_output(output) == legacy_read_nec_output(output)
+    assert parse_nec_output(sweep, summary_only=True).max_gain.max() == legacy_read_nec_output(sweep)[2]
+
+
+def test_early_exit_stops_after_the_requested_frequencies(tmp_path):
+    output = solve(tmp_path, GEOMETRIES[0])
+    full = parse_nec_output(output)
+    # a trailing frequency the early exit must never read
+    extra = solve(tmp_path, GEOMETRIES[1], [146.0], name="extra")
+    with open(output, "a") as out, open(extra) as tail:
+        out.write(tail.read())
+    assert len(parse_nec_output(output)) == len(FREQUENCIES) + 1
+
+    assert_same(parse_nec_output(output, num_frequencies=len(FREQUENCIES)), full)
+    assert_same(parse_nec_output(output, num_frequencies=len(FREQUENCIES), use_mmap=True), full)
+    impedances = parse_nec_output(output, summary_only=True, num_frequencies=len(FREQUENCIES), need_pattern=False)
+    np.testing.assert_array_equal(impedances.impedance, full.impedance)
+
+
+@pytest.mark.parametrize("summary_only", [True, False])
+def test_batch_output_splits_into_single_results(tmp_path, summary_only):
+    singles = [parse_nec_output(solve(tmp_path, geometry, name=f"single{i}"), summary_only=summary_only)
+               for i, geometry in enumerate(GEOMETRIES)]
+    deck, output = str(tmp_path / "batch.nec"), str(tmp_path / "batch.out")
+    create_nec_batch_input(GEOMETRIES, deck, FREQUENCIES)
+    run_fake_nec(deck, output)
+
+    results = read_nec_batch_results(output, len(GEOMETRIES), summary_only, len(FREQUENCIES))
+
+    for result, single in zip(results, singles):
+        assert_same(result, single)
+
+
+def test_batch_output_cut_short_leaves_missing_structures_empty(tmp_path):
+    # fake_nec, like NEC-2, stops the deck at the zero-length element of the second structure
+    geometries = [GEOMETRIES[0], ([0.48, 0.0, 0.42], [0.2, 0.25]), GEOMETRIES[2]]
+    deck, output = str(tmp_path / "batch.nec"), str(tmp_path / "batch.out")
+    create_nec_batch_input(geometries, deck, FREQUENCIES)
+    assert run_fake_nec(deck, output) == 1
+
+    first, second, third = read_nec_batch_results(output, len(geometries), True, len(FREQUENCIES))
+
+    assert_same(first, parse_nec_output(solve(tmp_path, GEOMETRIES[0], name="first"), summary_only=True))
+    assert second is None and third is None
@@ -0,0 +1,84 @@
+# test_scheduler.py
+"""Asynchronous scheduler and steady-state NSGA-II (user-023)."""
+import asyncio
+import random
+
+from deap import base, creator, tools
+
+from optimizer.genetic_optimizer import run_optimization
+from optimizer.scheduler import EvaluationScheduler, steady_state_nsga2
+
+
+def test_slots_bound_concurrency_and_failures_are_retried():
+    running = []
+    peak = []
+    attempts = {}
+
+    async def solve(genome, slot, timer):
+        running.append(slot)
+        peak.append(len(running))
+        attempts[genome] = attempts.get(genome, 0) + 1
+        await asyncio.sleep(0.01)
+        running.remove(slot)
+        # every genome fails on its first attempt
+        return None if attempts[genome] == 1 else {'genome': genome}
+
+    async def main():
+        scheduler = EvaluationScheduler(solve, slots=2, retries=2, backoff=0.001)
+        return scheduler, await asyncio.gather(*(scheduler.evaluate(genome) for genome in range(6)))
+
+    scheduler, outcomes = asyncio.run(main())
+    assert [results for results, _ in outcomes] == [{'genome': genome} for genome in range(6)]
+    assert max(peak) == 2
+    assert scheduler.stats == {'timeouts': 0, 'retries': 6, 'retry_failures': 0}
+
+
+def test_timeouts_are_retried_then_given_up():
+    async def solve(genome, slot, timer):
+        await asyncio.sleep(1.0)
+        return {}
+
+    async def main():
+        scheduler = EvaluationScheduler(solve, slots=1, timeout=0.01, retries=1, backoff=0.001)
+        return scheduler, await scheduler.evaluate(0)
+
+    scheduler, (results, _) = asyncio.run(main())
+    assert results is None
+    assert scheduler.stats == {'timeouts': 2, 'retries': 1, 'retry_failures': 1}
+
+
+def test_steady_state_keeps_population_size_and_budget():
+    if not hasattr(creator, "Number"):
+        creator.create("FitnessMax", base.Fitness, weights=(1.0,))
+        creator.create("Number", list, fitness=creator.FitnessMax)
+    rng = random.Random(1)
+    population = [creator.Number([rng.random()]) for _ in range(6)]
+    for ind in population:
+        ind.fitness.values = (ind[0],)
+    evaluated = []
+
+    def breed(population):
+        return [creator.Number([rng.random()]) for _ in range(3)]
+
+    async def evaluate(ind):
+        await asyncio.sleep(rng.random() / 100)
+        ind.fitness.values = (ind[0],)
+        evaluated.append(ind)
+        return ind
+
+    best_before = max(ind[0] for ind in population)
+    asyncio.run(steady_state_nsga2(population, breed, evaluate, tools.selNSGA2, budget=20, in_flight=4))
+
+    assert len(evaluated) == 20
+    assert len(population) == 6
+    assert max(ind[0] for ind in population) >= best_before
+
+
+def test_async_run_evaluates_its_budget(make_config):
+    config_path = make_config({'Async': {'enabled': True, 'slots': 3}, 'Solver': {'backend': 'nec'}})
+    population, logbook, _ = run_optimization('single', config_path=config_path)
+
+    # mu = lambda_ = 60 % of population_size, as in the generational loop
+    assert len(population) == 4
+    assert logbook[-1]['evaluations'] == 3 * 4
+    assert all(ind.fitness.valid for ind in population)
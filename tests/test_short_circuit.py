@@ -0,0 +1,24 @@
+# test_short_circuit.py
+"""Sweep short-circuit (user-021): designs skipped at the band centre stay rankable, and reported designs are swept."""
+from optimizer.evaluation import evaluate_sweep
+from optimizer.genetic_optimizer import run_optimization
+from conftest import sweep_settings
+
+# a limit below the real penalty of every 3-element design rejects the whole initial population
+STRICT = {'ShortCircuit': {'enabled': True, 'max_real_penalty': 5, 'gain_cap': 12},
+          'GeneticAlgorithm': {'population_size': 10}}
+
+
+def test_short_circuited_run_improves_on_its_seed(make_config):
+    seed = run_optimization('sweep', config_path=make_config(dict(STRICT, GeneticAlgorithm={'population_size': 10,
+                                                                                            'num_generations': 0}), 'seed.ini'))
+    config_path = make_config(dict(STRICT, GeneticAlgorithm={'population_size': 10, 'num_generations': 4}), 'run.ini')
+    population, logbook, hall_of_fame = run_optimization('sweep', config_path=config_path)
+
+    assert sum(record['sweep_calls_skipped'] for record in logbook) > 0
+    assert max(ind.fitness.values[0] for ind in hall_of_fame) > max(ind.fitness.values[0] for ind in seed[2])
+    # every reported fitness is the band average of a full sweep, never a failure or a centre bound
+    settings = sweep_settings(config_path)
+    for ind in list(population) + list(hall_of_fame):
+        assert ind.fitness.values[0] > -1000.0
+        assert ind.fitness.values == evaluate_sweep(ind, settings)
@@ -0,0 +1,22 @@
+# test_symmetry.py
+"""The symmetric half-element model (user-019) stays within tolerance of the full model."""
+import pytest
+
+from optimizer.evaluation import make_scratch_paths
+from optimizer.solver_backends import check_symmetry, get_backend
+from conftest import FAKE_NEC
+
+FREQUENCIES = [143.0, 144.0, 145.0]
+
+
+@pytest.mark.parametrize("backend", ["nec", "mom"])
+@pytest.mark.parametrize("geometry", [([0.48, 0.44, 0.42], [0.2, 0.25]), ([0.5, 0.47, 0.45, 0.43, 0.4], [0.25, 0.2, 0.2, 0.2])])
+def test_symmetric_model_within_tolerance(tmp_path, backend, geometry):
+    paths = make_scratch_paths(str(tmp_path), "input.nec", "output.out", "nec.tmp")
+    settings = {'segments': 9, 'radius': 0.006, 'pattern_step': 5, 'far_field': 'full',
+                'launcher': 'direct', 'solver_command': FAKE_NEC, 'solver_timeout': 30}
+
+    within, impedance_error, gain_error = check_symmetry(get_backend(backend), geometry, FREQUENCIES, settings, paths)
+
+    assert within, (impedance_error, gain_error)
+    assert impedance_error <= 0.05 and gain_error <= 0.2
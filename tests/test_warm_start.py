@@ -0,0 +1,52 @@
+# test_warm_start.py
+"""Warm start (user-014): stored fitness is reused only for designs simulated the way the current run simulates them."""
+import numpy as np
+import pytest
+
+from optimizer.evaluation import fitness_from_results
+from optimizer.genetic_optimizer import run_optimization
+from optimizer.population import GeneBounds
+from optimizer.warm_start import seed_designs
+
+WEIGHTS = (1.0, -1.0, -1.0)
+BOUNDS = GeneBounds(3, 0.25, 0.5, 1.0, False, False)
+FREQUENCIES = [143.0, 144.0, 145.0]
+# the evaluation settings of the archived run (make_config's defaults)
+SETTINGS = {'backend': 'mom', 'segments': 9, 'radius': 0.006, 'pattern_step': 5, 'far_field': 'full',
+            'front_to_back': False, 'symmetric': False}
+
+
+@pytest.fixture
+def archive(make_config, tmp_path):
+    """Archive and results CSV of a small sweep run."""
+    db_file = tmp_path / 'archive.db'
+    run_optimization('sweep', config_path=make_config({'Archive': {'db_file': db_file}}, 'archived.ini'))
+    return str(db_file), str(tmp_path / 'archived.ini.csv')
+
+
+def seeds(paths, settings, frequencies=FREQUENCIES, target=50.0):
+    return seed_designs(paths, 6, 3, BOUNDS, np.random.default_rng(0), WEIGHTS, frequencies, settings,
+                        lambda results: fitness_from_results(results, target))
+
+
+def test_matching_archive_rows_are_rescored(archive):
+    reused = seeds([archive[0]], SETTINGS)
+    retargeted = seeds([archive[0]], SETTINGS, target=25.0)
+
+    assert len(reused) == 6 and all(fitness for _, fitness in reused)
+    # the stored impedance is scored against the current target
+    assert [genes for genes, _ in retargeted] == [genes for genes, _ in reused]
+    assert all(new[1] != old[1] for (_, new), (_, old) in zip(retargeted, reused))
+
+
+@pytest.mark.parametrize("changed", [{'backend': 'nec'}, {'segments': 5}, {'radius': 0.004}, {'pattern_step': 15},
+                                     {'far_field': 'forward'}, {'front_to_back': True}, {'symmetric': True}])
+def test_mismatched_archive_rows_are_evaluated_again(archive, changed):
+    seeded = seeds([archive[0]], dict(SETTINGS, **changed))
+
+    assert len(seeded) == 6 and all(not fitness for _, fitness in seeded)
+
+
+def test_other_frequencies_and_csv_designs_are_evaluated_again(archive):
+    assert all(not fitness for _, fitness in seeds([archive[0]], SETTINGS, frequencies=[144.0]))
+    assert all(not fitness for _, fitness in seeds([archive[1]], SETTINGS))